@@ -27,6 +27,13 @@ echo ""
 echo "📝 Creating RBAC resources..."
 kubectl apply -f rbac.yaml
 
+# Security policy read by k8s-remediator (POLICY_CONFIG_DIR)
+echo "📝 Creating k8s-remediator policy ConfigMap..."
+kubectl create configmap k8s-remediator-policy -n archestra-system \
+    --from-file=../../archestra-config/mcp-servers/registry.yaml \
+    --from-file=../../archestra-config/agents/remediation-agent.yaml \
+    --dry-run=client -o yaml | kubectl apply -f -
+
 echo ""
 echo "🐳 Building Docker images..."
 echo ""
@@ -34,9 +41,9 @@ echo ""
 # Build and load images (for local k8s like minikube/kind)
 cd ../../mcp-servers
 
-docker build -t agentpitcrew/prometheus-metrics:latest prometheus-metrics/
-docker build -t agentpitcrew/log-analyzer:latest log-analyzer/
-docker build -t agentpitcrew/k8s-remediator:latest k8s-remediator/
+docker build -t agentpitcrew/prometheus-metrics:latest -f prometheus-metrics/Dockerfile .
+docker build -t agentpitcrew/log-analyzer:latest -f log-analyzer/Dockerfile .
+docker build -t agentpitcrew/k8s-remediator:latest -f k8s-remediator/Dockerfile .
 
 echo ""
 echo "✅ Docker images built"
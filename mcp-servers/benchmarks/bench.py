@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MCP servers in-process and over the streamable HTTP transport
+
+    python benchmarks/bench.py --lines 1e6 --iterations 200
+    python benchmarks/bench.py --suite log --transport http --concurrency 8
+    python benchmarks/bench.py --save-baseline          # record benchmarks/baseline.json
+    python benchmarks/bench.py --fail-on-regression     # compare against it
+
+Reports p50/p99 latency, throughput and peak RSS per case.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import remediation_burst, write_corpus
+from harness import (DEFAULT_TOLERANCE, compare, load_baseline, load_server, measure, measure_async,
+                     save_baseline, start_http, summarize)
+from stub_prometheus import start_synthetic_prometheus
+
+SUITES = ("log", "prom", "k8s")
+TRANSPORTS = ("inproc", "http")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+LOG_QUERIES = ["timeout", "ERROR", "Retry attempt [0-9]", "memory usage", "pool-4"]
+LOG_PATTERNS = ["ERROR", "WARN", "timeout", "OOM", "exception"]
+
+
+async def _over_http(mcp, name: str, tool: str, args, iterations: int, concurrency: int, **extra) -> dict:
+    from fastmcp import Client
+
+    server, url = start_http(mcp)
+    try:
+        async with Client(url + "/mcp") as client:
+            return await measure_async(name, lambda i: client.call_tool(tool, args(i)),
+                                       iterations, concurrency, **extra)
+    finally:
+        server.should_exit = True
+
+
+# ---------------- SUITES ---------------- #
+
+def run_log_suite(options, directory: str) -> list[dict]:
+    server = load_server("log-analyzer", "log_analyzer_server")
+    from log_sources import FileLogSource
+
+    started = time.perf_counter()
+    paths = write_corpus(directory, options.lines, max(1000, options.lines // options.files))
+    print(f"  corpus: {options.lines} lines in {len(paths)} files ({time.perf_counter() - started:.1f}s)")
+
+    server.set_log_source(FileLogSource(os.path.join(directory, "app.log")))
+    started = time.perf_counter()
+    server._current_index()
+    build = time.perf_counter() - started
+    results = [summarize("log.index_build", [build], build, lines=options.lines)]
+
+    search = lambda i: (LOG_QUERIES[i % len(LOG_QUERIES)], "1h", "default")
+    detect = lambda i: LOG_PATTERNS[i % len(LOG_PATTERNS)]
+    if "inproc" in options.transport:
+        results.append(measure("log.search_logs", lambda i: server._search_logs_impl(*search(i)),
+                               options.iterations, lines=options.lines))
+        results.append(measure("log.search_logs.all", lambda i: server._search_logs_impl(
+            LOG_QUERIES[i % len(LOG_QUERIES)], "all", "default", 100, "ERROR"),
+            options.iterations, lines=options.lines))
+        results.append(measure("log.detect_anomaly", lambda i: server._detect_anomaly_impl(detect(i)),
+                               options.iterations, lines=options.lines))
+    if "http" in options.transport:
+        async def http_cases():
+            return [
+                await _over_http(server.mcp, "log.search_logs.http", "search_logs",
+                                 lambda i: dict(zip(("query", "time_range", "namespace"), search(i))),
+                                 options.iterations, options.concurrency, lines=options.lines),
+                await _over_http(server.mcp, "log.detect_anomaly.http", "detect_anomaly",
+                                 lambda i: {"pattern": detect(i)},
+                                 options.iterations, options.concurrency, lines=options.lines)
+            ]
+        results.extend(asyncio.run(http_cases()))
+    server.scan_pool.shutdown()
+    return results
+
+
+def run_prom_suite(options) -> list[dict]:
+    server = load_server("prometheus-metrics", "prometheus_metrics_server")
+    from prom_client import PrometheusClient
+
+    httpd, url = start_synthetic_prometheus()
+    # No response cache, so every call pays for the HTTP round trip and decoding
+    server.prometheus = PrometheusClient(url, cache_ttl=0)
+    namespaces = [f"ns-{i}" for i in range(20)]
+
+    async def cases():
+        results = []
+        if "inproc" in options.transport:
+            results.append(await measure_async(
+                "prom.query_cpu_usage", lambda i: server._query_cpu_usage_impl("prod", namespaces[i % 20]),
+                options.iterations, options.concurrency))
+            results.append(await measure_async(
+                "prom.query_cpu_usage_batch",
+                lambda i: server._query_batch_impl("cpu", ["prod", "staging", "dev"], namespaces),
+                options.iterations, options.concurrency))
+            results.append(await measure_async(
+                "prom.query_range", lambda i: server._query_range_impl(f"rate(cpu_{i % 5}[5m])", "24h"),
+                options.iterations, options.concurrency))
+            results.append(await measure_async(
+                "prom.get_alerts", lambda i: server._get_alerts_impl("default", "critical"),
+                options.iterations, options.concurrency))
+            await server.prometheus.aclose()
+        if "http" in options.transport:
+            # Tools now run on the HTTP server's event loop, which gets its own pool
+            server.prometheus = PrometheusClient(url, cache_ttl=0)
+            results.append(await _over_http(
+                server.mcp, "prom.query_cpu_usage.http", "query_cpu_usage",
+                lambda i: {"cluster_name": "prod", "namespace": namespaces[i % 20]},
+                options.iterations, options.concurrency))
+            results.append(await _over_http(
+                server.mcp, "prom.query_range.http", "query_range",
+                lambda i: {"query": f"rate(cpu_{i % 5}[5m])", "window": "24h"},
+                options.iterations, options.concurrency))
+        return results
+
+    try:
+        return asyncio.run(cases())
+    finally:
+        server.prometheus = None
+        httpd.shutdown()
+
+
+def run_k8s_suite(options) -> list[dict]:
+    server = load_server("k8s-remediator", "k8s_remediator_server")
+    burst = remediation_burst(max(options.iterations, options.burst), seed=1)
+    scale = lambda i: burst[i % len(burst)]
+
+    results = []
+    if "inproc" in options.transport:
+        results.append(measure("k8s.scale_deployment",
+                               lambda i: server.scale_deployment_impl(dry_run=True, **scale(i)),
+                               options.iterations))
+        bulk = burst[:options.burst]
+        results.append(measure("k8s.scale_deployments", lambda i: asyncio.run(
+            server.scale_deployments_impl(bulk, dry_run=True)), max(1, options.iterations // 10),
+            burst=options.burst))
+    if "http" in options.transport:
+        results.append(asyncio.run(_over_http(
+            server.mcp, "k8s.scale_deployment.http", "scale_deployment",
+            lambda i: {**scale(i), "dry_run": True}, options.iterations, options.concurrency)))
+    return results
+
+
+# ---------------- REPORT ---------------- #
+
+def print_report(results: list[dict], comparisons: list[dict]) -> None:
+    changes = {c["case"]: c for c in comparisons}
+    print(f"\n{'case':<30} {'calls':>6} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'rss MiB':>8}  vs baseline")
+    for r in results:
+        change = changes.get(r["case"])
+        note = ""
+        if change:
+            note = f"p99 {change['p99_change']:+.0%}, ops/s {change['throughput_change']:+.0%}"
+            note += "  REGRESSED" if change["regressed"] else ""
+        print(f"{r['case']:<30} {r['calls']:>6} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+              f"{r['throughput_per_s']:>10.1f} {r['peak_rss_mb']:>8.1f}  {note}")
+
+
+def parse_count(value: str) -> int:
+    """Accept 1000, 1e6 or 1_000_000."""
+    return int(float(value.replace("_", "")))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the AgentPitCrew MCP servers")
+    parser.add_argument("--suite", default=",".join(SUITES), help="Comma-separated: log,prom,k8s")
+    parser.add_argument("--transport", default="inproc", help="Comma-separated: inproc,http")
+    parser.add_argument("--lines", type=parse_count, default=100_000, help="Synthetic log lines (1e3-1e8)")
+    parser.add_argument("--files", type=int, default=4, help="Rotated files to spread the corpus over")
+    parser.add_argument("--iterations", type=parse_count, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight for async and HTTP cases")
+    parser.add_argument("--burst", type=int, default=50, help="Targets per bulk remediation call")
+    parser.add_argument("--corpus-dir", help="Keep the generated corpus here instead of a temp dir")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", help="Also write results to this file")
+    options = parser.parse_args(argv)
+    options.suite = [s for s in options.suite.split(",") if s]
+    options.transport = [t for t in options.transport.split(",") if t]
+    for value, allowed in ((options.suite, SUITES), (options.transport, TRANSPORTS)):
+        unknown = set(value) - set(allowed)
+        if unknown:
+            parser.error(f"unknown value(s) {sorted(unknown)}; expected {', '.join(allowed)}")
+
+    results = []
+    if "log" in options.suite:
+        print("log-analyzer")
+        if options.corpus_dir:
+            results += run_log_suite(options, options.corpus_dir)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                results += run_log_suite(options, directory)
+    if "prom" in options.suite:
+        print("prometheus-metrics")
+        results += run_prom_suite(options)
+    if "k8s" in options.suite:
+        print("k8s-remediator")
+        results += run_k8s_suite(options)
+
+    comparisons = compare(results, load_baseline(options.baseline), options.tolerance)
+    print_report(results, comparisons)
+
+    params = {k: getattr(options, k) for k in ("lines", "files", "iterations", "concurrency", "burst")}
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"params": params, "results": results, "comparisons": comparisons}, f, indent=2)
+    if options.save_baseline:
+        save_baseline(options.baseline, results, params)
+        print(f"\nBaseline written to {options.baseline}")
+    if options.fail_on_regression and any(c["regressed"] for c in comparisons):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
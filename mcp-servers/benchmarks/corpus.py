@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Synthetic workloads for the MCP server benchmarks
+Deterministic log corpora, metric series and remediation bursts of any size
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+import gzip
+import math
+import os
+import random
+
+LEVELS = (("INFO", 0.80), ("WARN", 0.12), ("ERROR", 0.06), ("DEBUG", 0.02))
+
+MESSAGES = {
+    "INFO": ["Request processed successfully in {n}ms", "Connected to database pool-{n}",
+             "Cache hit ratio {n}%", "Health check passed"],
+    "WARN": ["High memory usage detected: {n}%", "Request latency exceeds threshold: {n}ms",
+             "Retrying connection to upstream-{n}"],
+    "ERROR": ["Failed to process request: Connection timeout", "Database query failed: too many connections",
+              "Out of memory exception in worker thread {n}", "Retry attempt {n} failed"],
+    "DEBUG": ["Span {n} finished", "Config reloaded"]
+}
+
+# One burst of errors per this many lines, so anomaly detection has spikes to find
+BURST_EVERY = 50_000
+BURST_LENGTH = 200
+
+DEFAULT_START = datetime(2024, 2, 14)
+
+
+def generate_lines(count: int, seed: int = 0, start: datetime = DEFAULT_START,
+                   lines_per_second: float = 20.0) -> Iterator[str]:
+    """Yield count log lines in the servers' "<date> <time> <LEVEL> <message>" format."""
+    rng = random.Random(seed)
+    levels = [level for level, _ in LEVELS]
+    weights = [weight for _, weight in LEVELS]
+    step = 1.0 / lines_per_second
+    for i in range(count):
+        ts = start + timedelta(seconds=i * step)
+        if i % BURST_EVERY < BURST_LENGTH and i >= BURST_EVERY:
+            level = "ERROR"
+        else:
+            level = rng.choices(levels, weights)[0]
+        message = rng.choice(MESSAGES[level]).format(n=rng.randint(1, 999))
+        yield f"{ts:%Y-%m-%d %H:%M:%S} {level} {message}"
+
+
+def write_corpus(directory: str, count: int, lines_per_file: int = 1_000_000, seed: int = 0,
+                 gzip_rotated: bool = True) -> list[str]:
+    """
+    Write count lines as app.log plus logrotate-style older files (app.log.N[.gz]),
+    streaming so that corpora far larger than memory can be generated.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = max(1, math.ceil(count / lines_per_file))
+    lines = generate_lines(count, seed)
+    paths = []
+    for n in range(files - 1, -1, -1):
+        name = "app.log" if n == 0 else f"app.log.{n}" + (".gz" if gzip_rotated and n > 1 else "")
+        path = os.path.join(directory, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wt") as f:
+            batch = []
+            for _ in range(min(lines_per_file, count - len(paths) * lines_per_file)):
+                batch.append(next(lines))
+                if len(batch) >= 10_000:
+                    f.write("\n".join(batch) + "\n")
+                    batch = []
+            if batch:
+                f.write("\n".join(batch) + "\n")
+        paths.append(path)
+    return paths
+
+
+def metric_series(points: int, start: float, step: float, seed: int = 0,
+                  base: float = 50.0) -> list[list]:
+    """A noisy daily-seasonal series with occasional spikes, as Prometheus [[ts, "value"]] pairs."""
+    rng = random.Random(seed)
+    values = []
+    for i in range(points):
+        ts = start + i * step
+        value = base + 20 * math.sin(2 * math.pi * ts / 86400) + rng.gauss(0, 3)
+        if rng.random() < 0.002:
+            value *= 3
+        values.append([ts, f"{value:.3f}"])
+    return values
+
+
+def remediation_burst(size: int, seed: int = 0, namespaces: Optional[list[str]] = None) -> list[dict]:
+    """Scale requests for size deployments, with a few protected targets mixed in."""
+    rng = random.Random(seed)
+    namespaces = namespaces or ["default", "production", "staging"]
+    burst = []
+    for i in range(size):
+        if i % 25 == 24:
+            burst.append({"namespace": "kube-system", "name": f"coredns-{i}", "replicas": 2})
+        else:
+            burst.append({"namespace": rng.choice(namespaces), "name": f"web-{i % 40}",
+                          "replicas": rng.randint(1, 10)})
+    return burst
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Measurement helpers for the MCP server benchmarks
+Latency percentiles, throughput, peak RSS, server loading and baseline comparison
+"""
+
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if SERVERS_DIR not in sys.path:
+    sys.path.insert(0, SERVERS_DIR)
+
+# A case regresses when its p99 or throughput is this much worse than baseline
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = q / 100 * (len(sorted_values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process or its largest reaped child, in MiB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(own, children) / scale, 1)
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, **extra) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "case": name,
+        "calls": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        **extra
+    }
+
+
+def measure(name: str, fn: Callable[[int], Any], iterations: int, warmup: int = 1, **extra) -> dict:
+    """Time iterations sequential calls of fn(i)."""
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(name, latencies, time.perf_counter() - started, **extra)
+
+
+async def measure_async(name: str, fn: Callable[[int], Awaitable[Any]], iterations: int,
+                        concurrency: int = 1, warmup: int = 1, **extra) -> dict:
+    """Time iterations calls of await fn(i), at most concurrency in flight."""
+    for i in range(warmup):
+        await fn(i)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await fn(i)
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(iterations)])
+    return summarize(name, latencies, time.perf_counter() - started, concurrency=concurrency, **extra)
+
+
+def load_server(directory: str, alias: str):
+    """
+    Import <directory>/server.py as module alias. Every server module is called
+    "server", so each is loaded under its own name with its directory on sys.path.
+    """
+    if alias in sys.modules:
+        return sys.modules[alias]
+    path = os.path.join(SERVERS_DIR, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(alias, os.path.join(path, "server.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[alias] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_http(mcp) -> tuple[Any, str]:
+    """Serve mcp over streamable HTTP on a free local port; returns (server, base_url)."""
+    import uvicorn
+    from mcp_common import create_app
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(create_app(mcp, "http"), log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def code_version() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVERS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ---------------- BASELINES ---------------- #
+
+def load_baseline(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: list[dict], params: dict) -> None:
+    baseline = {
+        "version": code_version(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "params": params,
+        "cases": {r["case"]: r for r in results}
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results: list[dict], baseline: dict[str, Any],
+            tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """Per-case change against the baseline; regressed when p99 or throughput is worse than tolerance."""
+    comparisons = []
+    for result in results:
+        before: Optional[dict] = baseline.get("cases", {}).get(result["case"])
+        if not before:
+            continue
+        p99_change = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] if before["p99_ms"] else 0.0
+        tp_change = ((result["throughput_per_s"] - before["throughput_per_s"]) / before["throughput_per_s"]
+                     if before["throughput_per_s"] else 0.0)
+        comparisons.append({
+            "case": result["case"],
+            "p99_change": round(p99_change, 3),
+            "throughput_change": round(tp_change, 3),
+            "regressed": p99_change > tolerance or tp_change < -tolerance
+        })
+    return comparisons
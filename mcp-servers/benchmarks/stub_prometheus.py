@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Synthetic Prometheus HTTP API for the benchmarks
+Serves instant vectors, range matrices built from corpus.metric_series, and alerts
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import re
+import threading
+
+from corpus import metric_series
+
+
+class SyntheticPrometheus(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, delayed ACKs add ~40ms per call
+    disable_nagle_algorithm = True
+    series_count = 4
+    alerts = [
+        {"labels": {"alertname": f"Alert{i}", "namespace": "default",
+                    "severity": "critical" if i % 3 == 0 else "warning"},
+         "annotations": {"summary": f"Synthetic alert {i}"}, "state": "firing",
+         "activeAt": "2024-02-14T12:00:00Z"}
+        for i in range(50)
+    ]
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        query = params.get("query", "")
+
+        if url.path == "/api/v1/query":
+            namespaces = re.search(r'namespace=~"([^"]*)"', query)
+            names = namespaces.group(1).split("|") if namespaces else [None]
+            result = [{"metric": {"namespace": ns} if ns else {},
+                       "value": [float(params["time"]), f"{40 + i * 7 % 60}.0"]}
+                      for i, ns in enumerate(names)]
+            body = {"status": "success", "data": {"resultType": "vector", "result": result}}
+        elif url.path == "/api/v1/query_range":
+            start, end, step = float(params["start"]), float(params["end"]), float(params["step"])
+            points = int((end - start) / step) + 1
+            body = {"status": "success", "data": {"resultType": "matrix", "result": [
+                {"metric": {"pod": f"web-{i}"}, "values": metric_series(points, start, step, seed=i)}
+                for i in range(self.series_count)
+            ]}}
+        elif url.path == "/api/v1/alerts":
+            body = {"status": "success", "data": {"alerts": self.alerts}}
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_synthetic_prometheus():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SyntheticPrometheus)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the benchmark harness
+Runs every suite on a tiny corpus and checks the report and baseline comparison
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench
+from corpus import generate_lines, remediation_burst, write_corpus
+from harness import compare, percentile
+
+
+def test_corpus():
+    """Test the synthetic corpus is deterministic and split into rotated files"""
+    print("\n=== Testing synthetic corpus ===")
+
+    assert list(generate_lines(50, seed=3)) == list(generate_lines(50, seed=3))
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_corpus(directory, 2500, lines_per_file=1000)
+        names = [os.path.basename(p) for p in paths]
+        print(f"Files: {names}")
+        assert names == ["app.log.2.gz", "app.log.1", "app.log"]
+        with open(paths[-1]) as f:
+            assert len(f.read().splitlines()) == 500
+
+    burst = remediation_burst(50)
+    assert sum(1 for t in burst if t["namespace"] == "kube-system") == 2
+    print("test_corpus PASSED")
+
+
+def test_percentiles_and_baseline():
+    """Test percentile interpolation and regression detection"""
+    print("\n=== Testing baseline comparison ===")
+
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+    assert percentile([1.0, 2.0], 99) == 1.99
+
+    baseline = {"cases": {"a": {"p99_ms": 10.0, "throughput_per_s": 100.0}}}
+    slower = compare([{"case": "a", "p99_ms": 13.0, "throughput_per_s": 95.0}], baseline)
+    assert slower[0]["regressed"] is True
+    steady = compare([{"case": "a", "p99_ms": 10.5, "throughput_per_s": 99.0},
+                      {"case": "new", "p99_ms": 1.0, "throughput_per_s": 1.0}], baseline)
+    assert len(steady) == 1 and steady[0]["regressed"] is False
+    print("test_percentiles_and_baseline PASSED")
+
+
+def test_bench_smoke():
+    """Test a full in-process run writes a baseline that a second run compares against"""
+    print("\n=== Testing bench run ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = os.path.join(directory, "baseline.json")
+        report = os.path.join(directory, "report.json")
+        args = ["--lines", "2e3", "--iterations", "5", "--burst", "10",
+                "--baseline", baseline, "--json", report]
+        assert bench.main(args + ["--save-baseline"]) == 0
+
+        with open(baseline) as f:
+            cases = json.load(f)["cases"]
+        print(f"Cases: {sorted(cases)}")
+        for name in ("log.search_logs", "log.detect_anomaly", "prom.query_range", "k8s.scale_deployment"):
+            assert cases[name]["calls"] == 5
+            assert cases[name]["p99_ms"] >= cases[name]["p50_ms"] > 0
+            assert cases[name]["peak_rss_mb"] > 0
+
+        assert bench.main(args) == 0
+        with open(report) as f:
+            assert len(json.load(f)["comparisons"]) == len(cases)
+
+    print("test_bench_smoke PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing benchmark harness")
+    print("=" * 50)
+
+    try:
+        test_corpus()
+        test_percentiles_and_baseline()
+        test_bench_smoke()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
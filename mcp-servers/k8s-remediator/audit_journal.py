@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Audit journal for the K8sRemediator MCP Server
+Append-only JSONL segments with batched fsync, time-based rotation and retention,
+indexed by target, action and time
+"""
+
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger("k8s-remediator")
+
+DEFAULT_SEGMENT_SECONDS = 3600
+DEFAULT_RETENTION_SECONDS = 30 * 86400
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FLUSH_ENTRIES = 64
+DEFAULT_RECENT_ENTRIES = 1000
+
+_SEGMENT_NAME = re.compile(r"^audit-(\d+)\.jsonl$")
+
+
+def entry_time(entry: dict[str, Any]) -> float:
+    try:
+        ts = datetime.fromisoformat(entry["timestamp"].replace("Z", "+00:00"))
+    except (KeyError, ValueError):
+        return 0.0
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class Segment:
+    """
+    One journal file covering [start, start + span). The index maps targets, bare
+    resource names and actions to byte offsets of their lines in the file.
+    """
+
+    def __init__(self, path: str, start: int, span: int):
+        self.path = path
+        self.start = start
+        self.end = start + span
+        self.count = 0
+        self.targets: dict[str, array] = {}
+        self.names: dict[str, array] = {}
+        self.actions: dict[str, array] = {}
+
+    def index(self, entry: dict[str, Any], offset: int) -> None:
+        target = entry.get("target", "")
+        for table, key in ((self.targets, target),
+                           (self.names, target.rsplit("/", 1)[-1]),
+                           (self.actions, entry.get("action", ""))):
+            table.setdefault(key, array("Q")).append(offset)
+        self.count += 1
+
+    def load(self) -> None:
+        """Rebuild the index from the file, cutting off a torn final line."""
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self.index(json.loads(line), offset)
+                except ValueError:
+                    logger.warning("Skipping corrupt audit line in %s at %d", self.path, offset)
+                offset += len(line)
+        if offset < os.path.getsize(self.path):
+            # Left by a crash mid-write; the next append must start on a line of its own
+            logger.warning("Truncating torn audit line in %s at %d", self.path, offset)
+            os.truncate(self.path, offset)
+
+    def offsets(self, target: Optional[str], action: Optional[str]) -> Optional[list[int]]:
+        """Candidate offsets in file order, or None when the whole segment must be read."""
+        lists = []
+        if target:
+            table = self.targets if "/" in target else self.names
+            lists.append(table.get(target, array("Q")))
+        if action:
+            lists.append(self.actions.get(action, array("Q")))
+        if not lists:
+            return None
+        if len(lists) == 1:
+            return list(lists[0])
+        other = set(lists[1])
+        return [o for o in lists[0] if o in other]
+
+
+class AuditJournal:
+    """
+    Append-only audit trail.
+
+    With a directory, entries go to audit-<start>.jsonl segments that rotate every
+    segment_seconds and are deleted once older than retention_seconds. Writes are
+    flushed and fsynced in batches of flush_entries or every flush_interval seconds.
+    Without a directory only the last recent_entries are kept, in memory.
+
+    len() counts retained entries and slices such as journal[-10:] read from the
+    in-memory tail of recent entries. version changes with every append and expiry.
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 segment_seconds: int = DEFAULT_SEGMENT_SECONDS,
+                 retention_seconds: int = DEFAULT_RETENTION_SECONDS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_entries: int = DEFAULT_FLUSH_ENTRIES,
+                 recent_entries: int = DEFAULT_RECENT_ENTRIES):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.flush_entries = flush_entries
+        self.recent: deque = deque(maxlen=recent_entries)
+        self.segments: list[Segment] = []
+        self.fsyncs = 0
+        self.version = 0
+        self._count = 0
+        self._file = None
+        self._pending = 0
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._open_existing()
+            self._flusher = threading.Thread(target=self._flush_loop, name="audit-flusher", daemon=True)
+            self._flusher.start()
+
+    # ---------------- WRITING ---------------- #
+
+    def _open_existing(self) -> None:
+        for filename in sorted(os.listdir(self.directory)):
+            match = _SEGMENT_NAME.match(filename)
+            if not match:
+                continue
+            segment = Segment(os.path.join(self.directory, filename), int(match.group(1)),
+                              self.segment_seconds)
+            segment.load()
+            self.segments.append(segment)
+        self.segments.sort(key=lambda s: s.start)
+        self._expire(time.time())
+        self._count = sum(s.count for s in self.segments)
+        for entry in self._read_tail(self.recent.maxlen):
+            self.recent.append(entry)
+
+    def _segment_for(self, ts: float) -> Segment:
+        start = int(ts // self.segment_seconds) * self.segment_seconds
+        current = self.segments[-1] if self.segments else None
+        if current is not None and current.start >= start:
+            # Clock stepped back: keep appending to the newest segment
+            return current
+        self._close_file()
+        segment = Segment(os.path.join(self.directory, f"audit-{start}.jsonl"), start, self.segment_seconds)
+        self.segments.append(segment)
+        self._expire(time.time())
+        return segment
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.retention_seconds
+        while len(self.segments) > 1 and self.segments[0].end <= cutoff:
+            segment = self.segments.pop(0)
+            self._count -= segment.count
+            self.version += 1
+            try:
+                os.remove(segment.path)
+            except OSError as e:
+                logger.warning("Could not remove expired audit segment %s: %s", segment.path, e)
+
+    def append(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self.recent.append(entry)
+            self._count += 1
+            self.version += 1
+            if not self.directory:
+                return
+            segment = self._segment_for(entry_time(entry) or time.time())
+            if self._file is None:
+                self._file = open(segment.path, "ab")
+            line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+            segment.index(entry, self._file.tell())
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= self.flush_entries:
+                self._sync()
+
+    def _sync(self) -> None:
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+            self._pending = 0
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                self._sync()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._close_file()
+
+    # ---------------- READING ---------------- #
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, key):
+        return list(self.recent)[key]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(list(self.recent))
+
+    def _read_segment(self, segment: Segment, target: Optional[str],
+                      action: Optional[str]) -> list[dict[str, Any]]:
+        offsets = segment.offsets(target, action)
+        if offsets == []:
+            return []
+        entries = []
+        with open(segment.path, "rb") as f:
+            if offsets is None:
+                lines = list(f)
+            else:
+                lines = []
+                for offset in offsets:
+                    f.seek(offset)
+                    lines.append(f.readline())
+        for line in lines:
+            if not line.endswith(b"\n"):
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def _read_tail(self, n: int) -> list[dict[str, Any]]:
+        entries: list[dict[str, Any]] = []
+        for segment in reversed(self.segments):
+            entries[:0] = self._read_segment(segment, None, None)
+            if len(entries) >= n:
+                break
+        return entries[-n:]
+
+    def query(self, target: Optional[str] = None, action: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              result: Optional[str] = None, limit: int = 100) -> list[dict[str, Any]]:
+        """
+        Return up to limit matching entries, oldest first, from the newest end.
+
+        target is "namespace/name" or a bare name matching any namespace; since and
+        until are epoch seconds. Only segments overlapping the time range are read,
+        and within them only the indexed lines for target and action.
+        """
+        def matches(entry):
+            if target and entry.get("target") != target and \
+                    ("/" in target or entry.get("target", "").rsplit("/", 1)[-1] != target):
+                return False
+            if action and entry.get("action") != action:
+                return False
+            if result and entry.get("result") != result:
+                return False
+            ts = entry_time(entry)
+            return (since is None or ts >= since) and (until is None or ts <= until)
+
+        with self._lock:
+            if not self.directory:
+                return [e for e in self.recent if matches(e)][-limit:] if limit > 0 else []
+            self._sync()
+            segments = [s for s in self.segments
+                        if (since is None or s.end > since) and (until is None or s.start <= until)]
+
+        found: list[dict[str, Any]] = []
+        for segment in reversed(segments):
+            found[:0] = [e for e in self._read_segment(segment, target, action) if matches(e)]
+            if len(found) >= limit:
+                break
+        return found[-limit:] if limit > 0 else []
+
+
+def create_journal_from_env() -> AuditJournal:
+    return AuditJournal(
+        directory=os.environ.get("AUDIT_LOG_DIR") or None,
+        segment_seconds=int(os.environ.get("AUDIT_SEGMENT_SECONDS", DEFAULT_SEGMENT_SECONDS)),
+        retention_seconds=int(os.environ.get("AUDIT_RETENTION_DAYS", "30")) * 86400
+    )
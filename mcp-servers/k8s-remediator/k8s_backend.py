@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Kubernetes backends for the K8sRemediator MCP Server
+A watch-based informer cache of Deployments and Pods plus real and simulated actions
+"""
+
+from typing import Any, Callable, Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger("k8s-remediator")
+
+# Seconds a watch stays open before it is re-established from the last resourceVersion
+WATCH_TIMEOUT_SECONDS = 300
+
+# How long an action waits for the first list before reading the API directly
+SYNC_TIMEOUT_SECONDS = 5.0
+
+
+class ResourceNotFound(Exception):
+    """Raised when the target Deployment or Pod does not exist."""
+
+
+class BackendError(Exception):
+    """Raised when the API server rejects an action."""
+
+
+# ---------------- OBJECT SUMMARIES ---------------- #
+
+def summarize_deployment(obj) -> dict[str, Any]:
+    status = obj.status
+    return {
+        "namespace": obj.metadata.namespace,
+        "name": obj.metadata.name,
+        "replicas": obj.spec.replicas,
+        "ready_replicas": (status.ready_replicas if status else None) or 0,
+        "updated_replicas": (status.updated_replicas if status else None) or 0,
+        "available_replicas": (status.available_replicas if status else None) or 0,
+        "generation": obj.metadata.generation,
+        "observed_generation": status.observed_generation if status else None,
+        "resource_version": obj.metadata.resource_version
+    }
+
+
+def summarize_pod(obj) -> dict[str, Any]:
+    status = obj.status
+    statuses = (status.container_statuses if status else None) or []
+    owners = obj.metadata.owner_references or []
+    return {
+        "namespace": obj.metadata.namespace,
+        "name": obj.metadata.name,
+        "uid": obj.metadata.uid,
+        "phase": status.phase if status else None,
+        "terminating": obj.metadata.deletion_timestamp is not None,
+        "node": obj.spec.node_name if obj.spec else None,
+        "labels": dict(obj.metadata.labels or {}),
+        "owner": f"{owners[0].kind}/{owners[0].name}" if owners else None,
+        "restarts": sum(s.restart_count or 0 for s in statuses),
+        "resource_version": obj.metadata.resource_version
+    }
+
+
+# ---------------- INFORMER ---------------- #
+
+class Informer:
+    """
+    Keeps a local copy of one resource kind in sync with the API server.
+
+    The initial list fills the store and records its resourceVersion; a watch from
+    that version then applies ADDED/MODIFIED/DELETED events. Expired watches
+    (410 Gone) and errors trigger a relist. Reads never touch the API server.
+    """
+
+    def __init__(self, kind: str, list_fn: Callable, summarize: Callable,
+                 watch_stream: Optional[Callable] = None):
+        self.kind = kind
+        self.list_fn = list_fn
+        self.summarize = summarize
+        self.watch_stream = watch_stream
+        self.synced = threading.Event()
+        self.resource_version: Optional[str] = None
+        self._store: dict[tuple[str, str], dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, namespace: str, name: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return self._store.get((namespace, name))
+
+    def list(self, namespace: Optional[str] = None) -> list[dict[str, Any]]:
+        with self._lock:
+            return [obj for (ns, _), obj in self._store.items() if namespace is None or ns == namespace]
+
+    def relist(self) -> None:
+        result = self.list_fn()
+        store = {}
+        for item in result.items:
+            summary = self.summarize(item)
+            store[(summary["namespace"], summary["name"])] = summary
+        with self._lock:
+            self._store = store
+            self.resource_version = result.metadata.resource_version
+        self.synced.set()
+
+    def apply(self, event: dict) -> None:
+        """Apply one watch event to the store."""
+        if event["type"] == "ERROR":
+            raise BackendError(f"{self.kind} watch error: {event.get('object')}")
+        summary = self.summarize(event["object"])
+        key = (summary["namespace"], summary["name"])
+        with self._lock:
+            if event["type"] == "DELETED":
+                self._store.pop(key, None)
+            else:
+                self._store[key] = summary
+            self.resource_version = summary["resource_version"] or self.resource_version
+
+    def run(self) -> None:
+        """List, then watch until stopped; relists after any watch failure."""
+        while not self._stop.is_set():
+            try:
+                if not self.synced.is_set() or self.resource_version is None:
+                    self.relist()
+                for event in self.watch_stream(self.list_fn, resource_version=self.resource_version,
+                                               timeout_seconds=WATCH_TIMEOUT_SECONDS):
+                    self.apply(event)
+                    if self._stop.is_set():
+                        return
+            except Exception as e:
+                logger.warning("%s informer relisting after error: %s", self.kind, e)
+                self.synced.clear()
+                self._stop.wait(1.0)
+
+    def start(self) -> "Informer":
+        self._thread = threading.Thread(target=self.run, name=f"{self.kind}-informer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# ---------------- BACKENDS ---------------- #
+
+class SimulatedBackend:
+    """In-memory stand-in used when no cluster is configured."""
+
+    name = "simulated"
+
+    def __init__(self, default_replicas: int = 2):
+        self.default_replicas = default_replicas
+        self.replicas: dict[tuple[str, str], int] = {}
+        self.restarts: dict[tuple[str, str], int] = {}
+
+    def get_deployment(self, namespace: str, name: str) -> Optional[dict[str, Any]]:
+        replicas = self.replicas.get((namespace, name), self.default_replicas)
+        return {"namespace": namespace, "name": name, "replicas": replicas, "ready_replicas": replicas,
+                "updated_replicas": replicas, "available_replicas": replicas, "generation": 1,
+                "observed_generation": 1, "resource_version": None}
+
+    def get_pod(self, namespace: str, name: str) -> Optional[dict[str, Any]]:
+        # Restarted pods come back under the same name with a new uid
+        restarts = self.restarts.get((namespace, name), 0)
+        return {"namespace": namespace, "name": name, "uid": f"{namespace}/{name}/{restarts}",
+                "phase": "Running", "terminating": False, "node": None, "labels": {}, "owner": None,
+                "restarts": 0, "resource_version": None}
+
+    def scale(self, namespace: str, name: str, replicas: int, dry_run: bool) -> dict[str, Any]:
+        previous = self.replicas.get((namespace, name), self.default_replicas)
+        if not dry_run:
+            self.replicas[(namespace, name)] = replicas
+        return {"previous_replicas": previous, "new_replicas": replicas, "status": "SIMULATED"}
+
+    def restart_pod(self, namespace: str, name: str, dry_run: bool) -> dict[str, Any]:
+        if not dry_run:
+            self.restarts[(namespace, name)] = self.restarts.get((namespace, name), 0) + 1
+        return {"status": "SIMULATED"}
+
+
+class KubernetesBackend:
+    """
+    Acts through the scale subresource and pod deletion, using server-side dry-run
+    so dry runs are still validated by admission. Existence checks and previous
+    state come from the informer caches.
+    """
+
+    name = "kubernetes"
+
+    def __init__(self, apps_api, core_api, deployments: Informer, pods: Informer):
+        self.apps_api = apps_api
+        self.core_api = core_api
+        self.deployments = deployments
+        self.pods = pods
+
+    def _cached(self, informer: Informer, namespace: str, name: str, read: Callable):
+        if informer.synced.wait(SYNC_TIMEOUT_SECONDS):
+            return informer.get(namespace, name)
+        # The cache is not ready yet; fall back to one direct read
+        try:
+            return informer.summarize(read(name, namespace))
+        except Exception as e:
+            if getattr(e, "status", None) == 404:
+                return None
+            raise BackendError(str(e))
+
+    def get_deployment(self, namespace: str, name: str) -> Optional[dict[str, Any]]:
+        return self._cached(self.deployments, namespace, name, self.apps_api.read_namespaced_deployment)
+
+    def get_pod(self, namespace: str, name: str) -> Optional[dict[str, Any]]:
+        return self._cached(self.pods, namespace, name, self.core_api.read_namespaced_pod)
+
+    def scale(self, namespace: str, name: str, replicas: int, dry_run: bool) -> dict[str, Any]:
+        deployment = self.get_deployment(namespace, name)
+        if deployment is None:
+            raise ResourceNotFound(f"Deployment {namespace}/{name} not found")
+        kwargs = {"dry_run": "All"} if dry_run else {}
+        try:
+            self.apps_api.patch_namespaced_deployment_scale(
+                name, namespace, {"spec": {"replicas": replicas}}, **kwargs
+            )
+        except Exception as e:
+            raise BackendError(getattr(e, "reason", None) or str(e))
+        return {
+            "previous_replicas": deployment["replicas"],
+            "new_replicas": replicas,
+            "status": "DRY-RUN" if dry_run else "SCALED"
+        }
+
+    def restart_pod(self, namespace: str, name: str, dry_run: bool) -> dict[str, Any]:
+        pod = self.get_pod(namespace, name)
+        if pod is None:
+            raise ResourceNotFound(f"Pod {namespace}/{name} not found")
+        kwargs = {"dry_run": "All"} if dry_run else {}
+        try:
+            self.core_api.delete_namespaced_pod(name, namespace, **kwargs)
+        except Exception as e:
+            raise BackendError(getattr(e, "reason", None) or str(e))
+        return {"status": "DRY-RUN" if dry_run else "RESTARTED", "owner": pod["owner"]}
+
+
+def create_kubernetes_backend(apps_api=None, core_api=None, watch_stream: Optional[Callable] = None,
+                              start: bool = True) -> KubernetesBackend:
+    """Build a KubernetesBackend from in-cluster config or KUBECONFIG and start its informers."""
+    if apps_api is None or core_api is None:
+        try:
+            from kubernetes import client, config, watch
+        except ImportError:
+            raise ImportError("kubernetes module is not installed. Install it using: pip install kubernetes")
+        try:
+            config.load_incluster_config()
+        except config.ConfigException:
+            config.load_kube_config()
+        apps_api, core_api = client.AppsV1Api(), client.CoreV1Api()
+        watch_stream = watch_stream or (lambda *args, **kwargs: watch.Watch().stream(*args, **kwargs))
+
+    deployments = Informer("deployments", apps_api.list_deployment_for_all_namespaces,
+                           summarize_deployment, watch_stream)
+    pods = Informer("pods", core_api.list_pod_for_all_namespaces, summarize_pod, watch_stream)
+    if start:
+        deployments.start()
+        pods.start()
+    return KubernetesBackend(apps_api, core_api, deployments, pods)
+
+
+def create_backend_from_env():
+    if os.environ.get("K8S_BACKEND", "simulated").lower() == "kubernetes":
+        return create_kubernetes_backend()
+    return SimulatedBackend()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Security policy engine for the K8sRemediator MCP Server
+Merges the built-in blocklist, the registry securityPolicy and the remediation
+agent's blockedActions into set lookups and one combined regex per action, and
+reads the agent's rateLimit for the remediation scheduler
+"""
+
+from typing import Any, Optional
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger("k8s-remediator")
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    from mcp_common.instrumentation import record_cache
+except ImportError:  # server.py run on its own, outside mcp-servers/
+    def record_cache(cache: str, hit: bool) -> None:
+        pass
+
+# Agent configs name tools; the server names the underlying actions
+ACTION_ALIASES = {"scale_deployment": "scale", "scale_deployments": "scale",
+                  "restart_pod": "restart", "restart_pods": "restart"}
+ACTIONS = ("scale", "restart")
+
+DEFAULT_CACHE_ENTRIES = 10000
+RELOAD_CHECK_SECONDS = 5.0
+
+# Real actions per namespace per minute, and seconds before the same target is acted on again
+DEFAULT_MAX_ACTIONS_PER_MINUTE = 10
+DEFAULT_COOLDOWN_SECONDS = 60.0
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$")
+_UNIT_SECONDS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+Decision = tuple[bool, str]
+
+
+def default_config_dir() -> Optional[str]:
+    """POLICY_CONFIG_DIR, else archestra-config next to mcp-servers in a checkout."""
+    configured = os.environ.get("POLICY_CONFIG_DIR")
+    if configured:
+        return configured
+    candidate = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "archestra-config")
+    return os.path.normpath(candidate) if os.path.isdir(candidate) else None
+
+
+class CompiledPolicy:
+    """Immutable rule set: namespace sets, one name regex per action and replica floors."""
+
+    def __init__(self):
+        self.allowed_namespaces: Optional[set[str]] = None
+        self.blocked_namespaces: dict[str, dict[str, str]] = {a: {} for a in ACTIONS}
+        self.name_rules: dict[str, list[tuple[str, str]]] = {a: [] for a in ACTIONS}
+        self.name_regex: dict[str, Optional[re.Pattern]] = {a: None for a in ACTIONS}
+        self.name_reasons: dict[str, list[str]] = {a: [] for a in ACTIONS}
+        # Per-rule regexes, used when an action's patterns cannot be combined into one
+        self.name_fallback: dict[str, list[re.Pattern]] = {a: [] for a in ACTIONS}
+        self.min_replicas = 1
+        self.min_replicas_reason = "Cannot scale below 1"
+        self.max_actions_per_minute = DEFAULT_MAX_ACTIONS_PER_MINUTE
+        self.cooldown_seconds = DEFAULT_COOLDOWN_SECONDS
+        self.sources: list[str] = []
+
+    def block_namespace(self, namespace: str, reason: str, actions=ACTIONS) -> None:
+        for action in actions:
+            self.blocked_namespaces[action].setdefault(namespace, reason)
+
+    def block_names(self, pattern: str, reason: str, actions=ACTIONS) -> None:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            logger.warning("Ignoring invalid policy pattern %r: %s", pattern, e)
+            return
+        for action in actions:
+            if pattern not in [p for p, _ in self.name_rules[action]]:
+                self.name_rules[action].append((pattern, reason))
+
+    def compile(self) -> "CompiledPolicy":
+        """Fold each action's patterns into one alternation; the matching group gives the reason."""
+        for action, rules in self.name_rules.items():
+            if not rules:
+                continue
+            self.name_reasons[action] = [reason for _, reason in rules]
+            try:
+                self.name_regex[action] = re.compile(
+                    "|".join(f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(rules))
+                )
+            except re.error as e:
+                # Inline flags such as (?i) or group names reused across patterns are
+                # valid on their own but not inside one alternation
+                logger.info("Matching %s patterns one by one: %s", action, e)
+                self.name_fallback[action] = [re.compile(pattern) for pattern, _ in rules]
+        return self
+
+    def evaluate(self, namespace: str, name: str, action: str) -> Decision:
+        """Decision for everything except the replica count."""
+        action = ACTION_ALIASES.get(action, action)
+        reason = self.blocked_namespaces.get(action, {}).get(namespace)
+        if reason:
+            return False, reason
+        if self.allowed_namespaces is not None and namespace not in self.allowed_namespaces:
+            return False, "Namespace not in allowed list"
+        regex = self.name_regex.get(action)
+        if regex is not None:
+            match = regex.match(name)
+            if match:
+                return False, self.name_reasons[action][int(match.lastgroup[1:])]
+        for i, pattern in enumerate(self.name_fallback.get(action, ())):
+            if pattern.match(name):
+                return False, self.name_reasons[action][i]
+        return True, "Allowed"
+
+
+def _conditions(source: dict) -> list[dict]:
+    return source.get("conditions") or []
+
+
+def parse_duration(value) -> float:
+    """60, "60s", "5m", "1h", "7d" or "1w" in seconds; raises ValueError otherwise."""
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r}")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def load_policy(blocklist: dict[str, Any], config_dir: Optional[str] = None) -> CompiledPolicy:
+    """
+    Build a CompiledPolicy from the built-in blocklist plus, when present and PyYAML
+    is installed, registry.yaml securityPolicy and remediation-agent.yaml blockedActions
+    and rateLimit.
+    """
+    policy = CompiledPolicy()
+
+    for namespace in blocklist.get("namespaces", []):
+        policy.block_namespace(namespace, "Protected namespace")
+    for pattern in blocklist.get("deployment_patterns", []):
+        policy.block_names(pattern, "Protected deployment")
+    policy.min_replicas = blocklist.get("min_replicas", 1)
+    policy.min_replicas_reason = f"Cannot scale below {policy.min_replicas}"
+    policy.sources.append("builtin")
+
+    if config_dir and yaml is None:
+        logger.warning("PyYAML is not installed; using the built-in security policy only")
+    elif config_dir:
+        _load_registry(policy, os.path.join(config_dir, "mcp-servers", "registry.yaml"))
+        _load_agent(policy, os.path.join(config_dir, "agents", "remediation-agent.yaml"))
+        if len(policy.sources) == 1:
+            logger.warning("No registry.yaml or remediation-agent.yaml under %s; "
+                           "using the built-in security policy only", config_dir)
+    else:
+        logger.warning("No policy config directory (set POLICY_CONFIG_DIR); "
+                       "using the built-in security policy only")
+
+    return policy.compile()
+
+
+def _read_yaml(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return None
+    except yaml.YAMLError as e:
+        logger.warning("Ignoring unreadable policy file %s: %s", path, e)
+        return None
+
+
+def _load_registry(policy: CompiledPolicy, path: str) -> None:
+    registry = _read_yaml(path)
+    if registry is None:
+        return
+    for server in registry.get("spec", {}).get("servers", []):
+        if server.get("name") != "k8s-remediator":
+            continue
+        security = server.get("securityPolicy") or {}
+        for namespace in security.get("blockedNamespaces", []):
+            policy.block_namespace(namespace, "Protected namespace")
+        if security.get("allowedNamespaces"):
+            policy.allowed_namespaces = set(security["allowedNamespaces"])
+        policy.sources.append(path)
+
+
+def _load_agent(policy: CompiledPolicy, path: str) -> None:
+    agent = _read_yaml(path)
+    if agent is None:
+        return
+    for blocked in agent.get("spec", {}).get("security", {}).get("blockedActions", []):
+        action = ACTION_ALIASES.get(blocked.get("action"), blocked.get("action"))
+        if action not in ACTIONS:
+            continue
+        for condition in _conditions(blocked):
+            reason = condition.get("reason", "Blocked by agent policy")
+            if "namespace" in condition:
+                policy.block_namespace(condition["namespace"], reason, (action,))
+            for key in ("podNamePattern", "namePattern", "deploymentPattern"):
+                if key in condition:
+                    policy.block_names(condition[key], reason, (action,))
+            if action == "scale" and "replicas" in condition:
+                floor = int(condition["replicas"]) + 1
+                if floor > policy.min_replicas:
+                    policy.min_replicas, policy.min_replicas_reason = floor, reason
+    rate_limit = agent.get("spec", {}).get("security", {}).get("rateLimit") or {}
+    try:
+        if "maxActionsPerMinute" in rate_limit:
+            policy.max_actions_per_minute = int(rate_limit["maxActionsPerMinute"])
+        if "cooldownPeriod" in rate_limit:
+            policy.cooldown_seconds = parse_duration(rate_limit["cooldownPeriod"])
+    except ValueError as e:
+        logger.warning("Ignoring invalid rateLimit in %s: %s", path, e)
+    policy.sources.append(path)
+
+
+class PolicyEngine:
+    """
+    Evaluates actions against the compiled policy, caching decisions per
+    (namespace, name, action). The cache is dropped whenever the policy is
+    reloaded, which happens on reload() or when a source file changes.
+    Safe to call from the bulk executor's threads.
+    """
+
+    def __init__(self, blocklist: dict[str, Any], config_dir: Optional[str] = None,
+                 max_cache_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.blocklist = blocklist
+        self.config_dir = config_dir
+        self.max_cache_entries = max_cache_entries
+        self.cache: dict[tuple[str, str, str], Decision] = {}
+        self.reloads = 0
+        self._checked = 0.0
+        self._mtimes: dict[str, float] = {}
+        # Serialises reloads and swaps policy and cache together
+        self._lock = threading.RLock()
+        self.reload()
+
+    def _source_mtimes(self) -> dict[str, float]:
+        mtimes = {}
+        for path in self.policy.sources[1:]:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[path] = 0.0
+        return mtimes
+
+    def reload(self) -> CompiledPolicy:
+        with self._lock:
+            try:
+                policy = load_policy(self.blocklist, self.config_dir)
+            except Exception as e:
+                if not hasattr(self, "policy"):
+                    raise
+                # A bad edit must not take the remediator down; retry on the next change
+                logger.warning("Keeping the previous security policy; reload failed: %s", e)
+                self._mtimes = self._source_mtimes()
+                self._checked = time.monotonic()
+                return self.policy
+            self.policy = policy
+            self.cache = {}
+            self.reloads += 1
+            self._mtimes = self._source_mtimes()
+            self._checked = time.monotonic()
+            return self.policy
+
+    def _current(self) -> tuple[CompiledPolicy, dict[tuple[str, str, str], Decision]]:
+        """The policy and its decision cache, reloaded first if a source changed."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked >= RELOAD_CHECK_SECONDS:
+                self._checked = now
+                if self._source_mtimes() != self._mtimes:
+                    logger.info("Security policy sources changed; reloading")
+                    self.reload()
+            return self.policy, self.cache
+
+    def _decide(self, policy: CompiledPolicy, cache: dict, namespace: str, name: str, action: str,
+                replicas: Optional[int] = None) -> Decision:
+        key = (namespace, name, action)
+        decision = cache.get(key)
+        record_cache("policy_decision", decision is not None)
+        if decision is None:
+            decision = policy.evaluate(namespace, name, action)
+            if len(cache) >= self.max_cache_entries:
+                cache.clear()
+            cache[key] = decision
+        if decision[0] and ACTION_ALIASES.get(action, action) == "scale" \
+                and replicas is not None and replicas < policy.min_replicas:
+            return False, policy.min_replicas_reason
+        return decision
+
+    def evaluate(self, namespace: str, name: str, action: str,
+                 replicas: Optional[int] = None) -> Decision:
+        return self._decide(*self._current(), namespace, name, action, replicas)
+
+    def rate_limits(self) -> tuple[int, float]:
+        """(max actions per namespace per minute, per-target cooldown seconds)."""
+        policy, _ = self._current()
+        return policy.max_actions_per_minute, policy.cooldown_seconds
+
+    def evaluate_batch(self, requests: list[tuple]) -> list[Decision]:
+        """Evaluate (namespace, name, action[, replicas]) tuples against one policy snapshot."""
+        policy, cache = self._current()
+        return [self._decide(policy, cache, *request) for request in requests]
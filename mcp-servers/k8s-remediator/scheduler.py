@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Remediation scheduler for the K8sRemediator MCP Server
+Per-target cooldowns, a token bucket per namespace and collapsing of duplicate
+in-flight requests, so repeated handoffs of one action do not thrash a workload
+"""
+
+from typing import Any, Callable, Hashable
+import threading
+import time
+
+# Expired cooldowns are swept once this many targets are tracked
+MAX_COOLDOWN_ENTRIES = 10000
+
+
+class TokenBucket:
+    """Refills continuously; holds at most one minute's worth of tokens."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, now: float, per_minute: int) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        if per_minute <= 0:
+            return 0.0
+        self.tokens = min(per_minute, self.tokens + (now - self.updated) * per_minute / 60)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) * 60 / per_minute
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: dict[str, Any] = {}
+
+
+class RemediationScheduler:
+    """
+    Admits actions in front of the backend.
+
+    Identical requests (same action, target, arguments and dry-run flag) that
+    arrive while one is executing wait for it and receive a copy of its result
+    marked "deduplicated". Real actions are then checked against the target's
+    cooldown and their namespace's token bucket; the cooldown is reserved on
+    admission, so concurrent requests with different arguments cannot both pass,
+    and released again if the action fails. Dry runs are never limited.
+    Rejections return immediately with retry_after_seconds.
+
+    limits returns (max actions per namespace per minute, cooldown seconds) and is
+    read on every admission, so policy reloads apply without a restart.
+    """
+
+    def __init__(self, limits: Callable[[], tuple[int, float]],
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self.clock = clock
+        self.executed = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, _Flight] = {}
+        self._cooldowns: dict[Hashable, float] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def _sweep(self, now: float) -> None:
+        if len(self._cooldowns) >= MAX_COOLDOWN_ENTRIES:
+            self._cooldowns = {t: until for t, until in self._cooldowns.items() if until > now}
+
+    def _admit(self, target: Hashable, namespace: str, now: float):
+        """Under the lock: a rejection, or None after reserving the cooldown and a token."""
+        per_minute, cooldown = self.limits()
+        until = self._cooldowns.get(target, 0.0)
+        if until > now:
+            wait = until - now
+            return {"success": False, "status": "COOLDOWN", "retry_after_seconds": round(wait, 1),
+                    "reason": f"Acted on recently; cooling down for {wait:.0f}s"}
+
+        bucket = self._buckets.get(namespace)
+        if bucket is None:
+            bucket = self._buckets[namespace] = TokenBucket(per_minute, now)
+        wait = bucket.take(now, per_minute)
+        if wait:
+            return {"success": False, "status": "RATE_LIMITED", "retry_after_seconds": round(wait, 1),
+                    "reason": f"More than {per_minute} actions per minute in {namespace}"}
+
+        if cooldown > 0:
+            self._sweep(now)
+            self._cooldowns[target] = now + cooldown
+        return None
+
+    def run(self, key: Hashable, target: Hashable, namespace: str, dry_run: bool,
+            execute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        """Execute once per in-flight key, subject to cooldown and rate limits for real actions."""
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is None:
+                now = self.clock()
+                rejection = None if dry_run else self._admit(target, namespace, now)
+                if rejection is not None:
+                    self.rejected += 1
+                    return rejection
+                flight = self._inflight[key] = _Flight()
+                leader = True
+            else:
+                self.deduplicated += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            return {**flight.result, "deduplicated": True}
+
+        result = {"success": False, "status": "FAILED", "reason": "Action did not complete"}
+        try:
+            result = execute()
+            return result
+        finally:
+            with self._lock:
+                self.executed += 1
+                del self._inflight[key]
+                if not dry_run and not result.get("success"):
+                    # Nothing changed, so the target may be retried straight away
+                    self._cooldowns.pop(target, None)
+            flight.result = result
+            flight.done.set()
+
+    def __len__(self):
+        return len(self._inflight)
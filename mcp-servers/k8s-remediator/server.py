@@ -1,20 +1,91 @@
 #!/usr/bin/env python3
 
 from fastmcp import FastMCP
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Optional
+import asyncio
 import json
-import re
+import os
+import sys
+import threading
+
+# mcp_common sits next to this directory in the repo and next to server.py in the image
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_journal import create_journal_from_env
+from k8s_backend import BackendError, ResourceNotFound, create_backend_from_env
+from mcp_common.instrumentation import record_rows
+from mcp_common.result_cache import cache_tool
+from mcp_common.shaping import budget_bytes, shape_list
+from policy_engine import PolicyEngine, default_config_dir, parse_duration
+from scheduler import RemediationScheduler
+from verification import (DEFAULT_LOG_QUIET_SECONDS, DEFAULT_TIMEOUT_SECONDS, MAX_TIMEOUT_SECONDS,
+                          deployment_check, log_analyzer_search, log_check, pod_replacement_check,
+                          prometheus_query, promql_check, verify)
 
 mcp = FastMCP("k8s-remediator", version="1.0.0")
 
+# DRY_RUN_MODE=true forces every action to be a dry run regardless of the caller
+FORCE_DRY_RUN = os.environ.get("DRY_RUN_MODE", "false").lower() == "true"
+
+backend = create_backend_from_env()
+
+# Upper bound on backend calls in flight across all bulk requests
+BULK_CONCURRENCY = int(os.environ.get("K8S_BULK_CONCURRENCY", "5"))
+MAX_BULK_TARGETS = 100
+
+bulk_executor = ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix="remediate")
+
 SECURITY_BLOCKLIST = {
     "namespaces": ["kube-system", "kube-public", "kube-node-lease"],
     "deployment_patterns": [".*control-plane.*", ".*etcd.*", ".*api-server.*"],
     "min_replicas": 1
 }
 
-audit_log: list[dict[str, Any]] = []
+# Built-in blocklist merged with the registry and remediation agent policies
+policy = PolicyEngine(SECURITY_BLOCKLIST, default_config_dir())
+
+# Cooldowns and per-namespace rate limits follow the remediation agent's rateLimit
+scheduler = RemediationScheduler(policy.rate_limits)
+
+# Persistent when AUDIT_LOG_DIR is set, otherwise a bounded in-memory tail
+audit_log = create_journal_from_env()
+
+
+class TargetLocks:
+    """One lock per (kind, namespace, name), dropped once nobody holds or waits on it."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: dict[tuple, list] = {}
+
+    @contextmanager
+    def hold(self, *key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+target_locks = TargetLocks()
+
+# Condition sources for remediate_and_verify; None when not configured
+PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL")
+LOG_ANALYZER_URL = os.environ.get("LOG_ANALYZER_URL")
+query_prometheus = prometheus_query(PROMETHEUS_URL) if PROMETHEUS_URL else None
+search_logs = log_analyzer_search(LOG_ANALYZER_URL) if LOG_ANALYZER_URL else None
 
 # ---------------- LOG ---------------- #
 
@@ -31,75 +102,333 @@ def log_action(action: str, target: str, result: str, details: dict[str, Any]):
 # ---------------- SECURITY ---------------- #
 
 def check_security_policy(namespace: str, resource_name: str, action: str, **kwargs):
+    return policy.evaluate(namespace, resource_name, action, kwargs.get("replicas"))
 
-    if namespace in SECURITY_BLOCKLIST["namespaces"]:
-        return False, "Protected namespace"
-
-    for pattern in SECURITY_BLOCKLIST["deployment_patterns"]:
-        if re.match(pattern, resource_name):
-            return False, "Protected deployment"
-
-    if action == "scale" and kwargs.get("replicas", 1) < 1:
-        return False, "Cannot scale below 1"
+# ---------------- INTERNAL FUNCTIONS ---------------- #
 
-    return True, "Allowed"
+def _schedule(action: str, kind: str, namespace: str, name: str, dry_run: bool, args: tuple, execute):
+    """Run an allowed action through the scheduler; cooldown and rate-limit rejections are audited."""
+    result = scheduler.run((action, namespace, name, *args, dry_run), (kind, namespace, name),
+                           namespace, dry_run, execute)
+    if result["status"] in ("COOLDOWN", "RATE_LIMITED"):
+        log_action(action, f"{namespace}/{name}", result["status"],
+                   {"retry_after_seconds": result["retry_after_seconds"]})
+    return result
 
-# ---------------- INTERNAL FUNCTIONS ---------------- #
 
-def scale_deployment_impl(namespace: str, name: str, replicas: int, dry_run=True):
+def scale_deployment_impl(namespace: str, name: str, replicas: int, dry_run=True,
+                          decision: Optional[tuple[bool, str]] = None):
 
-    allowed, reason = check_security_policy(namespace, name, "scale", replicas=replicas)
+    allowed, reason = decision or check_security_policy(namespace, name, "scale", replicas=replicas)
 
     if not allowed:
         log_action("scale", f"{namespace}/{name}", "BLOCKED", {"reason": reason})
         return {"success": False, "status": "BLOCKED", "reason": reason}
 
-    log_action("scale", f"{namespace}/{name}", "DRY-RUN", {"replicas": replicas})
+    dry_run = dry_run or FORCE_DRY_RUN
+    return _schedule("scale", "deployment", namespace, name, dry_run, (replicas,),
+                     lambda: _scale_deployment(namespace, name, replicas, dry_run))
+
+
+def _scale_deployment(namespace: str, name: str, replicas: int, dry_run: bool):
+    try:
+        with target_locks.hold("deployment", namespace, name):
+            outcome = backend.scale(namespace, name, replicas, dry_run)
+    except ResourceNotFound as e:
+        log_action("scale", f"{namespace}/{name}", "NOT_FOUND", {"replicas": replicas})
+        return {"success": False, "status": "NOT_FOUND", "reason": str(e)}
+    except BackendError as e:
+        log_action("scale", f"{namespace}/{name}", "FAILED", {"replicas": replicas, "error": str(e)})
+        return {"success": False, "status": "FAILED", "reason": str(e)}
+
+    log_action("scale", f"{namespace}/{name}", "DRY-RUN" if dry_run else "SUCCESS",
+               {"replicas": replicas, "previous_replicas": outcome["previous_replicas"]})
 
+    verb = "Would scale" if dry_run else "Scaled"
     return {
         "success": True,
         "action": "scale_deployment",
         "namespace": namespace,
         "deployment": name,
-        "previous_replicas": 2,
+        "previous_replicas": outcome["previous_replicas"],
         "new_replicas": replicas,
-        "status": "SIMULATED",
-        "message": f"Would scale {name} to {replicas}"
+        "dry_run": dry_run,
+        "status": outcome["status"],
+        "message": f"{verb} {name} to {replicas}"
     }
 
 
-def restart_pod_impl(name: str, namespace="default", dry_run=True):
+def restart_pod_impl(name: str, namespace="default", dry_run=True,
+                     decision: Optional[tuple[bool, str]] = None):
 
-    allowed, reason = check_security_policy(namespace, name, "restart")
+    allowed, reason = decision or check_security_policy(namespace, name, "restart")
 
     if not allowed:
         log_action("restart", f"{namespace}/{name}", "BLOCKED", {"reason": reason})
         return {"success": False, "status": "BLOCKED", "reason": reason}
 
-    log_action("restart", f"{namespace}/{name}", "DRY-RUN", {})
+    dry_run = dry_run or FORCE_DRY_RUN
+    return _schedule("restart", "pod", namespace, name, dry_run, (),
+                     lambda: _restart_pod(namespace, name, dry_run))
 
+
+def _restart_pod(namespace: str, name: str, dry_run: bool):
+    try:
+        with target_locks.hold("pod", namespace, name):
+            outcome = backend.restart_pod(namespace, name, dry_run)
+    except ResourceNotFound as e:
+        log_action("restart", f"{namespace}/{name}", "NOT_FOUND", {})
+        return {"success": False, "status": "NOT_FOUND", "reason": str(e)}
+    except BackendError as e:
+        log_action("restart", f"{namespace}/{name}", "FAILED", {"error": str(e)})
+        return {"success": False, "status": "FAILED", "reason": str(e)}
+
+    log_action("restart", f"{namespace}/{name}", "DRY-RUN" if dry_run else "SUCCESS", {})
+
+    verb = "Would restart" if dry_run else "Restarted"
     return {
         "success": True,
         "action": "restart_pod",
         "namespace": namespace,
         "pod": name,
-        "status": "SIMULATED",
-        "message": f"Would restart {name}"
+        "dry_run": dry_run,
+        "status": outcome["status"],
+        "message": f"{verb} {name}"
     }
 
+# ---------------- BULK ---------------- #
+
+def _split_target(target: str, namespace: str) -> tuple[str, str]:
+    """Accept "name" or "namespace/name"."""
+    if "/" in target:
+        ns, name = target.split("/", 1)
+        return ns, name
+    return namespace, target
+
+
+async def _run_bulk(action: str, calls: list, targets: list[str], dry_run: bool,
+                    max_concurrency: Optional[int]) -> dict[str, Any]:
+    """
+    Run per-target calls on the shared bulk executor, at most max_concurrency at a
+    time for this request. Results keep the order of the input targets.
+    """
+    if len(calls) > MAX_BULK_TARGETS:
+        return {"success": False, "status": "REJECTED",
+                "reason": f"At most {MAX_BULK_TARGETS} targets per call"}
+
+    limit = max(1, min(max_concurrency or BULK_CONCURRENCY, BULK_CONCURRENCY))
+    semaphore = asyncio.Semaphore(limit)
+    loop = asyncio.get_running_loop()
+
+    async def run(call):
+        async with semaphore:
+            try:
+                return await loop.run_in_executor(bulk_executor, call)
+            except Exception as e:
+                return {"success": False, "status": "FAILED", "reason": str(e)}
+
+    results = await asyncio.gather(*[run(call) for call in calls])
+    for target, result in zip(targets, results):
+        result["target"] = target
+
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "success": succeeded == len(results),
+        "action": action,
+        "dry_run": dry_run or FORCE_DRY_RUN,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+def _scale_spec(spec) -> tuple[str, str, int]:
+    """(namespace, name, replicas) of one scale_deployments item; ValueError when malformed."""
+    if not isinstance(spec, dict) or not isinstance(spec.get("name"), str) or not spec["name"]:
+        raise ValueError('Item needs a "name"')
+    replicas = spec.get("replicas")
+    if isinstance(replicas, bool) or not isinstance(replicas, int):
+        raise ValueError('Item needs an integer "replicas"')
+    namespace = spec.get("namespace", "default")
+    if not isinstance(namespace, str):
+        raise ValueError('"namespace" must be a string')
+    return (*_split_target(spec["name"], namespace), replicas)
+
+
+async def scale_deployments_impl(deployments: list[dict[str, Any]], dry_run=True,
+                                 max_concurrency: Optional[int] = None):
+    specs, targets = [], []
+    for i, item in enumerate(deployments):
+        try:
+            spec = _scale_spec(item)
+            targets.append(f"{spec[0]}/{spec[1]}")
+        except ValueError as e:
+            spec = str(e)
+            name = item.get("name") if isinstance(item, dict) else None
+            targets.append(name if isinstance(name, str) and name else f"#{i}")
+        specs.append(spec)
+    valid = [spec for spec in specs if isinstance(spec, tuple)]
+    decisions = iter(policy.evaluate_batch([(ns, name, "scale", replicas) for ns, name, replicas in valid]))
+    calls = []
+    for spec in specs:
+        if isinstance(spec, str):
+            # A malformed item is rejected on its own; the rest of the batch still runs
+            calls.append(lambda reason=spec: {"success": False, "status": "REJECTED", "reason": reason})
+        else:
+            calls.append(lambda ns=spec[0], n=spec[1], r=spec[2], d=next(decisions):
+                         scale_deployment_impl(ns, n, r, dry_run, d))
+    return await _run_bulk("scale_deployments", calls, targets, dry_run, max_concurrency)
+
+
+async def restart_pods_impl(pods: list[str], namespace="default", dry_run=True,
+                            max_concurrency: Optional[int] = None):
+    specs = [_split_target(pod, namespace) for pod in pods]
+    decisions = policy.evaluate_batch([(ns, name, "restart") for ns, name in specs])
+    calls = [lambda ns=ns, n=name, d=d: restart_pod_impl(n, ns, dry_run, d)
+             for (ns, name), d in zip(specs, decisions)]
+    targets = [f"{ns}/{name}" for ns, name in specs]
+    return await _run_bulk("restart_pods", calls, targets, dry_run, max_concurrency)
+
+# ---------------- VERIFY ---------------- #
+
+async def remediate_and_verify_impl(action: str, name: str, namespace: str = "default",
+                                    replicas: Optional[int] = None, promql: Optional[str] = None,
+                                    log_query: Optional[str] = None, log_max_matches: int = 0,
+                                    log_quiet_seconds: float = DEFAULT_LOG_QUIET_SECONDS,
+                                    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS, dry_run=True):
+    if action not in ("scale", "restart"):
+        return {"success": False, "status": "REJECTED", "reason": 'action must be "scale" or "restart"'}
+    if action == "scale" and replicas is None:
+        return {"success": False, "status": "REJECTED", "reason": "scale needs replicas"}
+    if promql and query_prometheus is None:
+        return {"success": False, "status": "REJECTED", "reason": "promql needs PROMETHEUS_URL"}
+    if log_query and search_logs is None:
+        return {"success": False, "status": "REJECTED", "reason": "log_query needs LOG_ANALYZER_URL"}
+
+    started = datetime.now(timezone.utc).timestamp()
+    if action == "scale":
+        result = await asyncio.to_thread(scale_deployment_impl, namespace, name, replicas, dry_run)
+        rollout = deployment_check(backend, namespace, name)
+    else:
+        # Identify the pod being deleted so its replacement can be told apart
+        try:
+            before = await asyncio.to_thread(backend.get_pod, namespace, name)
+        except BackendError:
+            before = None
+        result = await asyncio.to_thread(restart_pod_impl, name, namespace, dry_run)
+        rollout = pod_replacement_check(backend, namespace, name, before)
+
+    if not result["success"] or result["dry_run"]:
+        reason = "dry run" if result.get("dry_run") else "action did not succeed"
+        result["verification"] = {"status": "SKIPPED", "reason": reason}
+        return result
+
+    checks = {"rollout": rollout}
+    if promql:
+        checks["promql"] = promql_check(query_prometheus, promql)
+    if log_query:
+        checks["logs"] = log_check(search_logs, log_query, namespace, log_max_matches, started,
+                                   log_quiet_seconds)
+    verification = await verify(checks, min(timeout_seconds, MAX_TIMEOUT_SECONDS))
+
+    log_action("verify", f"{namespace}/{name}", verification["status"], {
+        "action": action,
+        "attempts": verification["attempts"],
+        "elapsed_seconds": verification["elapsed_seconds"],
+        "checks": {check: state["holds"] for check, state in verification["checks"].items()},
+        **({"promql": promql} if promql else {}),
+        **({"log_query": log_query} if log_query else {})
+    })
+    result["verification"] = verification
+    return result
+
 # ---------------- MCP WRAPPERS ---------------- #
 
+# Backend calls block on the API server, so they run off the event loop and
+# concurrent sessions are not serialised behind one another
+
+@mcp.tool()
+async def scale_deployment(namespace: str, name: str, replicas: int, dry_run=True):
+    return await asyncio.to_thread(scale_deployment_impl, namespace, name, replicas, dry_run)
+
+@mcp.tool()
+async def restart_pod(name: str, namespace="default", dry_run=True):
+    return await asyncio.to_thread(restart_pod_impl, name, namespace, dry_run)
+
 @mcp.tool()
-def scale_deployment(namespace: str, name: str, replicas: int, dry_run=True):
-    return scale_deployment_impl(namespace, name, replicas, dry_run)
+async def scale_deployments(deployments: list[dict[str, Any]], dry_run=True,
+                            max_concurrency: Optional[int] = None):
+    """
+    Scale several deployments; each item has name, replicas and optional namespace.
+    Every real action takes one of its namespace's per-minute rate-limit tokens, so
+    items beyond them come back RATE_LIMITED with retry_after_seconds.
+    """
+    return await scale_deployments_impl(deployments, dry_run, max_concurrency)
 
 @mcp.tool()
-def restart_pod(name: str, namespace="default", dry_run=True):
-    return restart_pod_impl(name, namespace, dry_run)
+async def restart_pods(pods: list[str], namespace="default", dry_run=True,
+                       max_concurrency: Optional[int] = None):
+    """
+    Restart several pods, given as "name" or "namespace/name". Every real restart
+    takes one of its namespace's per-minute rate-limit tokens (10 by default), so
+    pods beyond them come back RATE_LIMITED with retry_after_seconds; dry runs are
+    never limited.
+    """
+    return await restart_pods_impl(pods, namespace, dry_run, max_concurrency)
 
 @mcp.tool()
-def get_audit_log(limit: int = 10):
-    return {"logs": audit_log[-limit:]}
+async def remediate_and_verify(action: str, name: str, namespace: str = "default",
+                               replicas: Optional[int] = None, promql: Optional[str] = None,
+                               log_query: Optional[str] = None, log_max_matches: int = 0,
+                               log_quiet_seconds: float = DEFAULT_LOG_QUIET_SECONDS,
+                               timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS, dry_run=True):
+    """
+    Scale a deployment (action "scale" with replicas) or restart a pod (action
+    "restart"), then wait server-side until the fix is verified: the rollout has
+    completed, the optional promql instant query returns a non-empty result, and
+    log_query matches at most log_max_matches times in the logs written since the
+    action (after log_quiet_seconds). Returns as soon as all conditions hold or
+    after timeout_seconds; the outcome is recorded in the audit log as "verify".
+    Dry runs and failed actions are not verified.
+    """
+    return await remediate_and_verify_impl(action, name, namespace, replicas, promql, log_query,
+                                           log_max_matches, log_quiet_seconds, timeout_seconds, dry_run)
+
+def get_audit_log_impl(limit: int = 10, target: Optional[str] = None, action: Optional[str] = None,
+                       time_range: Optional[str] = None, result: Optional[str] = None,
+                       max_tokens: Optional[int] = None, max_bytes: Optional[int] = None):
+    since = None
+    if time_range:
+        try:
+            since = datetime.now(timezone.utc).timestamp() - parse_duration(time_range)
+        except ValueError:
+            return {"error": f"Invalid time_range: {time_range!r}", "logs": []}
+    logs = audit_log.query(target=target, action=action, since=since, result=result, limit=limit)
+    # Shaped newest first, so that over budget the newest entries are the ones kept
+    response = {"logs": logs[::-1], "returned_entries": len(logs), "total_entries": len(audit_log)}
+    returned = shape_list(response, "logs", budget_bytes(max_tokens, max_bytes))
+    response["logs"].reverse()
+    response["returned_entries"] = returned
+    record_rows(returned=returned)
+    return response
+
+@mcp.tool()
+async def get_audit_log(limit: int = 10, target: Optional[str] = None, action: Optional[str] = None,
+                        time_range: Optional[str] = None, result: Optional[str] = None,
+                        max_tokens: Optional[int] = None, max_bytes: Optional[int] = None):
+    """
+    Recent audit entries, oldest first. Filter by target ("namespace/name" or a bare
+    name), action ("scale", "restart" or "verify"), result, and time_range such as "1h" or "7d".
+    Beyond max_tokens / max_bytes only the newest entries are returned.
+    """
+    return await asyncio.to_thread(get_audit_log_impl, limit, target, action, time_range, result,
+                                   max_tokens, max_bytes)
+
+# Only the read-only audit query is cached; remediation tools always run. The TTL
+# bounds how far a relative time_range can drift while nothing is appended
+cache_tool(mcp, get_audit_log, float(os.environ.get("AUDIT_RESULT_CACHE_TTL", 30)),
+           version=lambda: audit_log.version)
 
 if __name__ == "__main__":
     mcp.run()
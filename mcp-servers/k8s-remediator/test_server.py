@@ -1,26 +1,692 @@
 #!/usr/bin/env python3
+"""
+Test script for K8sRemediator MCP Server
+"""
 
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace as NS
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import server
+import policy_engine
+from audit_journal import AuditJournal
+from policy_engine import PolicyEngine, default_config_dir
+from k8s_backend import SimulatedBackend, create_kubernetes_backend
+from scheduler import RemediationScheduler
 from server import scale_deployment_impl, restart_pod_impl, audit_log
+from server import scale_deployments_impl, restart_pods_impl, get_audit_log_impl, remediate_and_verify_impl
+import verification as verification_module
+from verification import verify
+
+
+# ---------------- FAKE KUBERNETES CLIENT ---------------- #
+
+def fake_deployment(namespace, name, replicas, rv="1", available=None, generation=1):
+    available = replicas if available is None else available
+    return NS(
+        metadata=NS(namespace=namespace, name=name, generation=generation, resource_version=rv,
+                    labels={"app": name}, owner_references=None),
+        spec=NS(replicas=replicas),
+        status=NS(ready_replicas=available, updated_replicas=available,
+                  available_replicas=available, observed_generation=generation)
+    )
+
+
+def fake_pod(namespace, name, owner, rv="1", uid="uid-1", phase="Running", deleting=False):
+    return NS(
+        metadata=NS(namespace=namespace, name=name, uid=uid, resource_version=rv, labels={"app": owner},
+                    owner_references=[NS(kind="ReplicaSet", name=owner)],
+                    deletion_timestamp="2024-01-01T00:00:00Z" if deleting else None),
+        spec=NS(node_name="node-1"),
+        status=NS(phase=phase, container_statuses=[NS(restart_count=3)])
+    )
+
+
+class FakeApiException(Exception):
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class FakeAppsApi:
+    """In-process stand-in for kubernetes.client.AppsV1Api"""
+
+    def __init__(self, deployments):
+        self.deployments = deployments
+        self.calls = []
+
+    def list_deployment_for_all_namespaces(self, **kwargs):
+        self.calls.append(("list",))
+        return NS(metadata=NS(resource_version="10"), items=list(self.deployments))
+
+    def read_namespaced_deployment(self, name, namespace):
+        self.calls.append(("read", namespace, name))
+        raise FakeApiException(404, "Not Found")
+
+    def patch_namespaced_deployment_scale(self, name, namespace, body, **kwargs):
+        self.calls.append(("scale", namespace, name, body["spec"]["replicas"], kwargs.get("dry_run")))
+        if body["spec"]["replicas"] > 50:
+            raise FakeApiException(403, "exceeded quota")
+        return NS(spec=NS(replicas=body["spec"]["replicas"]))
+
+
+class FakeCoreApi:
+    """In-process stand-in for kubernetes.client.CoreV1Api"""
+
+    def __init__(self, pods):
+        self.pods = pods
+        self.calls = []
+
+    def list_pod_for_all_namespaces(self, **kwargs):
+        self.calls.append(("list",))
+        return NS(metadata=NS(resource_version="10"), items=list(self.pods))
+
+    def read_namespaced_pod(self, name, namespace):
+        self.calls.append(("read", namespace, name))
+        raise FakeApiException(404, "Not Found")
+
+    def delete_namespaced_pod(self, name, namespace, **kwargs):
+        self.calls.append(("delete", namespace, name, kwargs.get("dry_run")))
+
+
+def fake_backend():
+    apps = FakeAppsApi([fake_deployment("default", "web-app", 3), fake_deployment("production", "api", 2)])
+    core = FakeCoreApi([fake_pod("default", "web-app-5d7f8c9b4-xyz12", "web-app-5d7f8c9b4")])
+    backend = create_kubernetes_backend(apps, core, watch_stream=None, start=False)
+    backend.deployments.relist()
+    backend.pods.relist()
+    return backend, apps, core
+
+
+class SlowBackend(SimulatedBackend):
+    """Simulated backend that records how many calls overlap, overall and per target"""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = 0
+        self.target_peak = 0
+
+    def _enter(self, key):
+        with self.lock:
+            self.active[key] = self.active.get(key, 0) + 1
+            self.peak = max(self.peak, sum(self.active.values()))
+            self.target_peak = max(self.target_peak, self.active[key])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[key] -= 1
+
+    def scale(self, namespace, name, replicas, dry_run):
+        self._enter((namespace, name))
+        return super().scale(namespace, name, replicas, dry_run)
+
+    def restart_pod(self, namespace, name, dry_run):
+        self._enter((namespace, name))
+        return super().restart_pod(namespace, name, dry_run)
+
+
+# ---------------- TESTS ---------------- #
+
+def test_simulated_backend():
+    """Test scale and restart with the default simulated backend"""
+    print("\n=== Testing scale_deployment ===")
+    result = scale_deployment_impl("default", "web-app", 5)
+    print(result)
+    assert result["success"] == True
+
+    print("\n=== Testing blocked scaling ===")
+    result = scale_deployment_impl("kube-system", "coredns", 3)
+    print(result)
+    assert result["success"] == False
+
+    print("\n=== Testing restart_pod ===")
+    result = restart_pod_impl("app-pod-1234")
+    print(result)
+    assert result["success"] == True
+
+    print("\n=== Testing audit log ===")
+    print(audit_log)
+    print("test_simulated_backend PASSED")
+
+
+def test_kubernetes_backend_dry_run():
+    """Test server-side dry-run through the scale subresource using the informer cache"""
+    print("\n=== Testing Kubernetes backend ===")
+
+    backend, apps, core = fake_backend()
+    server.backend = backend
+    server.scheduler = RemediationScheduler(server.policy.rate_limits)
+    try:
+        result = scale_deployment_impl("default", "web-app", 5, dry_run=True)
+        print(result)
+        assert result["success"] is True
+        assert result["status"] == "DRY-RUN"
+        assert result["previous_replicas"] == 3
+        assert apps.calls[-1] == ("scale", "default", "web-app", 5, "All")
+
+        result = scale_deployment_impl("production", "api", 4, dry_run=False)
+        assert result["status"] == "SCALED"
+        assert apps.calls[-1] == ("scale", "production", "api", 4, None)
+
+        result = restart_pod_impl("web-app-5d7f8c9b4-xyz12", "default", dry_run=True)
+        assert result["status"] == "DRY-RUN"
+        assert core.calls[-1] == ("delete", "default", "web-app-5d7f8c9b4-xyz12", "All")
+
+        # Missing objects are rejected from the cache without any API read
+        result = scale_deployment_impl("default", "missing", 2)
+        assert result["status"] == "NOT_FOUND"
+        result = restart_pod_impl("missing-pod", "default")
+        assert result["status"] == "NOT_FOUND"
+        assert not [c for c in apps.calls + core.calls if c[0] == "read"]
+
+        result = scale_deployment_impl("default", "web-app", 60, dry_run=True)
+        assert result["status"] == "FAILED"
+        assert result["reason"] == "exceeded quota"
+    finally:
+        server.backend = SimulatedBackend()
+
+    print("test_kubernetes_backend_dry_run PASSED")
+
+
+def test_informer_watch_events():
+    """Test the informer applies watch events and relists after errors"""
+    print("\n=== Testing informer ===")
+
+    backend, apps, core = fake_backend()
+    informer = backend.deployments
+
+    attempts = []
+
+    def stream(list_fn, resource_version=None, timeout_seconds=None):
+        attempts.append(resource_version)
+        if len(attempts) == 1:
+            raise FakeApiException(410, "Gone")
+        assert resource_version == "10"
+        yield {"type": "MODIFIED", "object": fake_deployment("default", "web-app", 7, rv="11")}
+        yield {"type": "ADDED", "object": fake_deployment("staging", "worker", 1, rv="12")}
+        yield {"type": "DELETED", "object": fake_deployment("production", "api", 2, rv="13")}
+        informer.stop()
+
+    informer.watch_stream = stream
+    informer.run()
+
+    assert informer.get("default", "web-app")["replicas"] == 7
+    assert informer.get("staging", "worker") is not None
+    assert informer.get("production", "api") is None
+    assert informer.resource_version == "13"
+    # The expired watch forced a second list before watching again
+    assert apps.calls.count(("list",)) == 2
+    print(f"Cached deployments: {[d['name'] for d in informer.list()]}")
+    print("test_informer_watch_events PASSED")
+
+
+def test_bulk_remediation():
+    """Test bulk tools run concurrently under the limit and serialise each target"""
+    print("\n=== Testing bulk remediation ===")
+
+    slow = SlowBackend()
+    server.backend = slow
+    server.scheduler = RemediationScheduler(server.policy.rate_limits)
+    try:
+        pods = [f"web-app-{i}" for i in range(12)] + ["kube-system/coredns", "web-app-0"]
+        logged = len(audit_log)
+        started = time.time()
+        result = asyncio.run(restart_pods_impl(pods, "default", dry_run=True))
+        elapsed = time.time() - started
+        print(f"Restarted {result['succeeded']}/{result['total']} in {elapsed:.2f}s, peak {slow.peak}")
+
+        assert result["total"] == 14
+        assert result["succeeded"] == 13 and result["failed"] == 1
+        assert [r["target"] for r in result["results"]][-2:] == ["kube-system/coredns", "default/web-app-0"]
+        assert result["results"][12]["status"] == "BLOCKED"
+        # Every target is policy-checked and audited
+        assert len(audit_log) - logged == 14
+        assert 1 < slow.peak <= server.BULK_CONCURRENCY
+        assert slow.target_peak == 1
+        assert elapsed < 13 * slow.delay
+
+        slow.peak = 0
+        result = asyncio.run(scale_deployments_impl([
+            {"namespace": "default", "name": "web-app", "replicas": 4},
+            {"name": "default/web-app", "replicas": 6},
+            {"namespace": "production", "name": "api", "replicas": 3},
+            {"namespace": "default", "name": "etcd-backup", "replicas": 2}
+        ], dry_run=False, max_concurrency=2))
+        # The two requests for default/web-app share one cooldown window
+        statuses = [r["status"] for r in result["results"]]
+        assert sorted(statuses[:2]) == ["COOLDOWN", "SIMULATED"]
+        assert statuses[2:] == ["SIMULATED", "BLOCKED"]
+        assert slow.peak <= 2 and slow.target_peak == 1
+        assert slow.replicas[("default", "web-app")] in (4, 6)
+        assert len(server.target_locks) == 0
+
+        # Malformed items are rejected one by one without aborting the batch
+        result = asyncio.run(scale_deployments_impl([
+            {"name": "web-app", "replicas": 3},
+            {"replicas": 2},
+            {"name": "web-app-2"},
+            {"name": "web-app-3", "replicas": "many"}
+        ]))
+        assert [r["status"] for r in result["results"]] == ["SIMULATED", "REJECTED", "REJECTED", "REJECTED"]
+        assert [r["target"] for r in result["results"]] == ["default/web-app", "#1", "web-app-2", "web-app-3"]
+        assert "replicas" in result["results"][2]["reason"]
+        assert result["succeeded"] == 1 and result["failed"] == 3
+
+        result = asyncio.run(restart_pods_impl(["p"] * (server.MAX_BULK_TARGETS + 1)))
+        assert result["status"] == "REJECTED"
+    finally:
+        server.backend = SimulatedBackend()
+
+    print("test_bulk_remediation PASSED")
+
+
+def audit_entry(ts, action, target, result="SUCCESS"):
+    return {"timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "action": action,
+            "target": target, "result": result, "details": {}}
+
+
+def test_audit_journal():
+    """Test segment rotation, retention, batched fsync and indexed lookups survive a restart"""
+    print("\n=== Testing audit journal ===")
+
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        journal = AuditJournal(directory, segment_seconds=3600, retention_seconds=86400,
+                               flush_interval=60, flush_entries=10)
+        # Three days of hourly actions, two per hour, ten minutes into each segment so
+        # that every hour's writes land in one segment whatever the time of the run
+        start = (int(now) // 3600) * 3600 - 3 * 86400 + 600
+        for hour in range(72):
+            ts = start + hour * 3600
+            journal.append(audit_entry(ts, "scale", "production/db" if hour % 12 == 0 else "default/web"))
+            journal.append(audit_entry(ts + 60, "restart", f"default/web-{hour}"))
+        # Within a segment, 20 more writes cost two fsyncs (22 pending / batches of 10)
+        synced = journal.fsyncs
+        for i in range(20):
+            journal.append(audit_entry(ts + 120, "scale", "default/web"))
+        assert journal.fsyncs - synced == 2
+        journal.close()
+
+        files = sorted(os.listdir(directory))
+        print(f"Segments kept: {len(files)}, entries: {len(journal)}")
+        # Only the last day of hourly segments is retained
+        assert 24 <= len(files) <= 26
+        assert len(journal) == 2 * len(files) + 20
+
+        reopened = AuditJournal(directory, segment_seconds=3600, retention_seconds=86400)
+        assert len(reopened) == len(journal)
+        assert reopened[-1]["target"] == "default/web"
+
+        db = reopened.query(target="db", action="scale")
+        assert [e["target"] for e in db] == ["production/db"] * 2
+        assert reopened.query(target="production/db", since=now - 6 * 3600) == []
+        restarts = reopened.query(action="restart", since=now - 4 * 3600, limit=2)
+        assert [e["target"] for e in restarts] == ["default/web-70", "default/web-71"]
+        reopened.close()
+
+        # A crash mid-write leaves a torn line, which is cut off before appending again
+        newest = os.path.join(directory, files[-1])
+        with open(newest, "ab") as f:
+            f.write(b'{"timestamp":"2024-')
+        recovered = AuditJournal(directory, segment_seconds=3600, retention_seconds=86400)
+        recovered.append(audit_entry(ts + 180, "restart", "default/after-crash"))
+        recovered.close()
+        recovered = AuditJournal(directory, segment_seconds=3600, retention_seconds=86400)
+        assert recovered.query(target="after-crash")[0]["target"] == "default/after-crash"
+        assert len(recovered) == len(journal) + 1
+        recovered.close()
+
+    # Without a directory the journal keeps a bounded in-memory tail
+    memory = AuditJournal(recent_entries=5)
+    for i in range(8):
+        memory.append(audit_entry(now, "restart", f"default/pod-{i}"))
+    assert len(memory) == 8
+    assert [e["target"] for e in memory[-2:]] == ["default/pod-6", "default/pod-7"]
+    assert len(memory.query(action="restart")) == 5
+
+    restart_pod_impl("audited-pod", "default")
+    result = get_audit_log_impl(target="audited-pod", action="restart", time_range="1h")
+    assert result["logs"][-1]["target"] == "default/audited-pod"
+    assert "error" in get_audit_log_impl(time_range="soon")
+    print("test_audit_journal PASSED")
+
+
+def test_policy_engine():
+    """Test the merged policy sources, cached decisions, batches and reload on change"""
+    print("\n=== Testing policy engine ===")
+
+    config_dir = default_config_dir()
+    engine = PolicyEngine(server.SECURITY_BLOCKLIST, config_dir)
+    print(f"Policy sources: {engine.policy.sources}")
+    assert len(engine.policy.sources) == 3
+
+    assert engine.evaluate("default", "web-app", "scale", 3) == (True, "Allowed")
+    assert engine.evaluate("kube-system", "coredns", "restart") == (False, "Protected namespace")
+    assert engine.evaluate("default", "etcd-backup", "scale", 2) == (False, "Protected deployment")
+    # From registry.yaml allowedNamespaces and remediation-agent.yaml blockedActions
+    assert engine.evaluate("development", "web-app", "scale", 2)[0] is False
+    assert engine.evaluate("default", "my-control-plane-0", "restart_pod") == (False, "Protected deployment")
+    assert engine.evaluate("default", "web-app", "scale", 0)[0] is False
+
+    decisions = engine.evaluate_batch([("default", "a", "restart"), ("kube-public", "b", "restart"),
+                                       ("staging", "c", "scale", 1), ("staging", "c", "scale", 0)])
+    assert [allowed for allowed, _ in decisions] == [True, False, True, False]
+    assert ("staging", "c", "scale") in engine.cache
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "agents"))
+        agent = os.path.join(directory, "agents", "remediation-agent.yaml")
+        with open(agent, "w") as f:
+            f.write("spec:\n  security:\n    blockedActions:\n      - action: restart_pod\n"
+                    "        conditions:\n          - namespace: payments\n            reason: Frozen\n")
+        # A config directory without the policy files is reported, not silently skipped
+        warnings = []
+        handler = logging.Handler()
+        handler.emit = lambda record: warnings.append(record.getMessage())
+        policy_engine.logger.addHandler(handler)
+        try:
+            PolicyEngine({"namespaces": []}, os.path.join(directory, "missing"))
+        finally:
+            policy_engine.logger.removeHandler(handler)
+        assert any("built-in security policy only" in message for message in warnings)
+
+        engine = PolicyEngine({"namespaces": []}, directory)
+        assert engine.evaluate("payments", "api-1", "restart") == (False, "Frozen")
+        assert engine.evaluate("payments", "api", "scale", 2) == (True, "Allowed")
+
+        with open(agent, "w") as f:
+            f.write("spec: {}\n")
+        os.utime(agent, (time.time() + 10, time.time() + 10))
+        original = policy_engine.RELOAD_CHECK_SECONDS
+        policy_engine.RELOAD_CHECK_SECONDS = 0
+        try:
+            assert engine.evaluate("payments", "api-1", "restart") == (True, "Allowed")
+            # A broken edit keeps the previous policy instead of failing every check
+            with open(agent, "w") as f:
+                f.write("spec:\n  security:\n    blockedActions:\n      - action: scale_deployment\n"
+                        "        conditions:\n          - replicas: many\n")
+            os.utime(agent, (time.time() + 20, time.time() + 20))
+            assert engine.evaluate("payments", "api-2", "restart") == (True, "Allowed")
+        finally:
+            policy_engine.RELOAD_CHECK_SECONDS = original
+        assert engine.reloads == 2
+
+        # Bulk executor threads evaluate while the policy is being reloaded
+        with open(agent, "w") as f:
+            f.write("spec: {}\n")
+
+        def batch(i):
+            if i % 10 == 0:
+                engine.reload()
+            return engine.evaluate_batch([("payments", f"api-{i}", "restart"), ("staging", "c", "scale", 0)])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batches = list(pool.map(batch, range(200)))
+        assert all(decisions[0] == (True, "Allowed") and decisions[1][0] is False for decisions in batches)
+        assert engine.reloads == 22
+
+    # Patterns that are valid alone but cannot share one alternation are matched one by one
+    engine = PolicyEngine({"deployment_patterns": ["(?i).*etcd.*", "(?P<db>pg)-.*", "(?P<db>mysql)-.*"]})
+    assert engine.evaluate("default", "ETCD-backup", "scale", 2) == (False, "Protected deployment")
+    assert engine.evaluate("default", "mysql-0", "restart") == (False, "Protected deployment")
+    assert engine.evaluate("default", "web-app", "restart") == (True, "Allowed")
+
+    print("test_policy_engine PASSED")
+
+
+def test_remediate_and_verify():
+    """Test actions are verified server-side with backoff against rollout, PromQL and log conditions"""
+    print("\n=== Testing remediate_and_verify ===")
+
+    # Backoff doubles up to the cap and the deadline cuts the last sleep short
+    now = [0.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    calls = []
+
+    async def settles():
+        calls.append(now[0])
+        return len(calls) >= 4, {"calls": len(calls)}
+
+    async def broken():
+        raise ConnectionError("prometheus unreachable")
+
+    result = asyncio.run(verify({"rollout": settles}, timeout=60, clock=lambda: now[0], sleep=fake_sleep))
+    assert result["status"] == "VERIFIED" and result["attempts"] == 4
+    assert sleeps == [1.0, 2.0, 4.0]
+
+    sleeps.clear()
+    now[0] = 0.0
+    result = asyncio.run(verify({"promql": broken}, timeout=20, max_interval=8,
+                                clock=lambda: now[0], sleep=fake_sleep))
+    print(result)
+    assert result["status"] == "TIMED_OUT" and result["attempts"] == 6
+    assert sleeps == [1.0, 2.0, 4.0, 8.0, 5.0]
+    assert result["checks"]["promql"] == {"holds": False, "error": "prometheus unreachable"}
+
+    backend, apps, core = fake_backend()
+    server.backend = backend
+    server.scheduler = RemediationScheduler(server.policy.rate_limits)
+    original = server.query_prometheus, server.search_logs
+    try:
+        # The scale rollout completes while the error-rate condition still fails
+        backend.deployments.apply({"type": "MODIFIED", "object": fake_deployment(
+            "default", "web-app", 5, rv="20", available=3, generation=2)})
+        queries = []
+
+        async def query(promql):
+            queries.append(promql)
+            if len(queries) == 1:
+                backend.deployments.apply({"type": "MODIFIED", "object": fake_deployment(
+                    "default", "web-app", 5, rv="21", generation=2)})
+                return []
+            return [{"metric": {}, "value": [0, "0.01"]}]
+
+        server.query_prometheus = query
+        result = asyncio.run(remediate_and_verify_impl("scale", "web-app", "default", replicas=5,
+                                                       promql="rate(errors[1m]) < 0.1", dry_run=False))
+        print(result["verification"])
+        assert result["success"] is True and result["status"] == "SCALED"
+        assert result["verification"]["status"] == "VERIFIED"
+        assert result["verification"]["attempts"] == 2
+        assert result["verification"]["checks"]["rollout"]["available_replicas"] == 5
+        entry = audit_log[-1]
+        assert (entry["action"], entry["target"], entry["result"]) == ("verify", "default/web-app", "VERIFIED")
+        assert entry["details"]["checks"] == {"rollout": True, "promql": True}
+
+        # A restarted pod is verified once it is gone, its deployment is available and errors
+        # since the action stay within the limit. The pages are shaped to fewer entries
+        # than matched, so the count comes from the level summary
+        searches = []
+        started = time.time()
+
+        async def search(log_query, since, namespace, max_results):
+            searches.append((log_query, since, namespace, max_results))
+            if len(searches) == 1:
+                backend.pods.apply({"type": "DELETED", "object": fake_pod(
+                    "default", "web-app-5d7f8c9b4-xyz12", "web-app-5d7f8c9b4", rv="22")})
+                return {"match_count": 12, "truncated": True, "summary": {"levels": {"ERROR": 31}}}
+            return {"match_count": 12, "truncated": True, "summary": {"levels": {"ERROR": 18, "WARN": 2}}}
+
+        server.search_logs = search
+        result = asyncio.run(remediate_and_verify_impl("restart", "web-app-5d7f8c9b4-xyz12", "default",
+                                                       log_query="connection refused", log_max_matches=30,
+                                                       log_quiet_seconds=0, dry_run=False))
+        verification = result["verification"]
+        assert result["status"] == "RESTARTED"
+        assert verification["status"] == "VERIFIED" and verification["attempts"] == 2
+        assert verification["checks"]["rollout"]["deployment"] == "web-app"
+        assert verification["checks"]["logs"]["matches"] == 20
+        query, since, namespace, max_results = searches[0]
+        assert (query, namespace, max_results) == ("connection refused", "default", 31)
+        # An absolute start, since log-analyzer anchors relative ranges at its newest line
+        assert started - 1 <= datetime.fromisoformat(since).timestamp() <= time.time()
+
+        # Without a summary, a truncated page counts as over the limit
+        check = verification_module.log_check(
+            lambda *args: asyncio.sleep(0, {"match_count": 3, "truncated": True}), "oom", "default", 5, started, 0)
+        holds, detail = asyncio.run(check())
+        assert holds is False and detail["matches"] == 6
+
+        # Nothing to verify after a dry run or a blocked action; unusable conditions are rejected up front
+        result = asyncio.run(remediate_and_verify_impl("scale", "web-app", "default", replicas=4))
+        assert result["status"] == "DRY-RUN" and result["verification"]["status"] == "SKIPPED"
+        result = asyncio.run(remediate_and_verify_impl("restart", "coredns", "kube-system", dry_run=False))
+        assert result["status"] == "BLOCKED" and result["verification"]["status"] == "SKIPPED"
+        server.query_prometheus = None
+        result = asyncio.run(remediate_and_verify_impl("scale", "web-app", replicas=2, promql="up"))
+        assert result["status"] == "REJECTED"
+        assert asyncio.run(remediate_and_verify_impl("drain", "node-1"))["status"] == "REJECTED"
+
+        # Timing out is recorded as well
+        backend.deployments.apply({"type": "MODIFIED", "object": fake_deployment(
+            "production", "api", 4, rv="23", available=1, generation=3)})
+        result = asyncio.run(remediate_and_verify_impl("scale", "api", "production", replicas=4,
+                                                       timeout_seconds=0, dry_run=False))
+        assert result["verification"]["status"] == "TIMED_OUT"
+        assert audit_log[-1]["result"] == "TIMED_OUT"
+    finally:
+        server.backend = SimulatedBackend()
+        server.query_prometheus, server.search_logs = original
+
+    # The simulated backend recreates restarted pods under a new uid
+    result = asyncio.run(remediate_and_verify_impl("restart", "app-pod-1234", dry_run=False))
+    assert result["verification"]["status"] == "VERIFIED"
+    assert result["verification"]["checks"]["rollout"]["pod"] == "recreated"
+    print("test_remediate_and_verify PASSED")
+
+
+def test_remediation_scheduler():
+    """Test duplicate requests collapse, targets cool down and namespaces are rate limited"""
+    print("\n=== Testing remediation scheduler ===")
+
+    # Limits come from the remediation agent's rateLimit and follow policy reloads
+    assert server.policy.rate_limits() == (10, 60.0)
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "agents"))
+        with open(os.path.join(directory, "agents", "remediation-agent.yaml"), "w") as f:
+            f.write("spec:\n  security:\n    rateLimit:\n      maxActionsPerMinute: 3\n"
+                    "      cooldownPeriod: 2m\n")
+        assert PolicyEngine({}, directory).rate_limits() == (3, 120.0)
+
+    now = [0.0]
+    scheduler = RemediationScheduler(lambda: (3, 60.0), clock=lambda: now[0])
+    release = threading.Event()
+    executions = []
+
+    def execute(success=True):
+        executions.append(1)
+        release.wait(5)
+        return {"success": success, "status": "SCALED" if success else "FAILED"}
+
+    # A burst of identical handoffs runs once; followers get the leader's result
+    key, target = ("scale", "default", "app-1", 5, False), ("deployment", "default", "app-1")
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        futures = [pool.submit(scheduler.run, key, target, "default", False, execute) for _ in range(50)]
+        while scheduler.deduplicated < 49:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+    print(f"Executed {scheduler.executed}, deduplicated {scheduler.deduplicated}")
+    assert len(executions) == 1 and scheduler.executed == 1
+    assert all(r["status"] == "SCALED" for r in results)
+    assert sum(1 for r in results if r.get("deduplicated")) == 49
+    assert len(scheduler) == 0
+
+    # The same target cools down, even for different arguments; dry runs are never limited
+    result = scheduler.run(("scale", "default", "app-1", 6, False), target, "default", False, execute)
+    assert result["status"] == "COOLDOWN" and result["retry_after_seconds"] == 60.0
+    assert scheduler.run(("scale", "default", "app-1", 6, True), target, "default", True, execute)["success"]
+    now[0] = 61.0
+    assert scheduler.run(key, target, "default", False, execute)["success"]
+
+    # A failed action frees its target at once
+    other = ("deployment", "default", "app-2")
+    assert scheduler.run(("scale",), other, "default", False, lambda: execute(False))["status"] == "FAILED"
+    assert scheduler.run(("scale", 2), other, "default", False, execute)["success"]
+
+    # Three real actions per minute per namespace, failed ones included, are used up since t=61
+    result = scheduler.run(("scale", 3), ("deployment", "default", "app-3"), "default", False, execute)
+    assert result["status"] == "RATE_LIMITED" and result["retry_after_seconds"] == 20.0
+    assert scheduler.run(("scale", 3), ("deployment", "staging", "app-3"), "staging", False, execute)["success"]
+    now[0] += 20.0
+    assert scheduler.run(("scale", 3), ("deployment", "default", "app-3"), "default", False, execute)["success"]
+
+    # Through the server: hundreds of handoffs of one action reach the backend once
+    slow = SlowBackend(delay=0.2)
+    server.backend = slow
+    server.scheduler = RemediationScheduler(server.policy.rate_limits)
+    try:
+        logged = len(audit_log)
+
+        async def handoffs():
+            return await asyncio.gather(*[server.scale_deployment("default", "checkout", 4, dry_run=False)
+                                          for _ in range(300)])
+
+        started = time.time()
+        results = asyncio.run(handoffs())
+        elapsed = time.time() - started
+        statuses = [r["status"] for r in results]
+        print(f"300 handoffs in {elapsed:.2f}s: {statuses.count('SIMULATED')} executed or shared, "
+              f"{statuses.count('COOLDOWN')} cooling down")
+        assert slow.replicas == {("default", "checkout"): 4}
+        assert set(statuses) <= {"SIMULATED", "COOLDOWN"}
+        assert sum(1 for r in results if r["status"] == "SIMULATED" and not r.get("deduplicated")) == 1
+        assert server.scheduler.executed == 1
+        assert elapsed < 10 * slow.delay
+        # One SUCCESS entry plus one per rejected handoff
+        entries = audit_log[logged - len(audit_log):]
+        assert [e["result"] for e in entries].count("SUCCESS") == 1
+        assert [e["result"] for e in entries].count("COOLDOWN") == statuses.count("COOLDOWN")
 
-print("Testing K8sRemediator MCP Server")
-print("="*50)
+        result = asyncio.run(remediate_and_verify_impl("scale", "checkout", "default", replicas=5, dry_run=False))
+        assert result["status"] == "COOLDOWN" and result["verification"]["status"] == "SKIPPED"
 
-print("\n=== Testing scale_deployment ===")
-result = scale_deployment_impl("default", "web-app", 5)
-print(result)
-assert result["success"] == True
+        # A bulk call spends one token per target: twenty real restarts in one namespace
+        # run ten and rate limit the rest, while a dry run of the same pods is not limited
+        server.scheduler = RemediationScheduler(server.policy.rate_limits)
+        pods = [f"worker-{i}" for i in range(20)]
+        assert asyncio.run(restart_pods_impl(pods, "default", dry_run=True))["succeeded"] == 20
+        result = asyncio.run(restart_pods_impl(pods, "default", dry_run=False))
+        statuses = [r["status"] for r in result["results"]]
+        assert result["succeeded"] == 10 and statuses.count("RATE_LIMITED") == 10
+        assert all(r["retry_after_seconds"] > 0 for r in result["results"] if r["status"] == "RATE_LIMITED")
+    finally:
+        server.backend = SimulatedBackend()
 
-print("\n=== Testing blocked scaling ===")
-result = scale_deployment_impl("kube-system", "coredns", 3)
-print(result)
-assert result["success"] == False
+    print("test_remediation_scheduler PASSED")
 
-print("\n=== Testing restart_pod ===")
-result = restart_pod_impl("app-pod-1234")
-print(result)
-assert result["success"] == True
 
-print("\n=== Testing audit log ===")
-print(audit_log)
+if __name__ == "__main__":
+    print("Testing K8sRemediator MCP Server")
+    print("=" * 50)
 
-print("\nALL TESTS PASSED")
+    try:
+        test_simulated_backend()
+        test_kubernetes_backend_dry_run()
+        test_informer_watch_events()
+        test_bulk_remediation()
+        test_audit_journal()
+        test_policy_engine()
+        test_remediate_and_verify()
+        test_remediation_scheduler()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
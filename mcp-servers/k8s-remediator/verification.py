@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Post-action verification for the K8sRemediator MCP Server
+Polls rollout status and caller-supplied PromQL and log conditions with backoff
+until all of them hold or a deadline passes
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import time
+
+# A check returns (holds, detail) and is polled until it holds
+Check = Callable[[], Awaitable[tuple[bool, dict[str, Any]]]]
+
+DEFAULT_TIMEOUT_SECONDS = 90.0
+MAX_TIMEOUT_SECONDS = 600.0
+
+# First poll interval, doubled after every round that does not verify
+INITIAL_INTERVAL_SECONDS = 1.0
+MAX_INTERVAL_SECONDS = 15.0
+
+# A log condition needs at least this much quiet time after the action before it holds
+DEFAULT_LOG_QUIET_SECONDS = 30.0
+
+DEFAULT_REQUEST_TIMEOUT = 10.0
+
+
+# ---------------- ROLLOUT ---------------- #
+
+def rollout_complete(deployment: dict[str, Any]) -> bool:
+    """The controller has seen the latest spec and every desired replica is updated and available."""
+    replicas = deployment["replicas"] or 0
+    return ((deployment["observed_generation"] or 0) >= (deployment["generation"] or 0)
+            and deployment["updated_replicas"] >= replicas
+            and deployment["available_replicas"] >= replicas
+            and deployment["ready_replicas"] >= replicas)
+
+
+def _rollout_detail(deployment: dict[str, Any]) -> dict[str, Any]:
+    return {key: deployment[key] for key in ("replicas", "updated_replicas", "ready_replicas",
+                                             "available_replicas")}
+
+
+def deployment_check(backend, namespace: str, name: str) -> Check:
+    """Holds once the deployment's rollout is complete."""
+    async def check():
+        deployment = await asyncio.to_thread(backend.get_deployment, namespace, name)
+        if deployment is None:
+            return False, {"reason": f"Deployment {namespace}/{name} not found"}
+        return rollout_complete(deployment), _rollout_detail(deployment)
+    return check
+
+
+def owning_deployment(owner: Optional[str]) -> Optional[str]:
+    """Deployment name behind a "ReplicaSet/<deployment>-<pod-template-hash>" owner."""
+    if not owner or not owner.startswith("ReplicaSet/") or "-" not in owner:
+        return None
+    return owner.split("/", 1)[1].rsplit("-", 1)[0]
+
+
+def pod_replacement_check(backend, namespace: str, name: str, before: Optional[dict[str, Any]]) -> Check:
+    """
+    Holds once the deleted pod has been replaced: a pod recreated under the same
+    name (StatefulSet) is Running with a new uid, and a ReplicaSet pod's deployment
+    is back to full availability. A pod without an owner only has to be gone.
+    """
+    deployment_name = owning_deployment((before or {}).get("owner"))
+
+    async def check():
+        pod = await asyncio.to_thread(backend.get_pod, namespace, name)
+        if pod is not None:
+            replaced = (before is not None and pod.get("uid") != before.get("uid")
+                        and pod["phase"] == "Running" and not pod.get("terminating"))
+            return replaced, {"pod": "recreated" if replaced else "terminating", "phase": pod["phase"]}
+        if deployment_name is None:
+            return True, {"pod": "deleted"}
+        deployment = await asyncio.to_thread(backend.get_deployment, namespace, deployment_name)
+        if deployment is None:
+            return True, {"pod": "deleted"}
+        return rollout_complete(deployment), {"pod": "deleted", "deployment": deployment_name,
+                                              **_rollout_detail(deployment)}
+    return check
+
+
+# ---------------- CONDITIONS ---------------- #
+
+def promql_check(query: Callable[[str], Awaitable[list]], promql: str) -> Check:
+    """Holds while the instant query returns a non-empty vector, e.g. `rate(errors[1m]) < 0.1`."""
+    async def check():
+        result = await query(promql)
+        values = [item.get("value", [None, None])[1] for item in result]
+        return bool(result), {"query": promql, "series": len(result), "values": values[:5]}
+    return check
+
+
+def log_check(search: Callable[..., Awaitable[dict]], log_query: str, namespace: str, max_matches: int,
+              started: float, quiet_seconds: float = DEFAULT_LOG_QUIET_SECONDS,
+              clock: Callable[[], float] = time.time) -> Check:
+    """
+    Holds once at least quiet_seconds have passed since the action and the logs
+    timestamped at or after it match log_query at most max_matches times.
+    """
+    since = datetime.fromtimestamp(started, timezone.utc).isoformat()
+
+    async def check():
+        response = await search(log_query, since, namespace, max_matches + 1)
+        if "error" in response:
+            raise ValueError(response["error"])
+        # The level summary counts every match on the page, including entries the
+        # response budget left out of "logs" (which lowers match_count)
+        levels = (response.get("summary") or {}).get("levels")
+        if levels is not None:
+            matches = sum(levels.values())
+        else:
+            # Without a summary a truncated page means more matches than were counted
+            matches = response.get("match_count", 0)
+            if response.get("truncated"):
+                matches = max(matches, max_matches + 1)
+        holds = clock() - started >= quiet_seconds and matches <= max_matches
+        return holds, {"query": log_query, "since": since, "matches": matches}
+    return check
+
+
+def prometheus_query(base_url: str, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> Callable[[str], Awaitable[list]]:
+    """Instant queries against /api/v1/query, uncached so every poll sees fresh samples."""
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("httpx module is not installed. Install it using: pip install httpx")
+
+    async def query(promql: str) -> list:
+        async with httpx.AsyncClient(base_url=base_url.rstrip("/"), timeout=timeout) as client:
+            response = await client.get("/api/v1/query", params={"query": promql})
+        body = response.json()
+        if body.get("status") != "success":
+            raise ValueError(body.get("error") or f"HTTP {response.status_code}")
+        data = body["data"]
+        if data.get("resultType") == "vector":
+            return data["result"]
+        # Scalars hold when non-zero, so `vector(...)` style conditions also work
+        value = data["result"][1] if data.get("resultType") == "scalar" else None
+        return [{"value": data["result"]}] if value not in (None, "0") else []
+    return query
+
+
+def log_analyzer_search(url: str, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> Callable[..., Awaitable[dict]]:
+    """Calls search_logs on the LogAnalyzer MCP server."""
+    from fastmcp import Client
+
+    async def search(log_query: str, since: str, namespace: str, max_results: int) -> dict:
+        async with Client(url, timeout=timeout) as client:
+            result = await client.call_tool("search_logs", {
+                "query": log_query, "since": since, "namespace": namespace, "max_results": max_results
+            })
+        return result.structured_content or {}
+    return search
+
+
+# ---------------- POLLING ---------------- #
+
+async def verify(checks: dict[str, Check], timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 initial_interval: float = INITIAL_INTERVAL_SECONDS,
+                 max_interval: float = MAX_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep) -> dict[str, Any]:
+    """
+    Run every check concurrently each round, backing off between rounds, and
+    return as soon as all of them hold in the same round or the deadline passes.
+    A check that raises counts as not holding for that round.
+    """
+    started = clock()
+    deadline = started + max(0.0, timeout)
+    interval = initial_interval
+    attempts = 0
+    while True:
+        attempts += 1
+        results = await asyncio.gather(*(check() for check in checks.values()), return_exceptions=True)
+        state = {}
+        for name, result in zip(checks, results):
+            if isinstance(result, Exception):
+                state[name] = {"holds": False, "error": str(result) or type(result).__name__}
+            else:
+                holds, detail = result
+                state[name] = {"holds": bool(holds), **detail}
+        if all(s["holds"] for s in state.values()):
+            status = "VERIFIED"
+            break
+        remaining = deadline - clock()
+        if remaining <= 0:
+            status = "TIMED_OUT"
+            break
+        await sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+    return {
+        "status": status,
+        "attempts": attempts,
+        "elapsed_seconds": round(clock() - started, 3),
+        "checks": state
+    }
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Streaming anomaly engine for the LogAnalyzer MCP Server
+Keeps per-pattern and per-template, per-namespace counts in time-bucket ring buffers
+with EWMA baselines
+"""
+
+from datetime import datetime, timezone
+from math import sqrt
+from typing import Iterable, Optional
+
+from log_index import parse_timestamp
+from log_sources import LogEntry
+from multi_pattern import MultiPatternMatcher
+from template_miner import TemplateMiner
+
+DEFAULT_BUCKET_SECONDS = 60
+DEFAULT_WINDOW_BUCKETS = 60
+DEFAULT_ALPHA = 0.2
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_MIN_COUNT = 2
+
+# Counts are roughly Poisson, so the baseline deviation never drops below sqrt(mean)
+# and a quiet baseline is treated as if it averaged at least this many per bucket
+_MIN_BASELINE_MEAN = 0.5
+
+# Namespace key that aggregates every namespace
+ALL_NAMESPACES = "*"
+
+TEMPLATE_SORTS = ("spiking", "new", "count")
+
+
+def _bucket_time(bucket: int, bucket_seconds: float) -> str:
+    return datetime.fromtimestamp(bucket * bucket_seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class RollingCounter:
+    """
+    Event counts for the last `size` time buckets.
+
+    When a bucket closes its count is scored against the EWMA mean and variance of
+    the buckets before it, then folded into the baseline. Adding an event is O(1);
+    moving to a new bucket closes at most `size` buckets.
+    """
+
+    __slots__ = ("size", "alpha", "head", "counts", "buckets", "scores", "baselines",
+                 "samples", "mean", "var", "total")
+
+    def __init__(self, size: int, alpha: float, origin: int):
+        self.size = size
+        self.alpha = alpha
+        self.head = origin
+        self.counts = [0] * size
+        self.buckets = [-1] * size
+        self.scores = [0.0] * size
+        self.baselines = [0.0] * size
+        self.samples: list[Optional[str]] = [None] * size
+        self.mean = 0.0
+        self.var = 0.0
+        self.total = 0
+        self.buckets[origin % size] = origin
+
+    def zscore(self, count: float) -> float:
+        floor = sqrt(max(self.mean, _MIN_BASELINE_MEAN))
+        return (count - self.mean) / max(sqrt(self.var), floor)
+
+    def _fold(self, count: float) -> None:
+        diff = count - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+    def _close(self, slot: int) -> None:
+        self.scores[slot] = self.zscore(self.counts[slot])
+        self.baselines[slot] = self.mean
+        self._fold(self.counts[slot])
+
+    def _reset(self, bucket: int) -> int:
+        slot = bucket % self.size
+        self.counts[slot] = 0
+        self.buckets[slot] = bucket
+        self.samples[slot] = None
+        return slot
+
+    def advance(self, bucket: int) -> None:
+        """Close the head bucket and every empty bucket up to `bucket`."""
+        if bucket <= self.head:
+            return
+        self._close(self.head % self.size)
+        first_visible = max(self.head + 1, bucket - self.size + 1)
+        # Empty buckets that scroll out of the window unseen only decay the baseline
+        for _ in range(min(first_visible - self.head - 1, self.size)):
+            self._fold(0)
+        for b in range(first_visible, bucket):
+            self._close(self._reset(b))
+        self._reset(bucket)
+        self.head = bucket
+
+    def add(self, bucket: int, message: str) -> None:
+        self.total += 1
+        if bucket > self.head:
+            self.advance(bucket)
+        elif bucket <= self.head - self.size:
+            return  # Too late for the window; only the cumulative total changes
+        slot = bucket % self.size
+        if self.buckets[slot] != bucket:
+            return
+        self.counts[slot] += 1
+        if self.samples[slot] is None:
+            self.samples[slot] = message
+
+    def window(self) -> Iterable[tuple[int, int, float, float, Optional[str]]]:
+        """Yield (bucket, count, zscore, baseline, sample) oldest to newest."""
+        for b in range(self.head - self.size + 1, self.head + 1):
+            slot = b % self.size
+            if self.buckets[slot] != b:
+                continue
+            if b == self.head:
+                yield b, self.counts[slot], self.zscore(self.counts[slot]), self.mean, self.samples[slot]
+            else:
+                yield b, self.counts[slot], self.scores[slot], self.baselines[slot], self.samples[slot]
+
+
+class AnomalyEngine:
+    """
+    Long-lived anomaly state fed one log entry at a time.
+    Each observed entry is matched against all tracked patterns in one pass and
+    assigned a message template, and updates a fixed number of counters, so
+    reports are answered from current state.
+    """
+
+    def __init__(self, bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+                 window_buckets: int = DEFAULT_WINDOW_BUCKETS, alpha: float = DEFAULT_ALPHA,
+                 z_threshold: float = DEFAULT_Z_THRESHOLD, min_count: int = DEFAULT_MIN_COUNT,
+                 miner: Optional[TemplateMiner] = None):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.patterns: list[str] = []
+        self.matcher = MultiPatternMatcher([])
+        self.counters: dict[tuple[int, str], RollingCounter] = {}
+        self.miner = miner or TemplateMiner()
+        self.template_counters: dict[tuple[int, str], RollingCounter] = {}
+        # template id -> [first bucket, last bucket] it was seen in
+        self.template_buckets: dict[int, list[int]] = {}
+        self.lines: dict[str, int] = {}
+        self.origin: Optional[int] = None
+        self.head: Optional[int] = None
+        self._last_timestamp = None
+        self._last_bucket = 0
+
+    def _bucket(self, timestamp: str) -> int:
+        if timestamp != self._last_timestamp:
+            ts = parse_timestamp(timestamp) if timestamp else 0.0
+            self._last_timestamp = timestamp
+            self._last_bucket = int(ts // self.bucket_seconds)
+        return self._last_bucket
+
+    def untracked(self, patterns: Iterable[str]) -> list[str]:
+        known = {p.upper() for p in self.patterns}
+        new = []
+        for pattern in patterns:
+            if pattern.upper() not in known:
+                known.add(pattern.upper())
+                new.append(pattern)
+        return new
+
+    def track(self, patterns: Iterable[str]) -> list[str]:
+        """Start tracking patterns; returns the ones that were not tracked yet."""
+        new = self.untracked(patterns)
+        if new:
+            self.patterns.extend(new)
+            self.matcher = MultiPatternMatcher(self.patterns)
+        return new
+
+    def _counter(self, index: int, namespace: str, bucket: int,
+                 counters: Optional[dict] = None) -> RollingCounter:
+        counters = self.counters if counters is None else counters
+        counter = counters.get((index, namespace))
+        if counter is None:
+            # Start at the first observed bucket so quiet periods count towards the baseline
+            start = bucket if self.origin is None else min(self.origin, bucket)
+            counter = RollingCounter(self.window_buckets, self.alpha,
+                                     max(start, bucket - self.window_buckets + 1))
+            counters[(index, namespace)] = counter
+        return counter
+
+    def _observe_template(self, entry: LogEntry, namespace: str, bucket: int) -> None:
+        template = self.miner.add(entry.message)
+        if template is None:
+            return
+        self._counter(template.id, namespace, bucket, self.template_counters).add(bucket, entry.message)
+        self._counter(template.id, ALL_NAMESPACES, bucket, self.template_counters).add(bucket, entry.message)
+        seen = self.template_buckets.get(template.id)
+        if seen is None:
+            self.template_buckets[template.id] = [bucket, bucket]
+        else:
+            seen[0] = min(seen[0], bucket)
+            seen[1] = max(seen[1], bucket)
+
+    def observe(self, entry: LogEntry, matcher: Optional[MultiPatternMatcher] = None,
+                offset: int = 0) -> None:
+        """
+        Fold one entry into the counters. A narrower matcher and pattern offset are
+        used when backfilling newly tracked patterns from history.
+        """
+        bucket = self._bucket(entry.timestamp)
+        namespace = entry.namespace or ""
+        if matcher is None:
+            matcher = self.matcher
+            if self.origin is None:
+                self.origin = bucket
+            if self.head is None or bucket > self.head:
+                self.head = bucket
+            self.lines[namespace] = self.lines.get(namespace, 0) + 1
+            self.lines[ALL_NAMESPACES] = self.lines.get(ALL_NAMESPACES, 0) + 1
+            self._observe_template(entry, namespace, bucket)
+        for hit in matcher.match(entry.raw.upper()):
+            index = offset + hit
+            self._counter(index, namespace, bucket).add(bucket, entry.message)
+            self._counter(index, ALL_NAMESPACES, bucket).add(bucket, entry.message)
+
+    def backfill(self, entries: Iterable[LogEntry], patterns: list[str]) -> None:
+        """Replay history for patterns added by track() after ingestion began."""
+        offset = len(self.patterns) - len(patterns)
+        matcher = MultiPatternMatcher(patterns)
+        for entry in entries:
+            self.observe(entry, matcher, offset)
+
+    def _namespace_counters(self, counters: dict, index: int,
+                            namespace: Optional[str]) -> list[RollingCounter]:
+        """Counters for namespace, plus the one for entries without a namespace label."""
+        key = namespace if namespace is not None else ALL_NAMESPACES
+        found = [counters.get((index, key))]
+        if namespace is not None and key != "":
+            found.append(counters.get((index, "")))
+        return [c for c in found if c is not None]
+
+    def report(self, pattern: str, threshold: float, namespace: Optional[str] = None) -> dict:
+        """Summarise one tracked pattern from current state."""
+        key = namespace if namespace is not None else ALL_NAMESPACES
+        index = self.pattern_index(pattern)
+        total_logs = self.lines.get(key, 0)
+        if namespace is not None and key != "":
+            total_logs += self.lines.get("", 0)
+
+        counters = []
+        if index is not None:
+            counters = self._namespace_counters(self.counters, index, namespace)
+
+        spikes = []
+        pattern_count = 0
+        for counter in counters:
+            if self.head is not None:
+                counter.advance(self.head)
+            pattern_count += counter.total
+            spikes.extend(self._spikes(counter))
+        spikes.sort(key=lambda s: s["start_time"])
+
+        frequency = pattern_count / total_logs if total_logs > 0 else 0
+        is_anomaly = frequency >= threshold
+
+        severity = "high" if is_anomaly else "normal"
+        if spikes:
+            severity = "critical"
+
+        return {
+            "pattern": pattern,
+            "threshold": threshold,
+            "frequency": round(frequency, 3),
+            "occurrence_count": pattern_count,
+            "total_logs_analyzed": total_logs,
+            "is_anomaly": is_anomaly,
+            "severity": severity,
+            "spikes_detected": len(spikes),
+            "spike_details": spikes,
+            "bucket_seconds": self.bucket_seconds,
+            "recommendation": f"Investigate {pattern} pattern - detected {len(spikes)} spike(s)" if spikes else "No anomalous behavior detected",
+            "analysis_timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    def series(self, key: int, namespace: Optional[str] = None, buckets: Optional[int] = None,
+               templates: bool = False) -> list[int]:
+        """
+        Per-bucket counts of a tracked pattern (or, with templates, a template id)
+        for the last `buckets` buckets up to the head, oldest first. Buckets that
+        have scrolled out of the window count as 0.
+        """
+        buckets = min(buckets or self.window_buckets, self.window_buckets)
+        counts = [0] * buckets
+        if self.head is None:
+            return counts
+        first = self.head - buckets + 1
+        for counter in self._namespace_counters(self.template_counters if templates else self.counters,
+                                                key, namespace):
+            counter.advance(self.head)
+            for bucket, count, _, _, _ in counter.window():
+                if bucket >= first:
+                    counts[bucket - first] += count
+        return counts
+
+    def pattern_index(self, pattern: str) -> Optional[int]:
+        folded = pattern.upper()
+        return next((i for i, p in enumerate(self.patterns) if p.upper() == folded), None)
+
+    def top_templates(self, namespace: Optional[str] = None, sort: str = "spiking", limit: int = 10,
+                      new_within_buckets: Optional[int] = None) -> list[dict]:
+        """
+        Rank message templates without any pattern: "spiking" puts templates with the
+        strongest spikes in the window first, "new" lists templates first seen in the
+        last new_within_buckets buckets (newest first), and "count" ranks by volume.
+        """
+        if sort not in TEMPLATE_SORTS:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {list(TEMPLATE_SORTS)}")
+        new_within = new_within_buckets if new_within_buckets is not None else max(1, self.window_buckets // 4)
+
+        rows = []
+        for template in self.miner.templates:
+            counters = self._namespace_counters(self.template_counters, template.id, namespace)
+            if not counters:
+                continue
+            count = 0
+            spikes = []
+            for counter in counters:
+                if self.head is not None:
+                    counter.advance(self.head)
+                count += counter.total
+                spikes.extend(self._spikes(counter))
+            spikes.sort(key=lambda s: s["start_time"])
+            first, last = self.template_buckets[template.id]
+            # Templates present from the first bucket are not "new", however recent the source
+            is_new = self.head is not None and first > self.origin and first > self.head - new_within
+            rows.append({
+                "template_id": template.id,
+                "template": template.text,
+                "count": count,
+                "first_seen": _bucket_time(first, self.bucket_seconds),
+                "last_seen": _bucket_time(last + 1, self.bucket_seconds),
+                "is_new": is_new,
+                "spikes_detected": len(spikes),
+                "peak_zscore": max((s["peak_zscore"] for s in spikes), default=0.0),
+                "latest_spike": spikes[-1] if spikes else None,
+                "_first": first
+            })
+
+        if sort == "spiking":
+            rows = [r for r in rows if r["spikes_detected"]]
+            rows.sort(key=lambda r: (-r["peak_zscore"], -r["count"]))
+        elif sort == "new":
+            rows = [r for r in rows if r["is_new"]]
+            rows.sort(key=lambda r: (-r["_first"], -r["count"]))
+        else:
+            rows.sort(key=lambda r: -r["count"])
+        rows = rows[:limit]
+        for row in rows:
+            del row["_first"]
+        return rows
+
+    def _spikes(self, counter: RollingCounter) -> list[dict]:
+        """Merge consecutive buckets whose count deviates from the baseline into spikes."""
+        spikes = []
+        current = None
+        for bucket, count, score, baseline, sample in counter.window():
+            if count >= self.min_count and score >= self.z_threshold:
+                if current and current["_last"] == bucket - 1:
+                    current["end_time"] = _bucket_time(bucket + 1, self.bucket_seconds)
+                    current["occurrence_count"] += count
+                    current["peak_zscore"] = max(current["peak_zscore"], round(score, 2))
+                    current["_last"] = bucket
+                    continue
+                current = {
+                    "start_time": _bucket_time(bucket, self.bucket_seconds),
+                    "end_time": _bucket_time(bucket + 1, self.bucket_seconds),
+                    "occurrence_count": count,
+                    "baseline_per_bucket": round(baseline, 3),
+                    "peak_zscore": round(score, 2),
+                    "sample_message": sample,
+                    "_last": bucket
+                }
+                spikes.append(current)
+        for spike in spikes:
+            del spike["_last"]
+        return spikes
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Multi-pod log fan-out for the LogAnalyzer MCP Server
+Lists the pods matching a label selector across namespaces, reads their logs
+concurrently under a connection limit and merges them in timestamp order
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+import heapq
+import os
+import re
+import time
+
+from log_index import parse_timestamp
+from log_sources import LogEntry, LogSource, iter_lines, open_log_file, parse_lines, read_chunks, rotated_files
+
+# Pods whose logs are read at the same time (API connections or open files)
+DEFAULT_CONCURRENCY = 8
+
+# How long a pod listing from the API is reused before the source counts as changed
+DEFAULT_REFRESH_SECONDS = 30.0
+
+# Per-pod file with the pod's labels, in the downward API format: key="value" per line
+LABELS_FILE = "labels"
+
+_SET_REQUIREMENT = re.compile(r"^\s*(!?)\s*([\w./-]+)\s*(?:(notin|in)\s*\(([^)]*)\))?\s*$")
+
+
+class PodRef(NamedTuple):
+    namespace: str
+    name: str
+    labels: dict = {}
+
+
+# ---------------- LABEL SELECTORS ---------------- #
+
+def _split_selector(selector: str) -> list[str]:
+    """Split on commas that are not inside an "in (...)" value list."""
+    parts, depth, current = [], 0, ""
+    for ch in selector:
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_selector(selector: Optional[str]) -> list[Callable[[dict], bool]]:
+    """
+    Compile a Kubernetes label selector ("app=web,tier!=cache,env in (prod,stage),!canary")
+    into one predicate per requirement. Raises ValueError for malformed selectors.
+    """
+    requirements = []
+    for part in _split_selector(selector or ""):
+        for op in ("!=", "==", "="):
+            if op in part and "(" not in part:
+                key, value = (s.strip() for s in part.split(op, 1))
+                if not key:
+                    raise ValueError(f"Invalid label selector: {selector!r}")
+                if op == "!=":
+                    requirements.append(lambda labels, k=key, v=value: labels.get(k) != v)
+                else:
+                    requirements.append(lambda labels, k=key, v=value: labels.get(k) == v)
+                break
+        else:
+            match = _SET_REQUIREMENT.match(part)
+            if not match or (match.group(1) and match.group(3)):
+                raise ValueError(f"Invalid label selector: {selector!r}")
+            negate, key, op, values = match.groups()
+            if op:
+                allowed = {v.strip() for v in values.split(",") if v.strip()}
+                if op == "in":
+                    requirements.append(lambda labels, k=key, a=allowed: labels.get(k) in a)
+                else:
+                    requirements.append(lambda labels, k=key, a=allowed: labels.get(k) not in a)
+            elif negate:
+                requirements.append(lambda labels, k=key: k not in labels)
+            else:
+                requirements.append(lambda labels, k=key: k in labels)
+    return requirements
+
+
+def matches_selector(labels: dict, selector: Optional[str]) -> bool:
+    return all(requirement(labels) for requirement in parse_selector(selector))
+
+
+# ---------------- POD BACKENDS ---------------- #
+
+class PodDirectory:
+    """
+    Pod logs on disk, laid out as root/<namespace>/<pod>/ holding the pod's
+    (rotated, possibly gzipped) *.log files and an optional labels file.
+    """
+
+    name = "directory"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _read_labels(self, pod_dir: str) -> dict:
+        labels = {}
+        try:
+            with open(os.path.join(pod_dir, LABELS_FILE), encoding="utf-8") as f:
+                for line in f:
+                    key, sep, value = line.strip().partition("=")
+                    if sep:
+                        labels[key.strip()] = value.strip().strip('"')
+        except FileNotFoundError:
+            pass
+        return labels
+
+    def list_pods(self, namespaces: Optional[list[str]], selector: Optional[str]) -> list[PodRef]:
+        pods = []
+        for namespace in namespaces if namespaces is not None else sorted(os.listdir(self.root)):
+            ns_dir = os.path.join(self.root, namespace)
+            if not os.path.isdir(ns_dir):
+                continue
+            for name in sorted(os.listdir(ns_dir)):
+                pod_dir = os.path.join(ns_dir, name)
+                if not os.path.isdir(pod_dir):
+                    continue
+                labels = self._read_labels(pod_dir)
+                if matches_selector(labels, selector):
+                    pods.append(PodRef(namespace, name, labels))
+        return pods
+
+    def _lines(self, pod: PodRef) -> Iterator[str]:
+        for path in rotated_files(self.pod_path(pod)):
+            with open_log_file(path) as f:
+                yield from iter_lines(read_chunks(f))
+
+    def pod_path(self, pod: PodRef) -> str:
+        return os.path.join(self.root, pod.namespace, pod.name)
+
+    def read_lines(self, pod: PodRef, tail_lines: Optional[int] = None) -> Iterable[str]:
+        lines = self._lines(pod)
+        return deque(lines, maxlen=tail_lines) if tail_lines else lines
+
+    def version(self, pods: list[PodRef]):
+        signature = []
+        for pod in pods:
+            for path in rotated_files(self.pod_path(pod)):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature.append((path, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return (tuple(pods), tuple(signature))
+
+
+class KubernetesPods:
+    """
+    Pod logs from the API server. The API cannot say whether a log has grown, so
+    the version advances every refresh_seconds and the index is rebuilt then.
+    """
+
+    name = "kubernetes"
+
+    def __init__(self, core_api, container: Optional[str] = None,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        self.core_api = core_api
+        self.container = container
+        self.refresh_seconds = refresh_seconds
+
+    def list_pods(self, namespaces: Optional[list[str]], selector: Optional[str]) -> list[PodRef]:
+        kwargs = {"label_selector": selector} if selector else {}
+        if namespaces is not None:
+            items = [pod for namespace in namespaces
+                     for pod in self.core_api.list_namespaced_pod(namespace, **kwargs).items]
+        else:
+            items = self.core_api.list_pod_for_all_namespaces(**kwargs).items
+        return [PodRef(pod.metadata.namespace, pod.metadata.name, dict(pod.metadata.labels or {}))
+                for pod in items]
+
+    def read_lines(self, pod: PodRef, tail_lines: Optional[int] = None) -> Iterable[str]:
+        kwargs = {}
+        if self.container:
+            kwargs["container"] = self.container
+        if tail_lines:
+            kwargs["tail_lines"] = tail_lines
+        try:
+            text = self.core_api.read_namespaced_pod_log(pod.name, pod.namespace, **kwargs)
+        except Exception as e:
+            # Pods that are still starting (or already gone) have no log to read
+            if getattr(e, "status", None) in (400, 404):
+                return []
+            raise
+        return (text or "").splitlines()
+
+    def pod_path(self, pod: PodRef) -> Optional[str]:
+        """API logs have no file to tail."""
+        return None
+
+    def version(self, pods: list[PodRef]):
+        return (tuple(pods), int(time.monotonic() // self.refresh_seconds))
+
+
+def create_kubernetes_pods(core_api=None, **kwargs) -> KubernetesPods:
+    """Build a KubernetesPods backend from in-cluster config or KUBECONFIG."""
+    if core_api is None:
+        try:
+            from kubernetes import client, config
+        except ImportError:
+            raise ImportError("kubernetes module is not installed. Install it using: pip install kubernetes")
+        try:
+            config.load_incluster_config()
+        except config.ConfigException:
+            config.load_kube_config()
+        core_api = client.CoreV1Api()
+    return KubernetesPods(core_api, **kwargs)
+
+
+# ---------------- FAN-OUT SOURCE ---------------- #
+
+def merge_entries(streams: Iterable[Iterable[LogEntry]]) -> Iterator[LogEntry]:
+    """
+    k-way heap merge of per-pod streams that are each in time order. Entries with
+    equal timestamps keep the order of their streams.
+    """
+    return heapq.merge(*streams, key=lambda entry: parse_timestamp(entry.timestamp))
+
+
+class PodLogSource(LogSource):
+    """
+    Every pod that matches a label selector in the given namespaces (all of them
+    when namespaces is None), as one stream in timestamp order. Each entry
+    carries the namespace and name of the pod it came from.
+
+    Pods are read by at most concurrency threads at a time; tail_lines keeps only
+    the newest lines of each pod, which bounds memory per pod.
+    """
+
+    def __init__(self, pods, namespaces: Optional[list[str]] = None, selector: Optional[str] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, tail_lines: Optional[int] = None):
+        parse_selector(selector)  # Reject a malformed selector up front
+        self.pods = pods
+        self.namespaces = None if namespaces is None else list(namespaces)
+        self.selector = selector
+        self.concurrency = max(1, concurrency)
+        self.tail_lines = tail_lines
+        self.pods_read = 0
+
+    def select(self, namespaces: Optional[list[str]] = None, selector: Optional[str] = None) -> "PodLogSource":
+        """The same pods narrowed to other namespaces and a further label selector."""
+        combined = ",".join(s for s in (self.selector, selector) if s) or None
+        if namespaces is None:
+            namespaces = self.namespaces
+        elif self.namespaces is not None:
+            namespaces = [ns for ns in namespaces if ns in self.namespaces]
+        return PodLogSource(self.pods, namespaces, combined, self.concurrency, self.tail_lines)
+
+    def list_pods(self) -> list[PodRef]:
+        return self.pods.list_pods(self.namespaces, self.selector)
+
+    def read_pod(self, pod: PodRef) -> list[LogEntry]:
+        return list(parse_lines(self.pods.read_lines(pod, self.tail_lines), pod.namespace, pod.name))
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        pods = self.list_pods()
+        if not pods:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pods)),
+                                thread_name_prefix="log-fanout") as pool:
+            streams = list(pool.map(self.read_pod, pods))
+        self.pods_read += len(pods)
+        yield from merge_entries(streams)
+
+    def tail_paths(self) -> list[tuple[str, Optional[str], Optional[str]]]:
+        paths = []
+        for pod in self.list_pods():
+            path = self.pods.pod_path(pod)
+            if path is None:
+                return []
+            paths.append((path, pod.namespace, pod.name))
+        return paths
+
+    def version(self):
+        return self.pods.version(self.list_pods())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Inverted log index for the LogAnalyzer MCP Server
+Keeps token postings in time-bucketed segments so searches only verify candidate lines
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Optional
+import heapq
+import re
+import time
+
+from log_sources import LogEntry
+
+# Width of each time bucket; one segment holds the entries of one bucket
+DEFAULT_BUCKET_SECONDS = 300
+
+# Oldest segments are evicted once the index holds more rows than this
+DEFAULT_MAX_ROWS = 1_000_000
+
+_TOKEN = re.compile(r"\w+")
+_TIME_RANGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+# How a literal token must relate to the indexed tokens of a line
+EXACT, PREFIX, SUFFIX, CONTAINS = "exact", "prefix", "suffix", "contains"
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Convert "YYYY-MM-DD HH:MM:SS" to epoch seconds (UTC); 0.0 when unparseable."""
+    try:
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def parse_time_range(time_range: Optional[str]) -> Optional[float]:
+    """Convert "30s", "5m", "1h", "2d" or "1w" to seconds; None means unbounded."""
+    match = _TIME_RANGE.match(time_range or "")
+    if not match:
+        return None
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+
+
+# ---------------- QUERY PLANNING ---------------- #
+
+def literal_prefix(pattern: str) -> str:
+    """
+    Return the literal text every match of the regex must start with.
+    Alternations and leading groups or classes yield "" (no usable prefix).
+    """
+    if "|" in pattern:
+        return ""
+    out = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                out.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        if ch in _REGEX_META:
+            if ch in "*?{" and out:
+                out.pop()  # The preceding character is optional
+            break
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def literal_terms(literal: str) -> list[tuple[str, str]]:
+    """
+    Split a literal into (token, mode) constraints. Tokens cut off at either end
+    of the literal may be part of a longer indexed token, so they only need to
+    be a prefix, suffix or substring of one.
+    """
+    terms = []
+    literal = literal.lower()
+    for match in _TOKEN.finditer(literal):
+        starts_token = match.start() > 0
+        ends_token = match.end() < len(literal)
+        if starts_token and ends_token:
+            mode = EXACT
+        elif starts_token:
+            mode = PREFIX
+        elif ends_token:
+            mode = SUFFIX
+        else:
+            mode = CONTAINS
+        terms.append((match.group(), mode))
+    return terms
+
+
+def compile_query(query: str) -> tuple[Callable[[str], object], list[tuple[str, str]]]:
+    """
+    Build a line verifier and the index terms any matching line must contain.
+    Queries that are not valid regexes fall back to a case-insensitive substring.
+    """
+    try:
+        verify = re.compile(query, re.IGNORECASE).search
+        literal = literal_prefix(query)
+    except re.error:
+        needle = query.lower()
+        verify = lambda line: needle in line.lower()
+        literal = query
+    return verify, literal_terms(literal)
+
+
+# ---------------- SEGMENTS ---------------- #
+
+class Segment:
+    """
+    Entries of one time bucket with token, level and namespace postings.
+    A segment accepts entries until seal() is called and is immutable afterwards.
+    seq numbers segments in creation order, which breaks ties between a bucket's
+    segment and the extra ones opened for late entries.
+    """
+
+    def __init__(self, bucket_start: float, bucket_seconds: float, seq: int = 0):
+        self.bucket_start = bucket_start
+        self.seq = seq
+        self.bucket_end = bucket_start + bucket_seconds
+        self.min_ts = float("inf")
+        self.max_ts = float("-inf")
+        self.entries: list[LogEntry] = []
+        self.timestamps = array("d")
+        self.postings: dict[str, list[int]] = {}
+        self.levels: dict[str, list[int]] = {}
+        self.namespaces: dict[str, list[int]] = {}
+        self.vocabulary: list[str] = []
+        self.sealed = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, entry: LogEntry, ts: float) -> None:
+        if self.sealed:
+            raise ValueError("Cannot add entries to a sealed segment")
+        row = len(self.entries)
+        self.entries.append(entry)
+        self.timestamps.append(ts)
+        self.min_ts = min(self.min_ts, ts)
+        self.max_ts = max(self.max_ts, ts)
+        for token in set(tokenize(entry.raw)):
+            self.postings.setdefault(token, []).append(row)
+        self.levels.setdefault(entry.level.upper(), []).append(row)
+        self.namespaces.setdefault(entry.namespace or "", []).append(row)
+
+    def seal(self) -> "Segment":
+        if not self.sealed:
+            self.postings = {token: array("I", rows) for token, rows in self.postings.items()}
+            self.levels = {level: array("I", rows) for level, rows in self.levels.items()}
+            self.namespaces = {ns: array("I", rows) for ns, rows in self.namespaces.items()}
+            self.vocabulary = sorted(self.postings)
+            self.sealed = True
+        return self
+
+    def _vocabulary(self) -> list[str]:
+        return self.vocabulary if self.sealed else sorted(self.postings)
+
+    def term_rows(self, term: str, mode: str) -> set[int]:
+        if mode == EXACT:
+            return set(self.postings.get(term, ()))
+        vocabulary = self._vocabulary()
+        if mode == PREFIX:
+            start = bisect_left(vocabulary, term)
+            matched = []
+            for token in vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                matched.append(token)
+        elif mode == SUFFIX:
+            matched = [token for token in vocabulary if token.endswith(term)]
+        else:
+            matched = [token for token in vocabulary if term in token]
+        rows: set[int] = set()
+        for token in matched:
+            rows.update(self.postings[token])
+        return rows
+
+    def candidates(self, terms: list[tuple[str, str]], since: Optional[float],
+                   level: Optional[str], namespace: Optional[str], start_row: int = 0) -> Iterator[int]:
+        """Yield row numbers from start_row on, in order, that satisfy every term and facet."""
+        constraints: list[set[int]] = []
+        if level:
+            constraints.append(set(self.levels.get(level.upper(), ())))
+        if namespace is not None:
+            constraints.append(set(self.namespaces.get(namespace, ())) | set(self.namespaces.get("", ())))
+        for term, mode in terms:
+            constraints.append(self.term_rows(term, mode))
+
+        if constraints:
+            constraints.sort(key=len)
+            rows = constraints[0].intersection(*constraints[1:])
+            ordered = sorted(rows)
+            if start_row:
+                ordered = ordered[bisect_left(ordered, start_row):]
+        else:
+            ordered = range(start_row, len(self.entries))
+
+        if since is None or self.min_ts >= since:
+            yield from ordered
+        else:
+            timestamps = self.timestamps
+            for row in ordered:
+                if timestamps[row] >= since:
+                    yield row
+
+
+# ---------------- INDEX ---------------- #
+
+class LogIndex:
+    """
+    Incrementally maintained inverted index over log entries.
+    Entries are routed to the segment of their time bucket; a segment is sealed
+    as soon as a newer bucket starts, and late entries open an extra segment.
+
+    With a store (a log_store.ColumnStore), every sealed segment is also written
+    to disk, and ranges evicted from memory are searched there.
+    """
+
+    def __init__(self, bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+                 max_rows: int = DEFAULT_MAX_ROWS, store=None):
+        self.bucket_seconds = bucket_seconds
+        self.max_rows = max_rows
+        self.store = store
+        self.segments: list[Segment] = []
+        self.open_segments: dict[float, Segment] = {}
+        self.row_count = 0
+        self.max_ts = float("-inf")
+        self.evicted_before: Optional[float] = None
+        self._next_seq = store.next_seq if store is not None else 0
+
+    def add(self, entry: LogEntry) -> None:
+        ts = parse_timestamp(entry.timestamp) if entry.timestamp else 0.0
+        bucket = ts - ts % self.bucket_seconds
+        segment = self.open_segments.get(bucket)
+        if segment is None:
+            segment = Segment(bucket, self.bucket_seconds, self._next_seq)
+            self._next_seq += 1
+            self.open_segments[bucket] = segment
+            self.segments.append(segment)
+            self.segments.sort(key=lambda s: s.bucket_start)
+            for older in [b for b in self.open_segments if b < bucket]:
+                self._seal(self.open_segments.pop(older))
+        segment.add(entry, ts)
+        self.row_count += 1
+        self.max_ts = max(self.max_ts, ts)
+        if self.row_count > self.max_rows:
+            self._evict()
+
+    def ingest(self, entries) -> int:
+        count = 0
+        for entry in entries:
+            self.add(entry)
+            count += 1
+        return count
+
+    def _seal(self, segment: Segment) -> None:
+        if not segment.sealed:
+            segment.seal()
+            if self.store is not None and len(segment):
+                self.store.write(segment)
+
+    def seal(self) -> None:
+        for segment in self.open_segments.values():
+            self._seal(segment)
+        self.open_segments.clear()
+
+    def _evict(self) -> None:
+        while self.row_count > self.max_rows and len(self.segments) > 1:
+            oldest = self.segments.pop(0)
+            if self.open_segments.get(oldest.bucket_start) is oldest:
+                del self.open_segments[oldest.bucket_start]
+            self._seal(oldest)
+            self.row_count -= len(oldest)
+            if self.evicted_before is None or oldest.bucket_end > self.evicted_before:
+                self.evicted_before = oldest.bucket_end
+
+    def since(self, time_range: Optional[str], now: Optional[float] = None) -> Optional[float]:
+        """
+        Start of a relative time range, counted back from now (the current time by
+        default). Replayed logs pass now=self.max_ts to count back from the newest
+        indexed entry instead.
+        """
+        seconds = parse_time_range(time_range)
+        if seconds is None or now == float("-inf"):
+            return None
+        return (time.time() if now is None else now) - seconds
+
+    def _in_memory(self, since: Optional[float]) -> bool:
+        return self.evicted_before is None or (since is not None and since >= self.evicted_before)
+
+    def covers(self, since: Optional[float]) -> bool:
+        """Whether every entry newer than `since` is still held by the index or its store."""
+        return self._in_memory(since) or (self.store is not None and self.store.covers(since))
+
+    def search(self, query: str, since: Optional[float] = None, level: Optional[str] = None,
+               namespace: Optional[str] = None, stats: Optional[dict] = None) -> Iterator[LogEntry]:
+        """
+        Yield matching entries in time order, pruning segments older than `since`.
+        When given, stats["scanned"] counts the candidate rows that were verified.
+        """
+        for _, entry in self.search_from(query, since, level, namespace, None, stats):
+            yield entry
+
+    def search_from(self, query: str, since: Optional[float] = None, level: Optional[str] = None,
+                    namespace: Optional[str] = None, start: Optional[tuple] = None,
+                    stats: Optional[dict] = None) -> Iterator[tuple[tuple, LogEntry]]:
+        """
+        Like search(), but yields (position, entry) and resumes at a position taken
+        from an earlier search. A position is (bucket_start, segment seq, row); rows
+        added to a still-open segment after the position are picked up too.
+        Segments evicted from memory are read back from the store.
+        """
+        if self.store is not None and not self._in_memory(since):
+            resident = frozenset((s.bucket_start, s.seq) for s in self.segments)
+            yield from heapq.merge(
+                self.store.search_from(query, since, level, namespace, start, stats, resident),
+                self._search_memory(query, since, level, namespace, start, stats),
+                key=lambda match: match[0]
+            )
+        else:
+            yield from self._search_memory(query, since, level, namespace, start, stats)
+
+    def _search_memory(self, query: str, since: Optional[float], level: Optional[str],
+                       namespace: Optional[str], start: Optional[tuple],
+                       stats: Optional[dict]) -> Iterator[tuple[tuple, LogEntry]]:
+        verify, terms = compile_query(query)
+        resume = tuple(start[:2]) if start is not None else None
+        for segment in list(self.segments):
+            if since is not None and segment.max_ts < since:
+                continue
+            start_row = 0
+            if resume is not None:
+                key = (segment.bucket_start, segment.seq)
+                if key < resume:
+                    continue
+                if key == resume:
+                    start_row = start[2]
+            entries = segment.entries
+            for row in segment.candidates(terms, since, level, namespace, start_row):
+                if stats is not None:
+                    stats["scanned"] += 1
+                if verify(entries[row].raw):
+                    yield (segment.bucket_start, segment.seq, row), entries[row]
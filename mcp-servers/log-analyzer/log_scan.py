@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Parallel log scanning for the LogAnalyzer MCP Server
+Shards a source by file across a process pool and merges matches in source order
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+import logging
+import multiprocessing
+import os
+import threading
+
+from log_index import compile_query, parse_timestamp
+from log_sources import LogEntry, LogSource
+
+logger = logging.getLogger("log-analyzer")
+
+
+def scan_entries(entries: Iterable[LogEntry], query: str, since: Optional[float],
+                 namespace: Optional[str], level: Optional[str]) -> Iterator[LogEntry]:
+    """Filter a stream of entries by namespace (None for all), level, time and query."""
+    verify, _ = compile_query(query)
+    for entry in entries:
+        if namespace is not None and entry.namespace is not None and entry.namespace != namespace:
+            continue
+        if level and entry.level.upper() != level.upper():
+            continue
+        if since is not None and parse_timestamp(entry.timestamp) < since:
+            continue
+        if verify(entry.raw):
+            yield entry
+
+
+def scan_shard(shard: LogSource, query: str, since: Optional[float], namespace: Optional[str],
+               level: Optional[str], limit: int) -> list[LogEntry]:
+    """Worker entry point: the first limit matches in one shard."""
+    return list(islice(scan_entries(shard.iter_entries(), query, since, namespace, level), limit))
+
+
+class ScanPool:
+    """
+    Runs full scans on a lazily started process pool, one task per shard.
+
+    Results are merged in shard order, so the output matches a sequential scan,
+    and shards after the one that fills the limit are cancelled. Sources with a
+    single shard are scanned in the calling thread.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.tasks_submitted = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: the server process runs threads, which fork does not copy safely
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def scan(self, source: LogSource, query: str, since: Optional[float], namespace: Optional[str],
+             level: Optional[str], limit: int) -> list[LogEntry]:
+        shards = source.shards()
+        if len(shards) < 2 or self.workers < 2:
+            return scan_shard(source, query, since, namespace, level, limit)
+
+        futures = []
+        try:
+            pool = self._pool()
+            futures = [pool.submit(scan_shard, shard, query, since, namespace, level, limit)
+                       for shard in shards]
+            self.tasks_submitted += len(futures)
+            matches: list[LogEntry] = []
+            for future in futures:
+                matches.extend(future.result())
+                if len(matches) >= limit:
+                    break
+            return matches[:limit]
+        except BrokenProcessPool:
+            logger.warning("Scan worker pool died; scanning in-process")
+            self.shutdown()
+            return scan_shard(source, query, since, namespace, level, limit)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
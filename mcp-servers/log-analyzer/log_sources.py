@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Log sources for the LogAnalyzer MCP Server
+Streams parsed log entries from sample data or rotated/gzipped log files
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Optional
+import glob
+import gzip
+import os
+import re
+
+# Size of each read() on a log file; lines are re-assembled across chunk boundaries
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Matches logrotate suffixes: "app.log.1", "app.log.2.gz", "app.log-20240214.gz"
+_ROTATED_SUFFIX = re.compile(r"^(?:\.(\d+)|-(\d{8,10}))?(\.gz)?$")
+
+
+class LogEntry(NamedTuple):
+    timestamp: str
+    level: str
+    message: str
+    raw: str
+    namespace: Optional[str] = None
+    pod: Optional[str] = None
+
+
+# ---------------- PIPELINE STAGES ---------------- #
+
+def read_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield fixed-size text chunks from an open file."""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split a stream of chunks into lines without holding more than one chunk."""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                yield line.rstrip("\r")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def split_line(line: str) -> tuple[Optional[str], Optional[str], str]:
+    """
+    (timestamp, level, message) of a "<date> <time> <LEVEL> <message>" line;
+    timestamp and level are None for a continuation line.
+    """
+    parts = line.split(None, 3)
+    if len(parts) >= 3 and parts[0][:1].isdigit():
+        return parts[0] + " " + parts[1], parts[2], parts[3] if len(parts) > 3 else ""
+    return None, None, line.strip()
+
+
+def parse_lines(lines: Iterable[str], namespace: Optional[str] = None,
+                pod: Optional[str] = None, timestamp: str = "", level: str = "") -> Iterator[LogEntry]:
+    """
+    Parse "<date> <time> <LEVEL> <message>" lines into LogEntry tuples.
+
+    Lines that do not follow the format (stack traces, wrapped messages) are
+    treated as continuations and inherit the previous entry's timestamp and level;
+    timestamp and level seed them when parsing resumes in the middle of a file.
+    """
+    for line in lines:
+        stamp, severity, message = split_line(line)
+        if stamp is not None:
+            timestamp, level = stamp, severity
+        yield LogEntry(timestamp, level, message, line, namespace, pod)
+
+
+# ---------------- SOURCES ---------------- #
+
+class LogSource:
+    """Base class for anything that can stream LogEntry tuples."""
+
+    # Recorded lines rather than live ones: relative time ranges count back from the
+    # newest line instead of from the current time
+    replay = False
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        raise NotImplementedError
+
+    def version(self):
+        """Value that changes whenever the underlying data changes."""
+        raise NotImplementedError
+
+    def shards(self) -> list["LogSource"]:
+        """Independent, picklable pieces that together yield iter_entries(), in order."""
+        return [self]
+
+    def tail_paths(self) -> list[tuple[str, Optional[str], Optional[str]]]:
+        """(path, namespace, pod) of every file group that can be tailed; empty if none can."""
+        return []
+
+
+class SampleLogSource(LogSource):
+    """Serves an in-memory list of raw log lines."""
+
+    replay = True
+
+    def __init__(self, lines: list[str], namespace: Optional[str] = None):
+        self.lines = lines
+        self.namespace = namespace
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        return parse_lines(self.lines, self.namespace)
+
+    def version(self):
+        return (id(self.lines), len(self.lines))
+
+
+def _rotation_key(path: str, base: str):
+    match = _ROTATED_SUFFIX.match(path[len(base):])
+    if not match or not (match.group(1) or match.group(2)):
+        return (1, 0)  # The live file is always the newest
+    if match.group(1):
+        return (0, -int(match.group(1)))  # app.log.3 is older than app.log.1
+    return (0, int(match.group(2)))  # app.log-20240213 is older than app.log-20240214
+
+
+def rotated_files(path: str) -> list[str]:
+    """
+    Resolve a file, directory or glob into log files ordered oldest to newest,
+    grouping each live file with its rotated and gzipped predecessors.
+    """
+    if os.path.isdir(path):
+        candidates = glob.glob(os.path.join(path, "*.log*"))
+    elif any(ch in path for ch in "*?["):
+        candidates = glob.glob(path)
+    else:
+        candidates = glob.glob(glob.escape(path) + "*")
+
+    groups: dict[str, list[str]] = {}
+    for candidate in candidates:
+        if not os.path.isfile(candidate):
+            continue
+        base = re.sub(r"(?:\.\d+|-\d{8,10})?(?:\.gz)?$", "", candidate)
+        groups.setdefault(base, []).append(candidate)
+
+    ordered = []
+    for base in sorted(groups):
+        ordered.extend(sorted(groups[base], key=lambda p: _rotation_key(p, base)))
+    return ordered
+
+
+def open_log_file(path: str):
+    """Open a plain or gzip-compressed log file for text reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+class LogFile(LogSource):
+    """A single (possibly gzipped) log file; the unit of work for parallel scans."""
+
+    def __init__(self, path: str, namespace: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.namespace = namespace
+        self.chunk_size = chunk_size
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        with open_log_file(self.path) as f:
+            yield from parse_lines(iter_lines(read_chunks(f, self.chunk_size)), self.namespace)
+
+    def version(self):
+        stat = os.stat(self.path)
+        return (self.path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class FileLogSource(LogSource):
+    """Streams entries from rotated log files in bounded memory."""
+
+    def __init__(self, path: str, namespace: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.namespace = namespace
+        self.chunk_size = chunk_size
+
+    def files(self) -> list[str]:
+        return rotated_files(self.path)
+
+    def iter_file(self, path: str) -> Iterator[LogEntry]:
+        return LogFile(path, self.namespace, self.chunk_size).iter_entries()
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        for path in self.files():
+            yield from self.iter_file(path)
+
+    def shards(self) -> list[LogSource]:
+        return [LogFile(path, self.namespace, self.chunk_size) for path in self.files()]
+
+    def tail_paths(self) -> list[tuple[str, Optional[str], Optional[str]]]:
+        return [(self.path, self.namespace, None)]
+
+    def version(self):
+        signature = []
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Columnar on-disk log store for the LogAnalyzer MCP Server
+Compacts sealed index segments into memory-mapped files of int64 timestamps,
+dictionary-encoded levels, namespaces and pods, and lines in compressed blocks,
+so time, level and namespace filters run over the mapped arrays and only the
+rows that survive them are decompressed
+"""
+
+from array import array
+from typing import Iterator, Optional
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from log_index import compile_query
+from log_sources import LogEntry, split_line
+
+try:
+    import numpy as np
+except ImportError:  # Filters fall back to a loop over the mapped arrays
+    np = None
+
+logger = logging.getLogger("log-analyzer")
+
+MAGIC = b"LOGCOL01"
+FORMAT_VERSION = 1
+
+# Lines per compressed block; a query decompresses only the blocks holding surviving rows
+BLOCK_ROWS = 256
+
+# Segment files are deleted oldest first beyond this many bytes
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+SEGMENT_SUFFIX = ".seg"
+MANIFEST = "store.json"
+
+# Magic, then the offset and length of the header, which is written last
+_PREAMBLE = struct.Struct("<8sQQ")
+
+
+def _codes(values: list, dictionary: dict) -> list[int]:
+    return [dictionary.setdefault(value, len(dictionary)) for value in values]
+
+
+def _code_type(size: int) -> str:
+    return "B" if size <= 0xFF else "H" if size <= 0xFFFF else "I"
+
+
+def _pad(f) -> int:
+    offset = f.tell()
+    if offset % 8:
+        f.write(b"\0" * (8 - offset % 8))
+    return f.tell()
+
+
+def write_segment(path: str, segment) -> int:
+    """
+    Write a sealed index segment to path in the columnar format; returns its size.
+    The file is written under a temporary name and renamed, so readers never see
+    a partial segment.
+    """
+    entries = segment.entries
+    levels, namespaces, pods, stamps = {}, {}, {}, {}
+    columns = {
+        "ts": array("q", (round(ts * 1_000_000) for ts in segment.timestamps)),
+        "level": _codes([e.level for e in entries], levels),
+        "namespace": _codes([e.namespace for e in entries], namespaces),
+        "pod": _codes([e.pod for e in entries], pods),
+        "stamp": _codes([e.timestamp for e in entries], stamps),
+    }
+    for name, dictionary in (("level", levels), ("namespace", namespaces), ("pod", pods), ("stamp", stamps)):
+        columns[name] = array(_code_type(len(dictionary)), columns[name])
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, 0, 0))
+        layout = {}
+        for name, values in columns.items():
+            layout[name] = [_pad(f), values.typecode]
+            values.tofile(f)
+
+        # Lines cannot contain "\n", so each block is the block's lines joined by it
+        heap = _pad(f)
+        blocks = array("Q", [0])
+        for first in range(0, len(entries), BLOCK_ROWS):
+            f.write(zlib.compress("\n".join(e.raw for e in entries[first:first + BLOCK_ROWS]).encode()))
+            blocks.append(f.tell() - heap)
+        layout["blocks"] = [_pad(f), "Q"]
+        blocks.tofile(f)
+
+        header = zlib.compress(json.dumps({
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "rows": len(entries),
+            "bucket_start": segment.bucket_start,
+            "bucket_end": segment.bucket_end,
+            "seq": segment.seq,
+            "min_ts": segment.min_ts,
+            "max_ts": segment.max_ts,
+            "heap": heap,
+            "columns": layout,
+            "levels": list(levels),
+            "namespaces": list(namespaces),
+            "pods": list(pods),
+            "stamps": list(stamps)
+        }).encode())
+        header_offset = f.tell()
+        f.write(header)
+        f.seek(0)
+        f.write(_PREAMBLE.pack(MAGIC, header_offset, len(header)))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.seek(0, os.SEEK_END)
+    os.replace(tmp, path)
+    return size
+
+
+class ColumnSegment:
+    """
+    One memory-mapped segment file. Columns are read in place: numpy arrays (or
+    memoryviews without numpy) over the mapping, never copies of it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, header_offset, header_length = _PREAMBLE.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a log store segment")
+            header = json.loads(zlib.decompress(self._map[header_offset:header_offset + header_length]))
+        except (struct.error, zlib.error) as e:
+            self._map.close()
+            raise ValueError(f"{path} is corrupt: {e}")
+        if header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            self._map.close()
+            raise ValueError(f"{path} has an unsupported format")
+        self.rows = header["rows"]
+        self.bucket_start = header["bucket_start"]
+        self.bucket_end = header["bucket_end"]
+        self.seq = header["seq"]
+        self.min_ts = header["min_ts"]
+        self.max_ts = header["max_ts"]
+        self.levels = header["levels"]
+        self.namespaces = header["namespaces"]
+        self.pods = header["pods"]
+        self.stamps = header["stamps"]
+        self.size = len(self._map)
+        self._heap = header["heap"]
+        self._layout = header["columns"]
+        self._columns = {}
+
+    @property
+    def key(self) -> tuple:
+        return (self.bucket_start, self.seq)
+
+    def column(self, name: str):
+        if name not in self._columns:
+            offset, typecode = self._layout[name]
+            count = self._block_count() + 1 if name == "blocks" else self.rows
+            if np is not None:
+                self._columns[name] = np.frombuffer(self._map, dtype=typecode, count=count, offset=offset)
+            else:
+                width = struct.calcsize(typecode)
+                self._columns[name] = memoryview(self._map)[offset:offset + count * width].cast(typecode)
+        return self._columns[name]
+
+    def _block_count(self) -> int:
+        return (self.rows + BLOCK_ROWS - 1) // BLOCK_ROWS
+
+    def block(self, index: int) -> list[str]:
+        blocks = self.column("blocks")
+        start, end = self._heap + int(blocks[index]), self._heap + int(blocks[index + 1])
+        return zlib.decompress(self._map[start:end]).decode().split("\n")
+
+    def select(self, since: Optional[float] = None, level: Optional[str] = None,
+               namespace: Optional[str] = None, start_row: int = 0) -> list[int]:
+        """Rows from start_row on, in order, at or after since with the level and namespace."""
+        if since is not None and self.max_ts < since:
+            return []
+        filters = []
+        if level:
+            wanted = [i for i, value in enumerate(self.levels) if value.upper() == level.upper()]
+            if not wanted:
+                return []
+            if len(wanted) < len(self.levels):
+                filters.append(("level", wanted))
+        if namespace is not None:
+            # Entries without a namespace label belong to every namespace, as in the index
+            wanted = [i for i, value in enumerate(self.namespaces) if value in (namespace, None, "")]
+            if not wanted:
+                return []
+            if len(wanted) < len(self.namespaces):
+                filters.append(("namespace", wanted))
+        threshold = None if since is None or self.min_ts >= since else since * 1_000_000
+
+        if np is not None:
+            mask = np.ones(self.rows, dtype=bool)
+            mask[:start_row] = False
+            if threshold is not None:
+                mask &= self.column("ts") >= threshold
+            for name, wanted in filters:
+                mask &= np.isin(self.column(name), wanted)
+            return np.flatnonzero(mask).tolist()
+
+        rows = range(start_row, self.rows)
+        if threshold is not None:
+            ts = self.column("ts")
+            rows = [row for row in rows if ts[row] >= threshold]
+        for name, wanted in filters:
+            codes, allowed = self.column(name), set(wanted)
+            rows = [row for row in rows if codes[row] in allowed]
+        return list(rows)
+
+    def entry(self, row: int, raw: str) -> LogEntry:
+        """Rebuild the entry for a row; timestamp and level come from the columns."""
+        message = split_line(raw)[2]
+        return LogEntry(self.stamps[self.column("stamp")[row]], self.levels[self.column("level")[row]],
+                        message, raw, self.namespaces[self.column("namespace")[row]],
+                        self.pods[self.column("pod")[row]])
+
+    def close(self) -> None:
+        self._columns.clear()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Still mapped by a running query; unmapped when that lets go
+
+
+class ColumnStore:
+    """
+    Directory of columnar segments written as the index seals them, so ranges
+    that no longer fit in memory, or were ingested before a restart, are searched
+    from disk instead of by re-parsing the log files.
+
+    retained_from is the time from which the store holds every entry; None means
+    it holds everything since ingest began. It moves forward as the oldest
+    segments are deleted to stay within max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segments: list[ColumnSegment] = []
+        self.retained_from: Optional[float] = None
+        self.has_manifest = False
+        self.bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        for tmp in glob.glob(os.path.join(self.directory, "*.tmp")):
+            os.remove(tmp)
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.retained_from = manifest.get("retained_from")
+            self.has_manifest = manifest.get("version") == FORMAT_VERSION
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable log store manifest in %s: %s", self.directory, e)
+        for path in glob.glob(os.path.join(self.directory, "*" + SEGMENT_SUFFIX)):
+            try:
+                self.segments.append(ColumnSegment(path))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping log store segment %s: %s", path, e)
+        self.segments.sort(key=lambda s: s.key)
+        self.bytes = sum(s.size for s in self.segments)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @property
+    def end(self) -> Optional[float]:
+        """End of the newest stored bucket."""
+        return max((s.bucket_end for s in self.segments), default=self.retained_from)
+
+    @property
+    def next_seq(self) -> int:
+        """Segment numbers continue across restarts so keys never collide."""
+        return max((s.seq for s in self.segments), default=-1) + 1
+
+    def _save_manifest(self) -> None:
+        path = os.path.join(self.directory, MANIFEST)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "retained_from": self.retained_from}, f)
+        os.replace(f"{path}.tmp", path)
+        self.has_manifest = True
+
+    def reset(self, retained_from: Optional[float] = None) -> None:
+        """Drop every segment; the store holds entries from retained_from on (None: all of them)."""
+        for segment in self.segments:
+            segment.close()
+            os.remove(segment.path)
+        self.segments = []
+        self.bytes = 0
+        self.retained_from = retained_from
+        self._save_manifest()
+
+    def holds_until(self, until: float) -> bool:
+        """Whether everything before until was stored, i.e. nothing was lost at a crash."""
+        end = self.end
+        return self.has_manifest and (end is None or end >= until)
+
+    def covers(self, since: Optional[float]) -> bool:
+        if not self.has_manifest:
+            return False
+        return self.retained_from is None or (since is not None and since >= self.retained_from)
+
+    def write(self, segment) -> ColumnSegment:
+        name = f"{int(segment.bucket_start * 1000):015d}-{segment.seq:06d}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        write_segment(path, segment)
+        stored = ColumnSegment(path)
+        self.segments.append(stored)
+        self.segments.sort(key=lambda s: s.key)
+        self.bytes += stored.size
+        self._enforce_retention()
+        return stored
+
+    def _enforce_retention(self) -> None:
+        dropped = False
+        while self.bytes > self.max_bytes and len(self.segments) > 1:
+            oldest = self.segments.pop(0)
+            oldest.close()
+            os.remove(oldest.path)
+            self.bytes -= oldest.size
+            if self.retained_from is None or oldest.bucket_end > self.retained_from:
+                self.retained_from = oldest.bucket_end
+            dropped = True
+        if dropped:
+            self._save_manifest()
+
+    def search_from(self, query: str, since: Optional[float] = None, level: Optional[str] = None,
+                    namespace: Optional[str] = None, start: Optional[tuple] = None,
+                    stats: Optional[dict] = None, skip: frozenset = frozenset()) -> Iterator[tuple[tuple, LogEntry]]:
+        """
+        Yield (position, entry) for matches in (bucket_start, seq, row) order, like
+        LogIndex.search_from. Segments whose key is in skip are still held in memory
+        and searched there.
+        """
+        verify, _ = compile_query(query)
+        resume = tuple(start[:2]) if start is not None else None
+        for segment in list(self.segments):
+            key = segment.key
+            if key in skip or (since is not None and segment.max_ts < since):
+                continue
+            start_row = 0
+            if resume is not None:
+                if key < resume:
+                    continue
+                if key == resume:
+                    start_row = start[2]
+            block_index, lines = -1, []
+            for row in segment.select(since, level, namespace, start_row):
+                if row // BLOCK_ROWS != block_index:
+                    block_index = row // BLOCK_ROWS
+                    lines = segment.block(block_index)
+                if stats is not None:
+                    stats["scanned"] += 1
+                raw = lines[row % BLOCK_ROWS]
+                if verify(raw):
+                    yield (segment.bucket_start, segment.seq, row), segment.entry(row, raw)
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Incremental ingest for the LogAnalyzer MCP Server
+Tails log files from (inode, offset) positions that survive rotation and restarts,
+so only lines appended since the last poll are read
+"""
+
+from typing import Optional
+import json
+import logging
+import os
+import zlib
+
+from log_fanout import merge_entries
+from log_sources import LogEntry, iter_lines, open_log_file, parse_lines, read_chunks, rotated_files
+
+logger = logging.getLogger("log-analyzer")
+
+CHECKPOINT_VERSION = 1
+
+# Bytes read from one file per poll, so a large backlog does not hold the state lock for long
+DEFAULT_MAX_READ_BYTES = 8 * 1024 * 1024
+
+# Leading bytes fingerprinted to notice a file replaced under a reused inode
+HEAD_BYTES = 64
+
+# Offset recorded for compressed files, which are read once in full
+DONE = -1
+
+
+def _file_key(stat: os.stat_result) -> str:
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+
+def _head(f, length: int) -> int:
+    f.seek(0)
+    return zlib.crc32(f.read(length))
+
+
+class LogTailer:
+    """
+    Follows groups of rotated log files by file identity rather than name.
+
+    A position per (device, inode) records how far the file has been read, so a
+    file renamed by logrotate (app.log -> app.log.1) is finished from where it
+    stopped and the new live file is read from the start. A file shorter than
+    its offset, or whose first bytes changed, was truncated or replaced and is
+    read again from the start. Only complete lines are consumed; a partial last
+    line waits for the next poll.
+
+    Compressed files are read in full on the first poll only: after that a new
+    .gz is the compressed copy of a file that was already tailed.
+
+    Positions, and the newest timestamp ingested, are saved atomically to
+    checkpoint_path, and a new tailer resumes from them instead of re-reading.
+    """
+
+    def __init__(self, checkpoint_path: Optional[str] = None, max_read_bytes: int = DEFAULT_MAX_READ_BYTES):
+        self.checkpoint_path = checkpoint_path
+        self.max_read_bytes = max_read_bytes
+        self.positions: dict[str, dict] = {}
+        self.max_ts: Optional[float] = None
+        self.started = False
+        self.bytes_read = 0
+        self._dirty = False
+        self.load()
+
+    # ---------------- CHECKPOINTS ---------------- #
+
+    def load(self) -> bool:
+        """Restore positions from the checkpoint file; False when there is none to resume from."""
+        if not self.checkpoint_path:
+            return False
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", self.checkpoint_path, e)
+            return False
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            logger.warning("Ignoring checkpoint %s with version %s", self.checkpoint_path, checkpoint.get("version"))
+            return False
+        self.positions = checkpoint.get("positions", {})
+        self.max_ts = checkpoint.get("max_ts")
+        self.started = True
+        return True
+
+    def save(self, max_ts: Optional[float] = None) -> bool:
+        """Write the checkpoint if anything moved since the last save."""
+        if max_ts is not None and max_ts != float("-inf"):
+            self._dirty |= max_ts != self.max_ts
+            self.max_ts = max_ts
+        if not self.checkpoint_path or not self._dirty:
+            return False
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "max_ts": self.max_ts, "positions": self.positions}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+        self._dirty = False
+        return True
+
+    # ---------------- TAILING ---------------- #
+
+    def _read_compressed(self, path: str, key: str, namespace: Optional[str],
+                         pod: Optional[str]) -> list[LogEntry]:
+        self.positions[key] = {"offset": DONE}
+        self._dirty = True
+        if self.started:
+            return []
+        with open_log_file(path) as f:
+            return list(parse_lines(iter_lines(read_chunks(f)), namespace, pod))
+
+    def _read_plain(self, path: str, stat: os.stat_result, key: str, namespace: Optional[str],
+                    pod: Optional[str]) -> list[LogEntry]:
+        position = self.positions.get(key)
+        with open(path, "rb") as f:
+            if position is not None:
+                head_length = position.get("head_length", 0)
+                if stat.st_size < position["offset"] or (
+                        head_length and _head(f, head_length) != position.get("head")):
+                    logger.info("%s was truncated or replaced; reading it from the start", path)
+                    position = None
+            if position is None:
+                position = {"offset": 0, "timestamp": "", "level": ""}
+            if stat.st_size == position["offset"]:
+                self.positions[key] = position
+                return []
+
+            f.seek(position["offset"])
+            data = f.read(self.max_read_bytes)
+            end = data.rfind(b"\n") + 1
+            if end == 0 and len(data) < self.max_read_bytes:
+                self.positions[key] = position
+                return []  # Only a partial line so far
+            if end == 0:
+                end = len(data)  # A single line longer than a whole read
+
+            if not position.get("head_length") or position["head_length"] < HEAD_BYTES:
+                position["head_length"] = min(HEAD_BYTES, position["offset"] + end)
+                position["head"] = _head(f, position["head_length"])
+
+        self.bytes_read += end
+        lines = [line.rstrip("\r") for line in data[:end].decode("utf-8", errors="replace").split("\n") if line]
+        entries = list(parse_lines(lines, namespace, pod, position["timestamp"], position["level"]))
+        if entries:
+            position["timestamp"], position["level"] = entries[-1].timestamp, entries[-1].level
+        position["offset"] += end
+        self.positions[key] = position
+        self._dirty = True
+        return entries
+
+    def poll(self, targets: list[tuple[str, Optional[str], Optional[str]]]) -> list[LogEntry]:
+        """
+        New entries from every (path, namespace, pod) target since the last poll,
+        merged in timestamp order. Files that no longer exist are forgotten.
+        """
+        streams = []
+        seen = set()
+        for path, namespace, pod in targets:
+            entries: list[LogEntry] = []
+            for file_path in rotated_files(path):
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue  # Rotated away between listing and stat; picked up next poll
+                key = _file_key(stat)
+                seen.add(key)
+                if file_path.endswith(".gz"):
+                    if key not in self.positions:
+                        entries.extend(self._read_compressed(file_path, key, namespace, pod))
+                    continue
+                entries.extend(self._read_plain(file_path, stat, key, namespace, pod))
+            streams.append(entries)
+
+        gone = [key for key in self.positions if key not in seen]
+        for key in gone:
+            del self.positions[key]
+        self._dirty |= bool(gone)
+        self.started = True
+        return list(merge_entries(streams)) if len(streams) > 1 else (streams[0] if streams else [])
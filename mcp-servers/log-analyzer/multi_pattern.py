@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern matching for the LogAnalyzer MCP Server
+Finds which of several case-insensitive substrings occur in a line with one regex pass
+"""
+
+import re
+
+
+class MultiPatternMatcher:
+    """
+    Compiles N substrings into one combined regex.
+
+    The regex tries every alternative at every position through a zero-width
+    lookahead, longest pattern first. A shorter pattern starting at the same
+    position as a longer hit is necessarily a substring of it, so every hit is
+    expanded with the patterns it contains to recover overlapping matches.
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = list(patterns)
+        needles = [p.upper() for p in self.patterns]
+
+        # Duplicate patterns (after case folding) share one alternative
+        self._indices: dict[str, list[int]] = {}
+        for i, needle in enumerate(needles):
+            self._indices.setdefault(needle, []).append(i)
+
+        unique = sorted((n for n in self._indices if n), key=len, reverse=True)
+        self._implied: dict[str, frozenset[int]] = {}
+        for needle in unique:
+            hits = set()
+            for other in unique:
+                if other in needle:
+                    hits.update(self._indices[other])
+            self._implied[needle] = frozenset(hits)
+
+        self._always = frozenset(self._indices.get("", ()))
+        alternatives = "|".join(re.escape(n) for n in unique)
+        self._regex = re.compile(f"(?=({alternatives}))") if unique else None
+
+    def match(self, upper_line: str) -> frozenset[int]:
+        """Return indices of the patterns found in an already upper-cased line."""
+        if self._regex is None:
+            return self._always
+        found = {m.group(1) for m in self._regex.finditer(upper_line)}
+        if not found:
+            return self._always
+        if len(found) == 1:
+            return self._implied[found.pop()] | self._always
+        hits = set(self._always)
+        for needle in found:
+            hits.update(self._implied[needle])
+        return frozenset(hits)
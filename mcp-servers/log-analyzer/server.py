@@ -4,10 +4,37 @@ LogAnalyzer MCP Server
 Provides tools to search logs and detect anomalies in Kubernetes pods
 """
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from collections import Counter
 from datetime import datetime, timezone
-import random
-import re
+from itertools import islice
+from typing import Callable, Iterator, Optional
+import asyncio
+import logging
+import math
+import os
+import sys
+import threading
+import zlib
+
+# mcp_common sits next to this directory in the repo and next to server.py in the image
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anomaly_engine import ALL_NAMESPACES, TEMPLATE_SORTS, AnomalyEngine
+from log_fanout import PodDirectory, PodLogSource, create_kubernetes_pods
+from log_index import LogIndex, parse_time_range
+from log_scan import ScanPool
+from log_sources import FileLogSource, LogEntry, LogSource, SampleLogSource
+from log_store import DEFAULT_MAX_BYTES as DEFAULT_STORE_MAX_BYTES, ColumnStore
+from log_tail import LogTailer
+from template_miner import TemplateMiner
+from mcp_common.instrumentation import record_cache, record_rows
+from mcp_common.progress import run_streaming
+from mcp_common.result_cache import cache_tool, duration, regex, upper
+from mcp_common.shaping import (CursorError, budget_bytes, decode_cursor, encode_cursor, group_by_template,
+                                shape_list)
+
+logger = logging.getLogger("log-analyzer")
 
 # Initialize MCP server
 mcp = FastMCP("log-analyzer", version="1.0.0")
@@ -26,115 +53,563 @@ SAMPLE_LOGS = [
     "2024-02-14 12:06:15 ERROR Out of memory exception in worker thread",
 ]
 
+# ---------------- LOG SOURCE ---------------- #
+
+# Default cap on returned matches; the scan stops as soon as it is reached
+DEFAULT_MAX_RESULTS = 100
+
+# Matches per progress notification when search results are streamed
+STREAM_BATCH = 20
+
+# "now" counts relative time ranges back from the current time; "newest" from the
+# newest line, for logs replayed from the past (the built-in samples always are)
+TIME_RANGE_ANCHOR = os.environ.get("LOG_TIME_RANGE_ANCHOR", "now").lower()
+
+# Patterns the anomaly engine tracks from the first ingested line
+DEFAULT_ANOMALY_PATTERNS = ["ERROR", "WARN", "timeout", "OOM", "exception"]
+
+
+def _pod_log_source(pods) -> PodLogSource:
+    namespaces = os.environ.get("LOG_NAMESPACES")
+    tail_lines = os.environ.get("LOG_TAIL_LINES")
+    return PodLogSource(
+        pods,
+        namespaces=[ns.strip() for ns in namespaces.split(",") if ns.strip()] if namespaces else None,
+        selector=os.environ.get("LOG_LABEL_SELECTOR") or None,
+        concurrency=int(os.environ.get("LOG_FANOUT_CONCURRENCY", 8)),
+        tail_lines=int(tail_lines) if tail_lines else None
+    )
+
+
+def _default_log_source() -> LogSource:
+    if os.environ.get("LOG_SOURCE", "").lower() == "kubernetes":
+        return _pod_log_source(create_kubernetes_pods(container=os.environ.get("LOG_CONTAINER") or None))
+    log_root = os.environ.get("LOG_ROOT")
+    if log_root:
+        return _pod_log_source(PodDirectory(log_root))
+    log_path = os.environ.get("LOG_PATH")
+    if log_path:
+        return FileLogSource(log_path, namespace=os.environ.get("K8S_NAMESPACE"))
+    return SampleLogSource(SAMPLE_LOGS)
+
+
+log_source: LogSource = _default_log_source()
+
+def _new_index(store: Optional[ColumnStore] = None) -> LogIndex:
+    return LogIndex(
+        bucket_seconds=float(os.environ.get("LOG_INDEX_BUCKET_SECONDS", 300)),
+        max_rows=int(os.environ.get("LOG_INDEX_MAX_ROWS", 1_000_000)),
+        store=store
+    )
+
+
+def _new_engine() -> AnomalyEngine:
+    engine = AnomalyEngine(
+        bucket_seconds=float(os.environ.get("ANOMALY_BUCKET_SECONDS", 60)),
+        window_buckets=int(os.environ.get("ANOMALY_WINDOW_BUCKETS", 60)),
+        z_threshold=float(os.environ.get("ANOMALY_Z_THRESHOLD", 3.0)),
+        miner=TemplateMiner(
+            depth=int(os.environ.get("LOG_TEMPLATE_DEPTH", 4)),
+            similarity=float(os.environ.get("LOG_TEMPLATE_SIMILARITY", 0.5))
+        )
+    )
+    patterns = os.environ.get("ANOMALY_PATTERNS")
+    engine.track(patterns.split(",") if patterns else DEFAULT_ANOMALY_PATTERNS)
+    return engine
+
+
+def _new_store(directory: str) -> ColumnStore:
+    return ColumnStore(directory, max_bytes=int(os.environ.get("LOG_STORE_MAX_BYTES", DEFAULT_STORE_MAX_BYTES)))
+
+
+log_index = _new_index()
+anomaly_engine = _new_engine()
+_indexed_version = None
+
+# Guards rebuilding and mutating the index and engine across tool threads
+_state_lock = threading.RLock()
+
+# Full scans outside the index run on worker processes, one file per task
+scan_pool = ScanPool(int(os.environ.get("LOG_SCAN_WORKERS", 0)) or None)
+
+
+# Bumped whenever lines reach the index; cached tool results are keyed on it
+_data_generation = 0
+
+# Follows the source's files when ingest is running; None means rebuild on change
+_tailer: Optional[LogTailer] = None
+_ingest_stop = threading.Event()
+_ingest_thread: Optional[threading.Thread] = None
+# Oldest timestamp the current ingest run feeds to the anomaly engine; None for all
+_ingested_from: Optional[float] = None
+
+
+def set_log_source(source: LogSource) -> None:
+    global log_source, _indexed_version, _data_generation
+    stop_ingest()
+    log_source = source
+    _indexed_version = None
+    _data_generation += 1
+
+
+def _ingest() -> int:
+    """Feed lines appended since the last poll into the index and anomaly state."""
+    global _data_generation
+    with _state_lock:
+        entries = _tailer.poll(log_source.tail_paths())
+        for entry in entries:
+            log_index.add(entry)
+            anomaly_engine.observe(entry)
+        if entries:
+            _data_generation += 1
+        _tailer.save(log_index.max_ts)
+        return len(entries)
+
+
+def _ingest_loop(interval: float) -> None:
+    while not _ingest_stop.wait(interval):
+        try:
+            _ingest()
+        except Exception as e:
+            logger.warning("Log ingest failed: %s", e)
+
+
+def start_ingest(checkpoint_path: Optional[str] = None, interval: float = 2.0,
+                 background: bool = True, store_dir: Optional[str] = None) -> bool:
+    """
+    Tail the log source instead of re-reading it whenever it changes. With a
+    checkpoint, ingest resumes where the previous process stopped; older lines
+    stay searchable through full scans, as if they had been evicted from the index.
+    With store_dir, sealed index segments are compacted into a columnar store
+    there, and evicted or pre-restart ranges are searched from it instead.
+    Returns False for sources that cannot be tailed.
+    """
+    global _tailer, log_index, anomaly_engine, _indexed_version, _ingest_thread, _data_generation, _ingested_from
+    stop_ingest()
+    with _state_lock:
+        if not log_source.tail_paths():
+            return False
+        tailer = LogTailer(checkpoint_path)
+        store = _new_store(store_dir) if store_dir else None
+        resume_from = None if tailer.max_ts is None else math.nextafter(tailer.max_ts, math.inf)
+        if store is not None and (resume_from is None or not store.holds_until(resume_from)):
+            # A fresh start, or segments still open at a crash were never written:
+            # the store only holds what this run ingests
+            store.reset(resume_from)
+        index, engine = _new_index(store), _new_engine()
+        engine.track(anomaly_engine.patterns)
+        if tailer.max_ts is not None:
+            # Lines up to the checkpoint's newest timestamp were ingested by an earlier process
+            index.max_ts = tailer.max_ts
+            index.evicted_before = resume_from
+        log_index, anomaly_engine, _indexed_version = index, engine, None
+        _data_generation += 1
+        _tailer, _ingested_from = tailer, resume_from
+    # Catch up in bounded reads, letting queries in between
+    while _ingest():
+        pass
+    if background:
+        _ingest_stop.clear()
+        _ingest_thread = threading.Thread(target=_ingest_loop, args=(interval,), name="log-ingest", daemon=True)
+        _ingest_thread.start()
+    return True
+
+
+def stop_ingest() -> None:
+    global _tailer, _ingest_thread
+    _ingest_stop.set()
+    if _ingest_thread is not None:
+        _ingest_thread.join()
+        _ingest_thread = None
+    with _state_lock:
+        if _tailer is not None:
+            if log_index.store is not None:
+                # Write the open segments too, so a restart resumes from the store
+                log_index.seal()
+            _tailer.save(log_index.max_ts)
+        _tailer = None
+
+
+def _refresh() -> None:
+    """Rebuild the index and anomaly state in one pass when the source has changed."""
+    global log_index, anomaly_engine, _indexed_version, _data_generation
+    with _state_lock:
+        if _tailer is not None:
+            # Queries see every complete line written so far, not just the last poll
+            record_cache("log_index", _ingest() == 0)
+            return
+        version = log_source.version()
+        record_cache("log_index", version == _indexed_version)
+        if version != _indexed_version:
+            index, engine = _new_index(), _new_engine()
+            engine.track(anomaly_engine.patterns)
+            for entry in log_source.iter_entries():
+                index.add(entry)
+                engine.observe(entry)
+            log_index, anomaly_engine, _indexed_version = index, engine, version
+            _data_generation += 1
+
+
+def _data_version() -> int:
+    """
+    The current data generation. With background ingest it is only read, so cached
+    results cost no I/O; otherwise the source is checked for changes first.
+    """
+    if _ingest_thread is None:
+        _refresh()
+    return _data_generation
+
+
+def _current_index() -> LogIndex:
+    _refresh()
+    return log_index
+
+
+def _observed_entries() -> Iterator[LogEntry]:
+    """
+    The entries the anomaly engine has observed, read back from the index and its
+    store where they still hold them. With ingest that is everything since
+    ingest started, so history before a checkpoint is not counted.
+    """
+    if _tailer is not None:
+        return log_index.search("", since=_ingested_from)
+    if log_index.covers(None):
+        return log_index.search("")
+    return log_source.iter_entries()
+
+
+def _range_start(index: LogIndex, time_range: str) -> Optional[float]:
+    """Start of a relative time_range, counted back from now unless the logs are replayed."""
+    if TIME_RANGE_ANCHOR == "newest" or log_source.replay:
+        return index.since(time_range, index.max_ts)
+    return index.since(time_range)
+
+
+def _current_engine(patterns: list[str]) -> AnomalyEngine:
+    """Return the anomaly engine with every pattern tracked, backfilling new ones."""
+    with _state_lock:
+        _refresh()
+        new = anomaly_engine.track(patterns)
+        if new:
+            anomaly_engine.backfill(_observed_entries(), new)
+        return anomaly_engine
+
+
+if os.environ.get("LOG_INGEST", "false").lower() == "true":
+    start_ingest(os.environ.get("LOG_CHECKPOINT_PATH") or None, float(os.environ.get("LOG_INGEST_INTERVAL", 2)),
+                 store_dir=os.environ.get("LOG_STORE_DIR") or None)
+
+
+def _format_entry(entry: LogEntry, namespace: str) -> dict:
+    return {
+        "timestamp": entry.timestamp,
+        "level": entry.level,
+        "message": entry.message,
+        "pod": entry.pod,
+        "namespace": entry.namespace or namespace
+    }
+
 # ---------------- SEARCH LOGS IMPLEMENTATION ---------------- #
 
-def _search_logs_impl(query: str, time_range: str = "5m", namespace: str = "default") -> dict:
-    matching_logs = []
+# Spellings of a query that match the same lines share cursors and cache entries
+_canonical_query = regex(ignore_case=True)
+
+
+def _query_fingerprint(query: str, namespace: str, level: Optional[str], label_selector: Optional[str] = None) -> str:
+    key = f"{_canonical_query(query)}\0{namespace}\0{(level or '').upper()}"
+    if label_selector:
+        key += f"\0{label_selector}"
+    return format(zlib.crc32(key.encode()), "08x")
+
 
+def _parse_since(since: str) -> float:
+    """Epoch seconds of an ISO 8601 time; times without an offset are UTC like the logs."""
     try:
-        pattern = re.compile(query, re.IGNORECASE)
-        for log in SAMPLE_LOGS:
-            if pattern.search(log):
-                parts = log.split()
-                matching_logs.append({
-                    "timestamp": parts[0] + " " + parts[1],
-                    "level": parts[2],
-                    "message": " ".join(parts[3:]),
-                    "pod": f"app-pod-{random.randint(1000, 9999)}",
-                    "namespace": namespace
-                })
-    except re.error:
-        for log in SAMPLE_LOGS:
-            if query.lower() in log.lower():
-                parts = log.split()
-                matching_logs.append({
-                    "timestamp": parts[0] + " " + parts[1],
-                    "level": parts[2],
-                    "message": " ".join(parts[3:]),
-                    "pod": f"app-pod-{random.randint(1000, 9999)}",
-                    "namespace": namespace
-                })
+        moment = datetime.fromisoformat(since.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid since: {since!r} (expected an ISO 8601 time)")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
 
-    return {
+
+def _search_logs_impl(query: str, time_range: str = "5m", namespace: str = "default",
+                      max_results: int = DEFAULT_MAX_RESULTS, level: Optional[str] = None,
+                      max_tokens: Optional[int] = None, max_bytes: Optional[int] = None,
+                      cursor: Optional[str] = None, emit: Optional[Callable[[list], None]] = None,
+                      label_selector: Optional[str] = None, since: Optional[str] = None) -> dict:
+    """
+    One page of matches. A cursor pins the time range of the first page and the
+    position of the next match, so following pages continue where the last one
+    stopped instead of scanning again. emit receives the page's entries in batches
+    once the page has been cut to the budget. since, an ISO 8601 time, replaces the relative time_range.
+    """
+    fingerprint = _query_fingerprint(query, namespace, level, label_selector)
+    namespace_filter = None if namespace == ALL_NAMESPACES else namespace
+    try:
+        if max_results < 0:
+            raise ValueError(f"max_results must not be negative: {max_results}")
+        position = decode_cursor(cursor)
+        if position and position.get("h") != fingerprint:
+            raise CursorError("Cursor belongs to a different search")
+        source = log_source
+        if label_selector:
+            if not isinstance(log_source, PodLogSource):
+                raise ValueError("label_selector needs a pod log source (LOG_ROOT or LOG_SOURCE=kubernetes)")
+            source = log_source.select(None if namespace_filter is None else [namespace_filter], label_selector)
+        start_time = _parse_since(since) if since else None
+    except ValueError as e:
+        return {"query": query, "error": str(e), "match_count": 0, "truncated": False, "logs": []}
+
+    index = _current_index()
+    if "t" in position:
+        since = position["t"]
+    else:
+        since = start_time if start_time is not None else _range_start(index, time_range)
+    stats = {"scanned": 0}
+    if not label_selector and ("p" in position or ("o" not in position and index.covers(since))):
+        start = tuple(position["p"]) if "p" in position else None
+        matches = index.search_from(query, since, level, namespace_filter, start, stats)
+    else:
+        # The index no longer holds this range, or only some pods are wanted; stream
+        # the source, skipping the matches of earlier pages
+        offset = int(position.get("o", 0))
+        found = scan_pool.scan(source, query, since, namespace_filter, level, offset + max_results + 1)
+        matches = (({"o": offset + i}, entry) for i, entry in enumerate(islice(found, offset, None)))
+
+    positions = []
+    matching_logs = []
+    for where, entry in islice(matches, max_results + 1):
+        positions.append(where)
+        matching_logs.append(_format_entry(entry, namespace))
+
+    truncated = len(matching_logs) > max_results
+    if truncated:
+        matching_logs.pop()
+
+    # Summary of the whole page first, then as many full entries as the budget allows
+    response = {
         "query": query,
         "time_range": time_range,
         "namespace": namespace,
         "match_count": len(matching_logs),
+        "truncated": truncated,
+        "summary": {
+            "levels": dict(Counter(log["level"] for log in matching_logs)),
+            "templates": group_by_template(matching_logs)
+        },
         "logs": matching_logs,
         "search_timestamp": datetime.now(timezone.utc).isoformat()
     }
+    budget = budget_bytes(max_tokens, max_bytes)
+    # The summary may use at most half of the budget
+    shape_list(response["summary"], "templates", budget // 2)
+    # Leave room for next_cursor
+    returned = shape_list(response, "logs", budget - 96)
+    if returned < len(matching_logs):
+        response["match_count"] = returned
+        response["truncated"] = True
+    if emit is not None:
+        # Only the entries kept on the page are streamed; the cursor resumes after
+        # them, so entries the budget dropped are streamed once, on the next page
+        for i in range(0, returned, STREAM_BATCH):
+            emit(response["logs"][i:i + STREAM_BATCH])
+    if response["truncated"]:
+        where = positions[returned]
+        resume = where if isinstance(where, dict) else {"p": list(where)}
+        response["next_cursor"] = encode_cursor({"h": fingerprint, "t": since, **resume})
+    record_rows(stats["scanned"], returned)
+    return response
 
 # MCP TOOL
 @mcp.tool()
-def search_logs(query: str, time_range: str = "5m", namespace: str = "default") -> dict:
+async def search_logs(query: str, time_range: str = "5m", namespace: str = "default",
+                      max_results: int = DEFAULT_MAX_RESULTS, level: Optional[str] = None,
+                      max_tokens: Optional[int] = None, max_bytes: Optional[int] = None,
+                      cursor: Optional[str] = None, label_selector: Optional[str] = None,
+                      since: Optional[str] = None, ctx: Optional[Context] = None) -> dict:
     """
     Search pod logs for a specific pattern or keyword.
+    time_range (e.g. "5m", "1h", "all") counts back from the current time; since
+    (an ISO 8601 time such as "2024-05-01T12:00:00Z") searches from that moment instead;
+    level optionally restricts matches to one log level.
+    namespace "*" searches every namespace; label_selector (e.g. "app=checkout")
+    searches every pod it matches, merged in timestamp order.
+    Stops scanning once max_results matches have been found.
+    The response opens with a summary of levels and message templates with counts,
+    then full entries up to max_tokens / max_bytes. When truncated, pass next_cursor
+    back as cursor to continue from the next match.
+    Clients that request progress receive the page's entries in batches before the result.
     """
-    return _search_logs_impl(query, time_range, namespace)
+    return await run_streaming(ctx, _search_logs_impl, query, time_range, namespace, max_results, level,
+                               max_tokens, max_bytes, cursor, label_selector=label_selector,
+                               since=since, total=max_results)
 
 # ---------------- ANOMALY DETECTION IMPLEMENTATION ---------------- #
 
-def _detect_anomaly_impl(pattern: str, threshold: float = 0.8) -> dict:
-    pattern_count = sum(1 for log in SAMPLE_LOGS if pattern.upper() in log.upper())
-    total_logs = len(SAMPLE_LOGS)
-    frequency = pattern_count / total_logs if total_logs > 0 else 0
-
-    is_anomaly = frequency >= threshold
-
-    spikes = []
-    current_spike = []
-
-    for i, log in enumerate(SAMPLE_LOGS):
-        if pattern.upper() in log.upper():
-            parts = log.split()
-            current_spike.append({
-                "log_index": i,
-                "timestamp": parts[0] + " " + parts[1],
-                "message": " ".join(parts[3:])
-            })
-        else:
-            if len(current_spike) >= 2:
-                spikes.append({
-                    "start_time": current_spike[0]["timestamp"],
-                    "end_time": current_spike[-1]["timestamp"],
-                    "occurrence_count": len(current_spike),
-                    "logs": current_spike
-                })
-            current_spike = []
-
-    if len(current_spike) >= 2:
-        spikes.append({
-            "start_time": current_spike[0]["timestamp"],
-            "end_time": current_spike[-1]["timestamp"],
-            "occurrence_count": len(current_spike),
-            "logs": current_spike
-        })
-
-    severity = "high" if is_anomaly else "normal"
-    if spikes:
-        severity = "critical"
+def _shape_report(report: dict, budget: int) -> dict:
+    """Keep the strongest spikes that fit the budget, still in time order."""
+    returned = shape_list(report, "spike_details", budget, rank=lambda spike: -spike["peak_zscore"])
+    record_rows(report["total_logs_analyzed"], returned)
+    return report
+
 
+def _detect_anomalies_impl(patterns: list[str], threshold: float = 0.8, namespace: Optional[str] = None,
+                           max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    with _state_lock:
+        engine = _current_engine(patterns)
+        results = [engine.report(pattern, threshold, namespace) for pattern in patterns]
+    # Each pattern gets an equal share of the budget
+    share = budget_bytes(max_tokens, max_bytes) // max(1, len(patterns))
+    results = [_shape_report(result, share) for result in results]
     return {
-        "pattern": pattern,
+        "patterns": patterns,
         "threshold": threshold,
-        "frequency": round(frequency, 3),
-        "occurrence_count": pattern_count,
-        "total_logs_analyzed": total_logs,
-        "is_anomaly": is_anomaly,
-        "severity": severity,
-        "spikes_detected": len(spikes),
-        "spike_details": spikes,
-        "recommendation": f"Investigate {pattern} pattern - detected {len(spikes)} spike(s)" if spikes else "No anomalous behavior detected",
+        "namespace": namespace,
+        "total_logs_analyzed": results[0]["total_logs_analyzed"] if results else 0,
+        "anomalous_patterns": [r["pattern"] for r in results if r["severity"] != "normal"],
+        "results": results,
         "analysis_timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+
+def _detect_anomaly_impl(pattern: str, threshold: float = 0.8, namespace: Optional[str] = None,
+                         max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    with _state_lock:
+        result = _current_engine([pattern]).report(pattern, threshold, namespace)
+    return _shape_report(result, budget_bytes(max_tokens, max_bytes))
+
 # MCP TOOL
 @mcp.tool()
-def detect_anomaly(pattern: str, threshold: float = 0.8) -> dict:
+async def detect_anomaly(pattern: str, threshold: float = 0.8, namespace: Optional[str] = None,
+                         max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
     """
     Detect anomalies in log patterns.
+    Spikes are time buckets whose count deviates from the rolling baseline;
+    beyond max_tokens / max_bytes only the strongest spikes are listed.
+    """
+    return await asyncio.to_thread(_detect_anomaly_impl, pattern, threshold, namespace, max_tokens, max_bytes)
+
+# MCP TOOL
+@mcp.tool()
+async def detect_anomalies(patterns: list[str], threshold: float = 0.8, namespace: Optional[str] = None,
+                           max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    """
+    Detect anomalies for several log patterns (e.g. ERROR, WARN, timeout, OOM)
+    in a single pass over the logs. The budget is shared equally between patterns.
+    """
+    return await asyncio.to_thread(_detect_anomalies_impl, patterns, threshold, namespace, max_tokens, max_bytes)
+
+# ---------------- TEMPLATES IMPLEMENTATION ---------------- #
+
+def _top_templates_impl(namespace: Optional[str] = None, sort: str = "spiking", limit: int = 10,
+                        new_within: str = "15m", max_tokens: Optional[int] = None,
+                        max_bytes: Optional[int] = None) -> dict:
+    if sort not in TEMPLATE_SORTS:
+        return {"error": f"Unknown sort {sort!r}, expected one of {list(TEMPLATE_SORTS)}", "templates": []}
+    seconds = parse_time_range(new_within)
+    with _state_lock:
+        _refresh()
+        new_within_buckets = None if seconds is None else max(1, int(seconds // anomaly_engine.bucket_seconds))
+        templates = anomaly_engine.top_templates(namespace, sort, limit, new_within_buckets)
+        response = {
+            "namespace": namespace,
+            "sort": sort,
+            "total_templates": len(anomaly_engine.miner),
+            "total_logs_analyzed": anomaly_engine.lines.get(ALL_NAMESPACES, 0),
+            "templates": templates,
+            "analysis_timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    returned = shape_list(response, "templates", budget_bytes(max_tokens, max_bytes))
+    record_rows(response["total_logs_analyzed"], returned)
+    return response
+
+# MCP TOOL
+@mcp.tool()
+async def top_templates(namespace: Optional[str] = None, sort: str = "spiking", limit: int = 10,
+                        new_within: str = "15m", max_tokens: Optional[int] = None,
+                        max_bytes: Optional[int] = None) -> dict:
     """
-    return _detect_anomaly_impl(pattern, threshold)
+    What is new or spiking in the logs, without needing a pattern.
+    Every line is clustered into a message template such as "Retry attempt <*> failed";
+    sort="spiking" ranks templates by their strongest spike, sort="new" lists templates
+    first seen within new_within (e.g. "15m"), and sort="count" ranks by volume.
+    """
+    return await asyncio.to_thread(_top_templates_impl, namespace, sort, limit, new_within, max_tokens, max_bytes)
+
+# ---------------- SIGNALS IMPLEMENTATION ---------------- #
+
+def _log_signals_impl(namespace: Optional[str] = None, window: str = "1h", patterns: Optional[list[str]] = None,
+                      templates: int = 5, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    seconds = parse_time_range(window)
+    if seconds is None:
+        return {"error": f"Invalid window {window!r}", "signals": []}
+    patterns = patterns or DEFAULT_ANOMALY_PATTERNS
+    with _state_lock:
+        engine = _current_engine(patterns)
+        buckets = min(engine.window_buckets, max(1, math.ceil(seconds / engine.bucket_seconds)))
+        signals = [
+            {"name": pattern, "kind": "pattern",
+             "counts": engine.series(engine.pattern_index(pattern), namespace, buckets)}
+            for pattern in patterns
+        ]
+        # Spiking templates first, then the busiest ones, so a window without spikes still has series
+        rows = engine.top_templates(namespace, "spiking", templates)
+        if len(rows) < templates:
+            spiking = {row["template_id"] for row in rows}
+            rows += [row for row in engine.top_templates(namespace, "count", templates)
+                     if row["template_id"] not in spiking][:templates - len(rows)]
+        for row in rows:
+            signals.append({"name": row["template"], "kind": "template", "template_id": row["template_id"],
+                            "counts": engine.series(row["template_id"], namespace, buckets, templates=True),
+                            "peak_zscore": row["peak_zscore"]})
+        start = None if engine.head is None else (engine.head - buckets + 1) * engine.bucket_seconds
+        response = {
+            "namespace": namespace,
+            "window": window,
+            "start": start,
+            "step_seconds": engine.bucket_seconds,
+            "buckets": buckets,
+            "total_logs_analyzed": engine.lines.get(ALL_NAMESPACES, 0),
+            "signals": signals,
+            "analysis_timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    returned = shape_list(response, "signals", budget_bytes(max_tokens, max_bytes))
+    record_rows(response["total_logs_analyzed"], returned)
+    return response
+
+# MCP TOOL
+@mcp.tool()
+async def log_signals(namespace: Optional[str] = None, window: str = "1h", patterns: Optional[list[str]] = None,
+                      templates: int = 5, max_tokens: Optional[int] = None,
+                      max_bytes: Optional[int] = None) -> dict:
+    """
+    Log activity as time series, for lining up with metrics and alerts.
+    Returns per-bucket counts over the last window of logs (e.g. "1h") for each
+    pattern (default: the tracked ERROR/WARN/timeout/OOM/exception patterns) and
+    for up to `templates` spiking or busy message templates. Bucket i covers
+    start + i * step_seconds (epoch seconds).
+    """
+    return await asyncio.to_thread(_log_signals_impl, namespace, window, patterns, templates, max_tokens, max_bytes)
+
+# ---------------- RESULT CACHE ---------------- #
+
+# The triage agent repeats the same calls every few minutes; until new lines are
+# ingested they are answered from memory
+RESULT_CACHE_TTL = float(os.environ.get("LOG_RESULT_CACHE_TTL", 300))
+
+# Searches count back from the current time, so their window moves even while no
+# lines arrive; the TTL bounds how far a cached result can drift
+SEARCH_RESULT_CACHE_TTL = float(os.environ.get("LOG_SEARCH_RESULT_CACHE_TTL", 30))
+
+cache_tool(mcp, search_logs, SEARCH_RESULT_CACHE_TTL, version=_data_version,
+           normalize={"query": _canonical_query, "time_range": duration(parse_time_range), "level": upper})
+cache_tool(mcp, detect_anomaly, RESULT_CACHE_TTL, version=_data_version, normalize={"pattern": upper})
+cache_tool(mcp, detect_anomalies, RESULT_CACHE_TTL, version=_data_version, normalize={"patterns": upper})
+cache_tool(mcp, top_templates, RESULT_CACHE_TTL, version=_data_version,
+           normalize={"new_within": duration(parse_time_range)})
+cache_tool(mcp, log_signals, RESULT_CACHE_TTL, version=_data_version,
+           normalize={"window": duration(parse_time_range), "patterns": upper})
 
 # ---------------- RUN MCP SERVER ---------------- #
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Online log template mining for the LogAnalyzer MCP Server
+A Drain-style fixed-depth parse tree that assigns each message a template ID
+"""
+
+from typing import Optional
+
+WILDCARD = "<*>"
+
+DEFAULT_DEPTH = 4
+DEFAULT_SIMILARITY = 0.5
+DEFAULT_MAX_CHILDREN = 100
+DEFAULT_MAX_TEMPLATES = 10_000
+DEFAULT_CACHE_SIZE = 8192
+
+
+def _has_digit(token: str) -> bool:
+    return any(c.isdigit() for c in token)
+
+
+class LogTemplate:
+    """One cluster of messages: its token template and how many messages it has absorbed."""
+
+    __slots__ = ("id", "tokens", "count")
+
+    def __init__(self, template_id: int, tokens: list[str]):
+        self.id = template_id
+        self.tokens = tokens
+        self.count = 0
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+    def similarity(self, tokens: list[str]) -> float:
+        """Share of positions where the template has a wildcard or the same token."""
+        same = sum(1 for t, m in zip(self.tokens, tokens) if t == m or t == WILDCARD)
+        return same / len(tokens) if tokens else 1.0
+
+    def merge(self, tokens: list[str]) -> None:
+        for i, (t, m) in enumerate(zip(self.tokens, tokens)):
+            if t != m:
+                self.tokens[i] = WILDCARD
+
+
+class TemplateMiner:
+    """
+    Drain: messages are routed by token count, then by their first depth-2 tokens
+    (tokens with digits, and anything past max_children siblings, go down a
+    wildcard branch) to a small leaf list of templates. The message joins the
+    most similar template at or above the similarity threshold, turning the
+    tokens that differ into wildcards, or starts a new one.
+
+    Routing touches a fixed number of nodes, and repeated messages are answered
+    from an exact-message cache, so assignment is close to constant time.
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, similarity: float = DEFAULT_SIMILARITY,
+                 max_children: int = DEFAULT_MAX_CHILDREN, max_templates: int = DEFAULT_MAX_TEMPLATES,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.prefix_tokens = max(1, depth - 2)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self.cache_size = cache_size
+        self.templates: list[LogTemplate] = []
+        self.dropped = 0
+        self._root: dict[int, dict] = {}
+        self._cache: dict[str, LogTemplate] = {}
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def _leaf(self, tokens: list[str], create: bool) -> Optional[list[LogTemplate]]:
+        node = self._root.get(len(tokens))
+        if node is None:
+            if not create:
+                return None
+            node = self._root[len(tokens)] = {}
+        for depth, token in enumerate(tokens[:self.prefix_tokens]):
+            last = depth == min(self.prefix_tokens, len(tokens)) - 1
+            key = WILDCARD if _has_digit(token) else token
+            child = node.get(key)
+            if child is None:
+                if not create:
+                    child = node.get(WILDCARD)
+                    if child is None:
+                        return None
+                else:
+                    if len(node) >= self.max_children:
+                        key = WILDCARD
+                    child = node.get(key)
+                    if child is None:
+                        child = node[key] = [] if last else {}
+            node = child
+        if isinstance(node, dict):
+            # Messages shorter than the prefix (including empty ones) share one leaf
+            node = node.setdefault("", [])
+        return node
+
+    def match(self, message: str) -> Optional[LogTemplate]:
+        """The template message belongs to, without changing any state."""
+        cached = self._cache.get(message)
+        if cached is not None:
+            return cached
+        tokens = message.split()
+        return self._best(self._leaf(tokens, create=False) or [], tokens)
+
+    def _best(self, leaf: list[LogTemplate], tokens: list[str]) -> Optional[LogTemplate]:
+        best, best_score = None, -1.0
+        for template in leaf:
+            score = template.similarity(tokens)
+            if score > best_score:
+                best, best_score = template, score
+        return best if best is not None and best_score >= self.similarity else None
+
+    def add(self, message: str) -> Optional[LogTemplate]:
+        """
+        Assign message to a template, creating or generalising one as needed.
+        Returns None only when max_templates is reached and nothing is similar enough.
+        """
+        template = self._cache.get(message)
+        if template is None:
+            tokens = message.split()
+            leaf = self._leaf(tokens, create=True)
+            template = self._best(leaf, tokens)
+            if template is None:
+                if len(self.templates) >= self.max_templates:
+                    self.dropped += 1
+                    return None
+                template = LogTemplate(len(self.templates), [WILDCARD if _has_digit(t) else t for t in tokens])
+                self.templates.append(template)
+                leaf.append(template)
+            else:
+                template.merge(tokens)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[message] = template
+        template.count += 1
+        return template
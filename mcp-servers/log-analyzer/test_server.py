@@ -5,10 +5,42 @@ Test script for LogAnalyzer MCP Server
 
 import sys
 import os
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from server import _search_logs_impl, _detect_anomaly_impl
+import server
+from server import _search_logs_impl, _detect_anomaly_impl, _detect_anomalies_impl
+from anomaly_engine import AnomalyEngine
+from log_fanout import PodDirectory, PodLogSource, matches_selector, parse_selector
+from log_index import LogIndex, literal_prefix, literal_terms, parse_timestamp
+from log_scan import ScanPool, scan_entries, scan_shard
+from mcp_common.shaping import decode_cursor
+from log_tail import LogTailer
+from log_sources import FileLogSource, SampleLogSource, iter_lines, parse_lines, rotated_files
+from multi_pattern import MultiPatternMatcher
+from template_miner import TemplateMiner
+
+
+def _write_rotated_logs(directory):
+    """Write app.log with one plain and one gzipped rotation"""
+    with gzip.open(os.path.join(directory, "app.log.2.gz"), "wt") as f:
+        f.write("2024-02-14 11:58:00 INFO Service started\n")
+        f.write("2024-02-14 11:59:00 ERROR Cache warmup failed\n")
+    with open(os.path.join(directory, "app.log.1"), "w") as f:
+        f.write("2024-02-14 12:00:00 ERROR Retry attempt 1 failed\n")
+        f.write("2024-02-14 12:00:01 ERROR Retry attempt 2 failed\n")
+    with open(os.path.join(directory, "app.log"), "w") as f:
+        f.write("2024-02-14 12:01:00 WARN Slow response\n")
+        f.write("2024-02-14 12:02:00 ERROR Connection reset\n")
+        f.write("  at db.connect(pool.py:42)\n")
 
 def test_search_logs():
     """Test log search tool"""
@@ -44,6 +76,726 @@ def test_detect_anomaly():
     print("test_detect_anomaly PASSED")
 
 
+def test_chunked_line_reassembly():
+    """Test that lines split across chunk boundaries are rebuilt"""
+    print("\n=== Testing chunked line reassembly ===")
+
+    chunks = ["2024-02-14 12:00:05 INFO Con", "nected\n2024-02-14 12:01:23 WA", "RN High\n"]
+    lines = list(iter_lines(chunks))
+    print(f"Lines: {lines}")
+
+    assert lines == ["2024-02-14 12:00:05 INFO Connected", "2024-02-14 12:01:23 WARN High"]
+    print("test_chunked_line_reassembly PASSED")
+
+
+def test_file_log_source():
+    """Test reading rotated and gzipped log files oldest to newest"""
+    print("\n=== Testing FileLogSource ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        _write_rotated_logs(directory)
+        files = [os.path.basename(p) for p in rotated_files(os.path.join(directory, "app.log"))]
+        print(f"Files: {files}")
+        assert files == ["app.log.2.gz", "app.log.1", "app.log"]
+
+        entries = list(FileLogSource(directory, chunk_size=16).iter_entries())
+        print(f"Entries read: {len(entries)}")
+        assert len(entries) == 7
+        assert entries[0].message == "Service started"
+        # Stack trace lines inherit the previous entry's timestamp and level
+        assert entries[-1].level == "ERROR"
+        assert entries[-1].timestamp == "2024-02-14 12:02:00"
+
+    print("test_file_log_source PASSED")
+
+
+def test_search_logs_file_source():
+    """Test search over a file source with an early-stopping result cap"""
+    print("\n=== Testing search_logs over files ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        _write_rotated_logs(directory)
+        server.set_log_source(FileLogSource(directory))
+        try:
+            result = _search_logs_impl("ERROR", "all", "default", max_results=2)
+            print(f"Matches returned: {result['match_count']} (truncated: {result['truncated']})")
+            assert result["match_count"] == 2
+            assert result["truncated"] is True
+            assert result["logs"][0]["message"] == "Cache warmup failed"
+
+            result = _search_logs_impl("retry attempt [0-9]", "all", "default")
+            assert result["match_count"] == 2
+            assert result["truncated"] is False
+
+            result = _detect_anomaly_impl("ERROR", 0.3)
+            print(f"Occurrences: {result['occurrence_count']}/{result['total_logs_analyzed']}")
+            assert result["occurrence_count"] == 4
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    print("test_search_logs_file_source PASSED")
+
+
+def test_query_planning():
+    """Test literal extraction from regex queries"""
+    print("\n=== Testing query planning ===")
+
+    assert literal_prefix("too many conn.*") == "too many conn"
+    assert literal_prefix("Retry attempt [0-9]") == "Retry attempt "
+    assert literal_prefix("timeouts?") == "timeout"
+    assert literal_prefix("ERROR|WARN") == ""
+    assert literal_terms("too many conn") == [("too", "suffix"), ("many", "exact"), ("conn", "prefix")]
+    print("test_query_planning PASSED")
+
+
+def test_log_index_search():
+    """Test indexed search with segment pruning and facets"""
+    print("\n=== Testing LogIndex ===")
+
+    index = LogIndex(bucket_seconds=60)
+    index.ingest(parse_lines(server.SAMPLE_LOGS))
+    print(f"Segments: {len(index.segments)}, rows: {index.row_count}")
+    assert len(index.segments) == 7
+    assert all(segment.sealed for segment in index.segments[:-1])
+
+    messages = [e.message for e in index.search("too many conn.*")]
+    assert messages == ["Database query failed: too many connections"]
+
+    # Substring matches inside tokens still resolve through the vocabulary
+    assert len(list(index.search("rror"))) == 5
+    assert len(list(index.search("retry attempt [0-9] failed"))) == 2
+    assert len(list(index.search("memory", level="WARN"))) == 1
+
+    since = index.since("2m", index.max_ts)
+    assert [e.timestamp for e in index.search("ERROR", since)] == ["2024-02-14 12:06:15"]
+    # Without an explicit anchor ranges count back from now, so old lines are out of range
+    assert abs(index.since("2m") - (time.time() - 120)) < 5
+    assert list(index.search("ERROR", index.since("1h"))) == []
+
+    # Indexed results agree with a full scan
+    result = _search_logs_impl("ERROR", "all", "default")
+    assert result["match_count"] == 5
+    print("test_log_index_search PASSED")
+
+
+def test_log_index_eviction():
+    """Test that evicted ranges fall back to a streaming scan"""
+    print("\n=== Testing LogIndex eviction ===")
+
+    index = LogIndex(bucket_seconds=60, max_rows=3)
+    index.ingest(parse_lines(server.SAMPLE_LOGS))
+    print(f"Rows kept: {index.row_count}, evicted before: {index.evicted_before}")
+    assert index.row_count <= 3
+    assert not index.covers(None)
+    assert index.covers(index.since("1m"))
+    print("test_log_index_eviction PASSED")
+
+
+def test_multi_pattern_matcher():
+    """Test overlapping and nested patterns in one pass"""
+    print("\n=== Testing MultiPatternMatcher ===")
+
+    matcher = MultiPatternMatcher(["error", "ERR", "timeout", "OUT", "oom"])
+    hits = matcher.match("ERROR: CONNECTION TIMEOUT")
+    print(f"Hits: {sorted(matcher.patterns[i] for i in hits)}")
+    assert hits == {0, 1, 2, 3}
+    assert matcher.match("INFO ALL GOOD") == frozenset()
+    print("test_multi_pattern_matcher PASSED")
+
+
+def test_detect_anomalies_batch():
+    """Test batch anomaly detection matches per-pattern results"""
+    print("\n=== Testing detect_anomalies ===")
+
+    patterns = ["ERROR", "WARN", "timeout", "memory"]
+    result = _detect_anomalies_impl(patterns, 0.3)
+    print(f"Anomalous patterns: {result['anomalous_patterns']}")
+
+    assert result["total_logs_analyzed"] == len(server.SAMPLE_LOGS)
+    for batch in result["results"]:
+        single = _detect_anomaly_impl(batch["pattern"], 0.3)
+        assert batch["occurrence_count"] == single["occurrence_count"]
+        assert batch["spike_details"] == single["spike_details"]
+        assert batch["severity"] == single["severity"]
+
+    errors = result["results"][0]
+    assert errors["occurrence_count"] == 5
+    assert errors["spikes_detected"] == 1
+    assert errors["spike_details"][0]["occurrence_count"] == 3
+    assert errors["spike_details"][0]["start_time"] == "2024-02-14 12:03:00"
+    print("test_detect_anomalies_batch PASSED")
+
+
+def test_anomaly_engine_time_buckets():
+    """Test rolling baselines flag a burst in time, per namespace"""
+    print("\n=== Testing AnomalyEngine ===")
+
+    engine = AnomalyEngine(bucket_seconds=60, window_buckets=30)
+    engine.track(["ERROR"])
+
+    lines = []
+    for minute in range(40):
+        lines.append(f"2024-02-14 12:{minute:02d}:00 ERROR Retry attempt 1 failed")
+        lines.append(f"2024-02-14 12:{minute:02d}:30 INFO Request processed successfully")
+    lines += [f"2024-02-14 12:40:{second:02d} ERROR Database query failed" for second in range(20)]
+
+    for entry in parse_lines(lines, namespace="payments"):
+        engine.observe(entry)
+
+    report = engine.report("ERROR", 0.9, namespace="payments")
+    print(f"Spikes: {report['spike_details']}")
+    assert report["occurrence_count"] == 60
+    assert report["spikes_detected"] == 1
+    spike = report["spike_details"][0]
+    assert spike["start_time"] == "2024-02-14 12:40:00"
+    assert spike["occurrence_count"] == 20
+    assert spike["baseline_per_bucket"] > 0.9
+    assert spike["sample_message"] == "Database query failed"
+
+    assert engine.report("ERROR", 0.9, namespace="billing")["occurrence_count"] == 0
+    print("test_anomaly_engine_time_buckets PASSED")
+
+
+def test_template_mining():
+    """Test messages cluster into templates that rank what is new or spiking"""
+    print("\n=== Testing template mining ===")
+
+    miner = TemplateMiner()
+    first = miner.add("Retry attempt 1 failed")
+    assert miner.add("Retry attempt 27 failed") is first
+    assert miner.add("Request from alice took 5ms").text == "Request from alice took <*>"
+    assert miner.add("Request from bob took 9ms").text == "Request from <*> took <*>"
+    assert miner.match("Request from carol took 1ms").id == 1
+    assert miner.match("Something else entirely") is None
+    assert first.text == "Retry attempt <*> failed" and first.count == 2
+
+    engine = AnomalyEngine(bucket_seconds=60, window_buckets=30)
+    lines = []
+    for minute in range(40):
+        lines.append(f"2024-02-14 12:{minute:02d}:00 INFO Health check passed")
+        lines.append(f"2024-02-14 12:{minute:02d}:30 INFO Request processed successfully in {minute}ms")
+    lines += [f"2024-02-14 12:40:{second:02d} ERROR Disk /dev/sd{second % 3} is full" for second in range(20)]
+    for entry in parse_lines(lines, namespace="payments"):
+        engine.observe(entry)
+
+    spiking = engine.top_templates(sort="spiking")
+    print(f"Spiking: {[(t['template'], t['peak_zscore']) for t in spiking]}")
+    assert [t["template"] for t in spiking] == ["Disk <*> is full"]
+    assert spiking[0]["count"] == 20 and spiking[0]["is_new"] is True
+    assert spiking[0]["latest_spike"]["start_time"] == "2024-02-14 12:40:00"
+    assert [t["template"] for t in engine.top_templates(sort="new")] == ["Disk <*> is full"]
+    by_count = engine.top_templates(sort="count", limit=2)
+    assert [t["count"] for t in by_count] == [40, 40] and not by_count[0]["is_new"]
+    assert engine.top_templates(namespace="billing", sort="count") == []
+
+    result = server._top_templates_impl(sort="count")
+    assert result["total_templates"] == len(result["templates"]) > 0
+    assert "error" in server._top_templates_impl(sort="loudest")
+    print("test_template_mining PASSED")
+
+
+def test_parallel_scan():
+    """Test sharded scans match a sequential scan and async tools run concurrently"""
+    print("\n=== Testing parallel scan ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        _write_rotated_logs(directory)
+        source = FileLogSource(directory)
+        pool = ScanPool(workers=2)
+        try:
+            expected = scan_shard(source, "ERROR|WARN", None, "default", None, 100)
+            result = pool.scan(source, "ERROR|WARN", None, "default", None, 100)
+            print(f"Matches: {len(result)} from {pool.tasks_submitted} shard tasks")
+            assert result == expected
+            assert pool.tasks_submitted == 3
+            assert pool.scan(source, "ERROR", None, "default", "ERROR", 1)[0].message == "Cache warmup failed"
+            # Files without a namespace label match every namespace
+            assert len(pool.scan(source, "ERROR|WARN", None, "other", None, 100)) == len(expected)
+        finally:
+            pool.shutdown()
+
+        # A tiny index evicts old rows, so "all" falls back to the pooled scan
+        original_index, original_pool = server._new_index, server.scan_pool
+        server._new_index = lambda: LogIndex(bucket_seconds=60, max_rows=2)
+        server.scan_pool = ScanPool(workers=2)
+        server.set_log_source(source)
+        try:
+            async def run():
+                return await asyncio.gather(
+                    server.search_logs("ERROR", "all", "default"),
+                    server.detect_anomaly("ERROR", 0.3),
+                    server.detect_anomalies(["WARN", "timeout"], 0.3)
+                )
+
+            search, anomaly, batch = asyncio.run(run())
+            assert server.scan_pool.tasks_submitted == 3
+            assert search["match_count"] == 4
+            assert anomaly["occurrence_count"] == 4
+            assert batch["results"][0]["occurrence_count"] == 1
+        finally:
+            server.scan_pool.shutdown()
+            server._new_index, server.scan_pool = original_index, original_pool
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    print("test_parallel_scan PASSED")
+
+
+def test_search_logs_budget():
+    """Test budgeted search returns a template summary and pages through matches with a cursor"""
+    print("\n=== Testing search_logs budget ===")
+
+    full = _search_logs_impl("ERROR", "all", "default")
+    templates = {t["template"]: t["count"] for t in full["summary"]["templates"]}
+    print(f"Templates: {templates}")
+    assert templates["Retry attempt {n} failed"] == 2
+    assert full["summary"]["levels"] == {"ERROR": 5}
+    assert "next_cursor" not in full
+
+    pages, cursor = [], None
+    while True:
+        page = _search_logs_impl("ERROR", "all", "default", max_bytes=1200, cursor=cursor)
+        assert len(json.dumps(page, separators=(",", ":"))) <= 1200
+        pages.append([log["message"] for log in page["logs"]])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    print(f"Pages: {[len(p) for p in pages]}")
+    assert len(pages) > 1
+    assert sum(pages, []) == [log["message"] for log in full["logs"]]
+
+    assert "error" in _search_logs_impl("ERROR", "all", cursor="bogus")
+    assert _search_logs_impl("ERROR", "all", max_results=-1)["logs"] == []
+    assert "error" in _search_logs_impl("ERROR", "all", max_results=-1)
+    assert _search_logs_impl("ERROR", "all", max_results=0)["match_count"] == 0
+
+    # Shaping drops entries from the page, but the level summary still counts every match
+    page = _search_logs_impl("ERROR", "all", "default", max_bytes=1200)
+    assert page["match_count"] < sum(page["summary"]["levels"].values()) == 5
+
+    # An absolute since starts the range at that moment, not relative to the newest line
+    later = full["logs"][2]["timestamp"]
+    result = _search_logs_impl("ERROR", "5m", "default", since=later.replace(" ", "T") + "Z")
+    assert [log["timestamp"] for log in result["logs"]] == [
+        log["timestamp"] for log in full["logs"] if log["timestamp"] >= later]
+    assert result["match_count"] == 3
+    assert "error" in _search_logs_impl("ERROR", since="yesterday")
+
+    report = _detect_anomaly_impl("ERROR", 0.3, max_bytes=200)
+    assert report["spikes_detected"] >= len(report["spike_details"])
+    print("test_search_logs_budget PASSED")
+
+
+def test_search_logs_cursor_and_streaming():
+    """Test cursors resume at the next match, survive new lines, and results stream as progress"""
+    print("\n=== Testing search_logs cursors and streaming ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        with open(path, "w") as f:
+            f.writelines(f"2024-02-14 12:{i // 6:02d}:{i % 6 * 10:02d} ERROR Retry attempt {i} failed\n"
+                         for i in range(50))
+        server.set_log_source(FileLogSource(path))
+        try:
+            pages, cursor = [], None
+            while True:
+                page = server._search_logs_impl("retry", "all", "default", max_results=15, cursor=cursor)
+                pages.append([log["message"] for log in page["logs"]])
+                cursor = page.get("next_cursor")
+                if not cursor:
+                    break
+                position = decode_cursor(cursor)
+                assert "p" in position and position["t"] is None
+            print(f"Pages: {[len(p) for p in pages]}")
+            assert [len(p) for p in pages] == [15, 15, 15, 5]
+            assert sum(pages, []) == [f"Retry attempt {i} failed" for i in range(50)]
+
+            # Later pages resume at their position instead of re-verifying earlier rows
+            index = server._current_index()
+            stats = {"scanned": 0}
+            start = tuple(decode_cursor(server._search_logs_impl("retry", "all", max_results=40)["next_cursor"])["p"])
+            assert len(list(index.search_from("retry", None, None, "default", start, stats))) == 10
+            assert stats["scanned"] == 10
+
+            first = server._search_logs_impl("retry", "all", "default", max_results=45)
+            assert "error" in server._search_logs_impl("timeout", "all", cursor=first["next_cursor"])
+
+            # Lines appended after the first page show up on the next one
+            with open(path, "a") as f:
+                f.writelines(f"2024-02-14 12:08:{s:02d} ERROR Retry attempt {50 + s} failed\n" for s in range(5))
+            rest = server._search_logs_impl("retry", "all", "default", cursor=first["next_cursor"])
+            assert [log["message"] for log in rest["logs"]] == [f"Retry attempt {i} failed" for i in range(45, 55)]
+
+            async def stream():
+                from fastmcp import Client
+
+                batches = []
+
+                async def on_progress(progress, total, message):
+                    batches.append((progress, total, json.loads(message)["items"]))
+
+                async with Client(server.mcp) as client:
+                    result = await client.call_tool("search_logs", {"query": "retry", "time_range": "all",
+                                                                    "max_results": 45},
+                                                    progress_handler=on_progress)
+                return batches, result.data
+
+            batches, result = asyncio.run(stream())
+            print(f"Progress: {[(p, len(items)) for p, _, items in batches]}")
+            assert [p for p, _, _ in batches] == [20, 40, 45]
+            assert all(total == 45 for _, total, _ in batches)
+            streamed = [log["message"] for _, _, items in batches for log in items]
+            assert streamed == [log["message"] for log in result["logs"]]
+
+            # Under a byte budget only the entries kept on each page are streamed, so
+            # following the cursor streams every match exactly once
+            streamed, cursor, emitted = [], None, []
+            while True:
+                page = server._search_logs_impl("retry", "all", "default", max_results=15, max_bytes=1500,
+                                                cursor=cursor, emit=emitted.append)
+                streamed += [log["message"] for log in page["logs"]]
+                cursor = page.get("next_cursor")
+                if not cursor:
+                    break
+            assert len(streamed) > 15
+            assert [log["message"] for items in emitted for log in items] == streamed
+            assert streamed == [f"Retry attempt {i} failed" for i in range(55)]
+            assert all(emitted)
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    print("test_search_logs_cursor_and_streaming PASSED")
+
+
+def _write_pod_tree(root):
+    """root/<namespace>/<pod>/app.log with interleaved timestamps and a labels file per pod"""
+    pods = {
+        ("payments", "checkout-7d9f-a"): ('app="checkout"', [0, 3, 6]),
+        ("payments", "checkout-7d9f-b"): ('app="checkout"', [1, 4, 7]),
+        ("payments", "ledger-0"): ('app="ledger"', [2, 5]),
+        ("shop", "checkout-5c4e-a"): ('app="checkout"\ntier="edge"', [8]),
+    }
+    for (namespace, pod), (labels, seconds) in pods.items():
+        pod_dir = os.path.join(root, namespace, pod)
+        os.makedirs(pod_dir)
+        with open(os.path.join(pod_dir, "labels"), "w") as f:
+            f.write(labels + "\n")
+        with open(os.path.join(pod_dir, "app.log"), "w") as f:
+            for second in seconds:
+                f.write(f"2024-02-14 12:00:{second:02d} ERROR {pod} request failed\n")
+
+
+def test_pod_fanout():
+    """Test pods are selected by label across namespaces and merged in timestamp order"""
+    print("\n=== Testing multi-pod fan-out ===")
+
+    labels = {"app": "checkout", "env": "prod"}
+    assert matches_selector(labels, "app=checkout,env in (prod, stage)")
+    assert matches_selector(labels, "app==checkout,!canary,tier notin (cache)")
+    assert not matches_selector(labels, "app!=checkout")
+    assert not matches_selector(labels, "tier")
+    for bad in ("=web", "!app in (x)", "app in x"):
+        try:
+            parse_selector(bad)
+            assert False, f"{bad!r} accepted"
+        except ValueError:
+            pass
+
+    with tempfile.TemporaryDirectory() as root:
+        _write_pod_tree(root)
+
+        source = PodLogSource(PodDirectory(root), concurrency=2)
+        entries = list(source.iter_entries())
+        print(f"Merged {len(entries)} entries from {source.pods_read} pods")
+        assert [e.timestamp[-2:] for e in entries] == [f"{i:02d}" for i in range(9)]
+        assert entries[0].pod == "checkout-7d9f-a" and entries[2].pod == "ledger-0"
+        assert entries[-1].namespace == "shop"
+
+        checkout = source.select(["payments"], "app=checkout")
+        assert [p.name for p in checkout.list_pods()] == ["checkout-7d9f-a", "checkout-7d9f-b"]
+        assert PodLogSource(PodDirectory(root), namespaces=["shop"]).select(["payments"]).list_pods() == []
+
+        # Never more pods read at once than the connection limit
+        directory = PodDirectory(root)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def read_lines(pod, tail_lines=None):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            lines = PodDirectory.read_lines(directory, pod, tail_lines)
+            with lock:
+                active[0] -= 1
+            return lines
+
+        directory.read_lines = read_lines
+        assert len(list(PodLogSource(directory, concurrency=2).iter_entries())) == 9
+        print(f"Peak concurrent pod reads: {peak[0]}")
+        assert peak[0] == 2
+
+        tail = PodLogSource(PodDirectory(root), ["payments"], "app=checkout", tail_lines=1)
+        assert [e.timestamp[-2:] for e in tail.iter_entries()] == ["06", "07"]
+
+        server.set_log_source(PodLogSource(PodDirectory(root)))
+        try:
+            result = _search_logs_impl("failed", time_range="all", namespace="*")
+            assert result["match_count"] == 9
+            assert {log["namespace"] for log in result["logs"]} == {"payments", "shop"}
+            assert all(log["pod"] for log in result["logs"])
+
+            result = _search_logs_impl("failed", time_range="all", namespace="payments")
+            assert result["match_count"] == 8
+
+            result = _search_logs_impl("failed", time_range="all", namespace="*", label_selector="app=checkout",
+                                       max_results=4)
+            pods = [log["pod"] for log in result["logs"]]
+            print(f"Checkout matches: {pods}")
+            assert pods == ["checkout-7d9f-a", "checkout-7d9f-b", "checkout-7d9f-a", "checkout-7d9f-b"]
+            rest = _search_logs_impl("failed", time_range="all", namespace="*", label_selector="app=checkout",
+                                     max_results=4, cursor=result["next_cursor"])
+            assert [log["pod"] for log in rest["logs"]] == ["checkout-7d9f-a", "checkout-7d9f-b", "checkout-5c4e-a"]
+            assert not rest["truncated"]
+
+            assert "error" in _search_logs_impl("failed", label_selector="app in checkout")
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    assert "error" in _search_logs_impl("failed", label_selector="app=checkout")
+    print("test_pod_fanout PASSED")
+
+
+def test_tailing_ingest():
+    """Test appended lines are ingested incrementally across rotation, truncation and restarts"""
+    print("\n=== Testing tailing ingest ===")
+
+    def append(path, *lines, newline=True):
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + ("\n" if newline else ""))
+
+    def failures():
+        return _search_logs_impl("failed", time_range="all")["match_count"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        checkpoint = os.path.join(directory, "checkpoint.json")
+        append(path, *[f"2024-02-14 12:00:0{i} ERROR request {i} failed" for i in range(3)])
+
+        server.set_log_source(FileLogSource(path))
+        try:
+            assert server.start_ingest(checkpoint, background=False)
+            tailer = server._tailer
+            assert failures() == 3
+
+            # Only the new bytes are read; a partial line waits for its newline
+            line = "2024-02-14 12:00:03 ERROR request 3 failed"
+            read = tailer.bytes_read
+            append(path, line)
+            append(path, "2024-02-14 12:00:04 ERROR request 4", newline=False)
+            assert failures() == 4
+            assert tailer.bytes_read - read == len(line) + 1
+            append(path, " failed", "    at Worker.run(worker.py:12)")
+            assert failures() == 5
+            continuation = list(server.log_index.search("Worker.run"))
+            assert continuation[0].level == "ERROR" and continuation[0].timestamp.endswith("12:00:04")
+
+            # logrotate: the renamed file is finished, the new live file read from the start
+            append(path, "2024-02-14 12:00:05 ERROR request 5 failed")
+            os.rename(path, path + ".1")
+            append(path, "2024-02-14 12:00:06 ERROR request 6 failed")
+            assert failures() == 7
+            assert len(tailer.positions) == 2
+
+            # Restart: resume from the checkpoint without re-reading
+            server.stop_ingest()
+            assert server.start_ingest(checkpoint, background=False)
+            tailer = server._tailer
+            print(f"Resumed at {len(tailer.positions)} positions, read {tailer.bytes_read} bytes")
+            assert tailer.bytes_read == 0
+            assert server.log_index.row_count == 0
+            assert failures() == 7  # History before the checkpoint comes from a full scan
+            append(path, "2024-02-14 12:00:07 ERROR request 7 failed")
+            # A quiet source does not pass hours-old lines off as recent
+            assert _search_logs_impl("failed", time_range="1h")["match_count"] == 0
+            server.TIME_RANGE_ANCHOR = "newest"
+            try:
+                assert _search_logs_impl("failed", time_range="1s")["match_count"] == 2
+            finally:
+                server.TIME_RANGE_ANCHOR = "now"
+            assert server.log_index.row_count == 1
+            # A newly tracked pattern is backfilled from what this run ingested, like the defaults
+            read = tailer.bytes_read
+            assert _detect_anomaly_impl("request", 0.3)["occurrence_count"] == 1
+            assert _detect_anomaly_impl("ERROR", 0.3)["occurrence_count"] == 1
+            assert tailer.bytes_read == read
+
+            # copytruncate-style truncation starts the file over
+            with open(path, "w") as f:
+                f.write("2024-02-14 12:00:08 ERROR request 8 failed\n")
+            server._refresh()
+            assert [e.message for e in server.log_index.search("request")][-1] == "request 8 failed"
+
+            assert LogTailer(checkpoint).positions == tailer.positions
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    assert server._tailer is None
+    assert not server.start_ingest()  # In-memory sample logs cannot be tailed
+    print("test_tailing_ingest PASSED")
+
+
+def test_search_logs_result_cache():
+    """Test repeated searches are answered from the result cache until new lines arrive"""
+    print("\n=== Testing search result cache ===")
+    from fastmcp import Client
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        with open(path, "w") as f:
+            f.write(f"{now} ERROR request 0 failed\n")
+        server.set_log_source(FileLogSource(path))
+
+        async def search(arguments):
+            async with Client(server.mcp) as client:
+                return (await client.call_tool("search_logs", arguments)).structured_content
+
+        try:
+            first = asyncio.run(search({"query": "ERROR", "time_range": "5m"}))
+            again = asyncio.run(search({"query": "(?:error)", "time_range": "300s"}))
+            # A cache hit is the very same response, down to its timestamp
+            assert again["search_timestamp"] == first["search_timestamp"]
+            assert again["match_count"] == 1
+
+            with open(path, "a") as f:
+                f.write(f"{now} ERROR request 1 failed\n")
+            fresh = asyncio.run(search({"query": "error"}))
+            print(f"Matches before / after append: {first['match_count']} / {fresh['match_count']}")
+            assert fresh["match_count"] == 2
+
+            # Other namespaces are other results
+            other = asyncio.run(search({"query": "error", "namespace": "payments"}))
+            assert other["search_timestamp"] != fresh["search_timestamp"]
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    print("test_search_logs_result_cache PASSED")
+
+
+def test_log_signals():
+    """Test log counts are served as aligned per-bucket series for correlation"""
+    print("\n=== Testing log signals ===")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        with open(path, "w") as f:
+            for minute in range(30):
+                f.write(f"2024-02-14 12:{minute:02d}:00 INFO Health check passed\n")
+                f.write(f"2024-02-14 12:{minute:02d}:30 ERROR Retry attempt {minute} failed\n")
+            for second in range(25):
+                f.write(f"2024-02-14 12:30:{second:02d} ERROR Connection refused: too many connections, {second} active\n")
+        server.set_log_source(FileLogSource(path))
+        try:
+            result = server._log_signals_impl(window="10m", patterns=["ERROR", "timeout"], templates=2)
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+
+    signals = {s["name"]: s for s in result["signals"]}
+    print(f"Signals: {[(name, s['counts'][-3:]) for name, s in signals.items()]}")
+    assert result["buckets"] == 10 and result["step_seconds"] == 60
+    # The newest bucket is the one the burst landed in
+    assert result["start"] + 9 * 60 == parse_timestamp("2024-02-14 12:30:00")
+    assert signals["ERROR"]["counts"] == [1] * 9 + [25]
+    assert signals["timeout"]["counts"] == [0] * 10
+    burst = next(s for s in result["signals"] if s["kind"] == "template")
+    assert burst["name"] == "Connection refused: too many connections, <*> active"
+    assert burst["counts"] == [0] * 9 + [25] and burst["peak_zscore"] > 3
+    # Without spikes to fill the slots, the busiest templates follow
+    assert len([s for s in result["signals"] if s["kind"] == "template"]) == 2
+    assert "error" in server._log_signals_impl(window="soon")
+    print("test_log_signals PASSED")
+
+
+def test_columnar_store():
+    """Test sealed segments compact to mapped columnar files that answer evicted ranges"""
+    print("\n=== Testing columnar log store ===")
+    import log_store
+
+    lines = []
+    for i in range(1200):
+        minute, second = divmod(i, 60)
+        level = ("INFO", "WARN", "ERROR")[i % 3]
+        lines.append(f"2024-02-14 12:{minute:02d}:{second:02d} {level} request {i} from pod-{i % 7} handled")
+        if i % 50 == 0:
+            lines.append(f"    at Handler.run(handler.py:{i})")
+    entries = []
+    for i, entry in enumerate(parse_lines(lines)):
+        entries.append(entry._replace(namespace=(None, "payments", "billing")[i % 3], pod=f"pod-{i % 7}"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = log_store.ColumnStore(directory)
+        store.reset()
+        index = LogIndex(bucket_seconds=60, max_rows=300, store=store)
+        index.ingest(entries)
+        index.seal()
+        print(f"{len(store)} segments, {store.bytes} bytes on disk, {index.row_count} rows in memory")
+        assert len(store) == 20 and index.row_count <= 300 and index.evicted_before is not None
+        assert index.covers(None)
+
+        since = parse_timestamp("2024-02-14 12:04:30")
+        numpy_module = log_store.np
+        for np_module in (numpy_module, None):
+            log_store.np = np_module
+            reopened = log_store.ColumnStore(directory)
+            for query, since_ts, level, namespace in [("request", None, None, None), ("Handler", since, None, None),
+                                                      ("pod-3", since, "error", "payments"), ("handled$", None, "WARN", "billing")]:
+                expected = list(scan_entries(entries, query, since_ts, namespace, level))
+                found = [entry for _, entry in reopened.search_from(query, since_ts, level, namespace)]
+                assert found == expected, (query, len(found), len(expected))
+                assert list(index.search(query, since_ts, level, namespace)) == expected
+        log_store.np = numpy_module
+
+        # Positions resume across the store and the in-memory segments
+        first = list(islice(index.search_from("request", None, "ERROR"), 150))
+        rest = list(index.search_from("request", None, "ERROR", start=first[-1][0]))
+        assert [e for _, e in first] + [e for _, e in rest[1:]] == list(scan_entries(entries, "request", None, None, "ERROR"))
+
+        # Only the blocks holding surviving rows are decompressed
+        segment = store.segments[0]
+        assert segment.select(level="ERROR", namespace="billing") == [
+            row for row in range(segment.rows)
+            if segment.levels[segment.column("level")[row]] == "ERROR"
+            and segment.namespaces[segment.column("namespace")[row]] in ("billing", None)]
+
+        store.max_bytes = store.bytes // 2
+        store._enforce_retention()
+        assert store.retained_from is not None and not index.covers(None)
+        assert index.covers(store.retained_from)
+
+    # Restarts serve the history before the checkpoint from the store, not by re-reading the files
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        checkpoint = os.path.join(directory, "checkpoint.json")
+        store_dir = os.path.join(directory, "store")
+        with open(path, "w") as f:
+            f.write("\n".join(lines[:400]) + "\n")
+        server.set_log_source(FileLogSource(path))
+        try:
+            assert server.start_ingest(checkpoint, background=False, store_dir=store_dir)
+            server.stop_ingest()
+            assert server.start_ingest(checkpoint, background=False, store_dir=store_dir)
+            assert server.log_index.row_count == 0 and server.log_index.covers(None)
+            with open(path, "a") as f:
+                f.write("2024-02-14 12:30:00 ERROR request 9999 from pod-1 handled\n")
+            result = _search_logs_impl("handled", time_range="all", max_results=1000, max_bytes=10 ** 7)
+            print(f"Matches after restart: {result['match_count']}")
+            assert result["match_count"] == sum("handled" in line for line in lines[:400]) + 1
+            assert "next_cursor" not in result
+        finally:
+            server.set_log_source(SampleLogSource(server.SAMPLE_LOGS))
+    print("test_columnar_store PASSED")
+
+
 if __name__ == "__main__":
     print("Testing LogAnalyzer MCP Server")
     print("=" * 50)
@@ -51,6 +803,24 @@ if __name__ == "__main__":
     try:
         test_search_logs()
         test_detect_anomaly()
+        test_chunked_line_reassembly()
+        test_file_log_source()
+        test_search_logs_file_source()
+        test_query_planning()
+        test_log_index_search()
+        test_log_index_eviction()
+        test_multi_pattern_matcher()
+        test_detect_anomalies_batch()
+        test_anomaly_engine_time_buckets()
+        test_template_mining()
+        test_parallel_scan()
+        test_search_logs_budget()
+        test_search_logs_cursor_and_streaming()
+        test_pod_fanout()
+        test_tailing_ingest()
+        test_search_logs_result_cache()
+        test_log_signals()
+        test_columnar_store()
         print("\n" + "=" * 50)
         print("ALL TESTS PASSED")
         print("=" * 50)
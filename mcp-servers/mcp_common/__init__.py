@@ -0,0 +1,6 @@
+"""Shared helpers for the AgentPitCrew MCP servers"""
+
+from mcp_common.instrumentation import REGISTRY, instrument, record_cache, record_rows
+from mcp_common.transport import DrainState, create_app, serve
+
+__all__ = ["DrainState", "REGISTRY", "create_app", "instrument", "record_cache", "record_rows", "serve"]
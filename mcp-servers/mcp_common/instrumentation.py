@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Per-tool instrumentation for the AgentPitCrew MCP servers
+Call counts, latency and response-size histograms, errors, rows scanned vs. returned
+and cache hits, exported in the Prometheus text format, with optional OTLP spans
+"""
+
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from fastmcp.server.middleware import Middleware
+
+logger = logging.getLogger("mcp-common")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+# ---------------- METRICS ---------------- #
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return state[2] if state else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """A named set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+_TOOL_LABELS = ("server", "tool")
+
+TOOL_CALLS = REGISTRY.counter("mcp_tool_calls_total", "MCP tool calls by outcome",
+                              _TOOL_LABELS + ("status",))
+TOOL_ERRORS = REGISTRY.counter("mcp_tool_errors_total", "MCP tool calls that raised, by exception type",
+                               _TOOL_LABELS + ("error",))
+TOOL_LATENCY = REGISTRY.histogram("mcp_tool_duration_seconds", "MCP tool call latency", _TOOL_LABELS)
+TOOL_RESPONSE_BYTES = REGISTRY.histogram("mcp_tool_response_bytes", "Serialized MCP tool result size",
+                                         _TOOL_LABELS, SIZE_BUCKETS)
+ROWS_SCANNED = REGISTRY.counter("mcp_tool_rows_scanned_total", "Rows a tool examined", _TOOL_LABELS)
+ROWS_RETURNED = REGISTRY.counter("mcp_tool_rows_returned_total", "Rows a tool returned", _TOOL_LABELS)
+CACHE_LOOKUPS = REGISTRY.counter("mcp_cache_lookups_total", "Cache lookups by cache and result",
+                                 ("cache", "result"))
+
+
+# ---------------- RECORDING FROM TOOLS ---------------- #
+
+class CallStats:
+    """Figures a tool reports about the call in progress."""
+
+    __slots__ = ("rows_scanned", "rows_returned")
+
+    def __init__(self):
+        self.rows_scanned = 0
+        self.rows_returned = 0
+
+
+# Set by the middleware for each call. Tools running on a worker thread via
+# asyncio.to_thread see a copy of the context, so this holds a mutable object
+_current_call: ContextVar[Optional[CallStats]] = ContextVar("mcp_current_call", default=None)
+
+
+def record_rows(scanned: Optional[int] = None, returned: Optional[int] = None) -> None:
+    """Add to the rows scanned / returned by the current tool call; a no-op outside one."""
+    stats = _current_call.get()
+    if stats is None:
+        return
+    if scanned:
+        stats.rows_scanned += scanned
+    if returned:
+        stats.rows_returned += returned
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ---------------- MIDDLEWARE ---------------- #
+
+def response_size(result) -> int:
+    """Bytes of the tool result as it goes over the wire: content blocks plus structured content."""
+    size = 0
+    for block in getattr(result, "content", None) or ():
+        text = getattr(block, "text", None)
+        size += len(text.encode()) if isinstance(text, str) else len(block.model_dump_json())
+    structured = getattr(result, "structured_content", None)
+    if structured is not None:
+        size += len(json.dumps(structured, default=str, separators=(",", ":")).encode())
+    return size
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Records latency, outcome, response size and reported rows for every tools/call."""
+
+    def __init__(self, server_name: str):
+        self.server_name = server_name
+
+    async def on_call_tool(self, context, call_next):
+        tool = context.message.name
+        labels = {"server": self.server_name, "tool": tool}
+        stats = CallStats()
+        token = _current_call.set(stats)
+        started = time.perf_counter()
+        try:
+            result = await call_next(context)
+        except Exception as e:
+            TOOL_CALLS.inc(status="error", **labels)
+            # FastMCP wraps tool exceptions in ToolError; count the original type
+            TOOL_ERRORS.inc(error=type(e.__cause__ or e).__name__, **labels)
+            raise
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - started, **labels)
+            _current_call.reset(token)
+            ROWS_SCANNED.inc(stats.rows_scanned, **labels)
+            ROWS_RETURNED.inc(stats.rows_returned, **labels)
+
+        is_error = getattr(result, "is_error", False)
+        TOOL_CALLS.inc(status="error" if is_error else "ok", **labels)
+        if is_error:
+            TOOL_ERRORS.inc(error="ToolResultError", **labels)
+        size = response_size(result)
+        TOOL_RESPONSE_BYTES.observe(size, **labels)
+        _annotate_span(size, stats)
+        return result
+
+
+def _annotate_span(size: int, stats: CallStats) -> None:
+    """Attach size and row counts to the tool span FastMCP opened, when tracing is on."""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attribute("mcp.tool.response_bytes", size)
+        span.set_attribute("mcp.tool.rows_scanned", stats.rows_scanned)
+        span.set_attribute("mcp.tool.rows_returned", stats.rows_returned)
+
+
+def instrument(mcp) -> None:
+    """Add the metrics middleware to mcp once, outermost so that it also times cache hits."""
+    if not any(isinstance(m, ToolMetricsMiddleware) for m in mcp.middleware):
+        mcp.middleware.insert(0, ToolMetricsMiddleware(mcp.name))
+
+
+# ---------------- EXPORT ---------------- #
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        payload = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve /metrics on its own port from a daemon thread, for scrapers that expect a
+    dedicated metrics port and for stdio servers that have no HTTP listener.
+    """
+    httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+    return httpd
+
+
+def configure_tracing(service_name: str) -> bool:
+    """
+    Export the spans FastMCP already emits over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT
+    is set. Needs opentelemetry-sdk and opentelemetry-exporter-otlp; without them
+    tracing stays off and only a warning is logged.
+    """
+    endpoint = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not endpoint:
+        return False
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk / "
+                       "opentelemetry-exporter-otlp are not installed; tracing is disabled")
+        return False
+
+    resource = Resource.create({"service.name": os.environ.get("OTEL_SERVICE_NAME", service_name)})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    trace.set_tracer_provider(provider)
+    logger.info("Exporting OTLP spans to %s", endpoint)
+    return True
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Incremental results for long-running MCP tools
+Runs a blocking tool body on a worker thread and forwards the batches it emits to
+the client as progress notifications, in order, while the body is still running
+"""
+
+from typing import Any, Callable, Optional
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger("mcp-common")
+
+
+async def run_streaming(ctx, fn: Callable[..., Any], *args, total: Optional[float] = None, **kwargs) -> Any:
+    """
+    Call fn(*args, emit=emit, **kwargs) on a worker thread and return its result.
+
+    Each emit(items) call becomes one progress notification whose progress is the
+    number of items emitted so far and whose message is {"items": [...]} as JSON.
+    Clients that did not ask for progress (and calls without a ctx) simply get the
+    final result; a failing notification never fails the tool call.
+    """
+    if ctx is None:
+        return await asyncio.to_thread(fn, *args, emit=lambda items: None, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(items: list) -> None:
+        if items:
+            loop.call_soon_threadsafe(queue.put_nowait, list(items))
+
+    async def forward() -> None:
+        sent = 0
+        while True:
+            items = await queue.get()
+            if items is None:
+                return
+            sent += len(items)
+            try:
+                await ctx.report_progress(sent, total, json.dumps({"items": items}, default=str))
+            except Exception as e:
+                logger.debug("Dropping progress notification: %s", e)
+
+    forwarder = asyncio.create_task(forward())
+    try:
+        return await asyncio.to_thread(fn, *args, emit=emit, **kwargs)
+    finally:
+        # Batches emitted by the worker are already queued ahead of the sentinel
+        queue.put_nowait(None)
+        await forwarder
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Memoised tool results for repeated agent queries
+Arguments are canonicalised (case, equivalent regexes, time ranges) so that calls
+which only differ in spelling share an entry; entries live in a byte-bounded LRU,
+expire after a per-tool TTL and are dropped as soon as the tool's data version moves
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+import asyncio
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+from fastmcp.server.middleware import Middleware
+
+from mcp_common.instrumentation import record_cache, response_size
+
+try:
+    import re._parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+
+# Total size of cached results; least recently used entries are evicted beyond it
+DEFAULT_MAX_BYTES = int(os.environ.get("MCP_RESULT_CACHE_BYTES", 16 * 1024 * 1024))
+
+# Results larger than this share of the cache are not cached at all
+MAX_ENTRY_SHARE = 0.25
+
+DEFAULT_TTL = 60.0
+
+
+# ---------------- CANONICAL ARGUMENTS ---------------- #
+
+def lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def upper(value):
+    return value.upper() if isinstance(value, str) else value
+
+
+def duration(parse: Callable[[str], Optional[float]]) -> Callable[[Any], Any]:
+    """
+    Key time ranges by their length in seconds, as the tool's own parser reads them,
+    so that "5m" and "300s" share an entry. Values the parser rejects keep their spelling.
+    """
+    def normalize(value):
+        if not isinstance(value, str):
+            return value
+        try:
+            seconds = parse(value)
+        except ValueError:
+            seconds = None
+        return seconds if seconds is not None else value.strip()
+    return normalize
+
+
+def _fold(code: int) -> str:
+    # casefold, not lower: some characters fold to several ("İ" -> "i̇"), so keep the string
+    return chr(code).casefold()
+
+
+def _canonical_tree(items, ignore_case: bool, keep_groups: bool) -> list:
+    out = []
+    for op, av in items:
+        name = str(op)
+        if name == "LITERAL" and ignore_case:
+            out.append(("LITERAL", _fold(av)))
+        elif name == "SUBPATTERN" and not keep_groups and not av[1] and not av[2]:
+            # Groups only matter to backreferences; without them (x) matches like x
+            out.extend(_canonical_tree(av[3], ignore_case, keep_groups))
+        elif name == "SUBPATTERN":
+            out.append((name, av[0], av[1], av[2], _canonical_tree(av[3], ignore_case, keep_groups)))
+        elif name == "BRANCH":
+            # Whether a line matches does not depend on the order of the alternatives
+            branches = sorted(repr(_canonical_tree(b, ignore_case, keep_groups)) for b in av[1])
+            out.append((name, branches))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            low, high, body = av
+            body = _canonical_tree(body, ignore_case, keep_groups)
+            if low == high == 1:
+                out.extend(body)  # x{1} is x
+            else:
+                out.append(("REPEAT", low, high, body))
+        elif name in ("IN", "ASSERT", "ASSERT_NOT", "GROUPREF_EXISTS", "ATOMIC_GROUP"):
+            out.append((name, repr(_canonical_nested(av, ignore_case, keep_groups))))
+        else:
+            out.append((name, repr(av)))
+    return out
+
+
+def _canonical_nested(av, ignore_case: bool, keep_groups: bool):
+    if isinstance(av, list):
+        items = [_canonical_nested(a, ignore_case, keep_groups) for a in av]
+        return sorted(items, key=repr)
+    if isinstance(av, tuple) and len(av) == 2 and str(av[0]) == "LITERAL" and ignore_case:
+        return ("LITERAL", _fold(av[1]))
+    if isinstance(av, tuple):
+        return tuple(_canonical_nested(a, ignore_case, keep_groups) for a in av)
+    if hasattr(av, "data"):
+        return _canonical_tree(av.data, ignore_case, keep_groups)
+    return str(av) if hasattr(av, "name") else av
+
+
+def regex(ignore_case: bool = True) -> Callable[[Any], Any]:
+    """
+    Canonical form of a search pattern: "ERROR", "error", "(?:ERROR)" and "[E]RROR"
+    share one key when matching ignores case, as do "timeout|OOM" and "OOM|timeout".
+    Patterns that are not valid regexes are keyed as substrings.
+    """
+    def normalize(value):
+        if not isinstance(value, str):
+            return value
+        try:
+            parsed = _sre_parse.parse(value)
+        except (re.error, RecursionError):
+            return "substring:" + (value.casefold() if ignore_case else value)
+        keep_groups = "GROUPREF" in repr(parsed.data)
+        return "regex:" + repr((parsed.state.flags, _canonical_tree(parsed.data, ignore_case, keep_groups)))
+    return normalize
+
+
+# ---------------- CACHE ---------------- #
+
+class CachePolicy:
+    """How one tool is cached: TTL, argument canonicalisation and its data version."""
+
+    def __init__(self, tool: str, ttl: float = DEFAULT_TTL, defaults: Optional[dict] = None,
+                 normalize: Optional[dict[str, Callable[[Any], Any]]] = None,
+                 version: Optional[Callable[[], Any]] = None):
+        self.tool = tool
+        self.ttl = ttl
+        self.defaults = defaults or {}
+        self.normalize = normalize or {}
+        self.version = version
+
+    def key(self, arguments: Optional[dict]) -> str:
+        canonical = dict(self.defaults)
+        canonical.update(arguments or {})
+        for name, normalize in self.normalize.items():
+            value = canonical.get(name)
+            if isinstance(value, list):
+                canonical[name] = [normalize(v) for v in value]
+            elif value is not None:
+                canonical[name] = normalize(value)
+        return self.tool + ":" + json.dumps(canonical, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class ResultCache:
+    """
+    LRU of tool results bounded by their serialized size. An entry is served only
+    while it is younger than its tool's TTL and was computed at the tool's current
+    data version.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.policies: dict[str, CachePolicy] = {}
+        self._entries: OrderedDict[str, tuple[float, Any, Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(self, policy: CachePolicy) -> None:
+        self.policies[policy.tool] = policy
+
+    def get(self, key: str, version: Any = None):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, entry_version, value, size = item
+            if expires < time.monotonic() or entry_version != version:
+                del self._entries[key]
+                self.size -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float, version: Any = None) -> bool:
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[3]
+            self._entries[key] = (time.monotonic() + ttl, version, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+RESULT_CACHE = ResultCache()
+
+
+class ResultCacheMiddleware(Middleware):
+    """Answers tools/call from the cache for tools with a registered policy."""
+
+    def __init__(self, cache: ResultCache):
+        self.cache = cache
+
+    async def on_call_tool(self, context, call_next):
+        policy = self.cache.policies.get(context.message.name)
+        if policy is None:
+            return await call_next(context)
+
+        key = policy.key(context.message.arguments)
+        # Probing the version may refresh the tool's data, so it runs off the event loop
+        version = await asyncio.to_thread(policy.version) if policy.version else None
+        cached = self.cache.get(key, version)
+        record_cache(f"tool:{policy.tool}", cached is not None)
+        if cached is not None:
+            return cached
+
+        result = await call_next(context)
+        if not getattr(result, "is_error", False):
+            self.cache.set(key, result, response_size(result), policy.ttl, version)
+        return result
+
+
+def cache_tool(mcp, fn: Callable, ttl: float = DEFAULT_TTL,
+               normalize: Optional[dict[str, Callable[[Any], Any]]] = None,
+               version: Optional[Callable[[], Any]] = None, cache: ResultCache = RESULT_CACHE) -> CachePolicy:
+    """
+    Cache the results of the tool fn (a function registered with @mcp.tool()).
+    Omitted arguments are keyed by their defaults, so search_logs("ERROR") and
+    search_logs("error", time_range="300s") hit the same entry. version is called
+    on every lookup, on a worker thread, and should be cheap; results computed at
+    another version are never returned. Only read-only tools should be cached.
+    """
+    defaults = {
+        name: parameter.default for name, parameter in inspect.signature(fn).parameters.items()
+        if parameter.default is not inspect.Parameter.empty and name != "ctx"
+    }
+    policy = CachePolicy(fn.__name__, ttl, defaults, normalize, version)
+    cache.register(policy)
+    if not any(isinstance(m, ResultCacheMiddleware) and m.cache is cache for m in mcp.middleware):
+        mcp.add_middleware(ResultCacheMiddleware(cache))
+    return policy
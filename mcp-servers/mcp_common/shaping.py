@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Response shaping for LLM-facing tool outputs
+Keeps tool results inside a byte / token budget: repeated messages collapse into
+templates with counts, summaries come before detail, and lists that do not fit are
+cut with a cursor the caller passes back to continue
+"""
+
+from typing import Any, Callable, Iterable, Optional
+import base64
+import binascii
+import json
+import os
+import re
+
+# Rough bytes per LLM token for English text and JSON punctuation
+BYTES_PER_TOKEN = 4
+
+# Budget for a tool response when the caller sets neither max_tokens nor max_bytes
+DEFAULT_MAX_BYTES = int(os.environ.get("MCP_RESPONSE_MAX_BYTES", 32768))
+
+# Templates listed in a summary before the rest are folded into "other"
+DEFAULT_MAX_TEMPLATES = 20
+
+# Variable parts of a log message, most specific first. Hex ids must mix digits and
+# letters and be at least 8 long, so words such as "add" or "cafe" survive
+_VARIABLES = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "{uuid}"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "{ip}"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b(?=[0-9a-f]*[a-f])(?=[0-9a-f]*\d)[0-9a-f]{8,}\b", re.I), "{hex}"),
+    (re.compile(r"(?<![A-Za-z])-?\d+(?:\.\d+)?"), "{n}"),
+]
+
+
+def budget_bytes(max_tokens: Optional[int] = None, max_bytes: Optional[int] = None,
+                 default: int = DEFAULT_MAX_BYTES) -> int:
+    """The byte budget for one response; the tighter of max_tokens and max_bytes wins."""
+    limits = [limit for limit in (max_bytes, max_tokens and max_tokens * BYTES_PER_TOKEN) if limit]
+    return max(1, min(limits)) if limits else default
+
+
+def payload_size(value: Any) -> int:
+    """Bytes value takes as compact JSON, the way it reaches the model."""
+    return len(json.dumps(value, default=str, separators=(",", ":")).encode())
+
+
+# ---------------- TEMPLATES ---------------- #
+
+def message_template(message: str) -> str:
+    """
+    Replace the variable parts of a message with placeholders, so that
+    "Retry attempt 3 failed" and "Retry attempt 7 failed" share "Retry attempt {n} failed".
+    """
+    for pattern, placeholder in _VARIABLES:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def group_by_template(records: Iterable[dict], key: str = "message", max_templates: int = DEFAULT_MAX_TEMPLATES,
+                      template: Callable[[str], str] = message_template) -> list[dict]:
+    """
+    Collapse records into one row per message template, most frequent first.
+    Each row has the template, its count, the first and last timestamp, the
+    levels it was logged at and one example message.
+    """
+    groups: dict[str, dict] = {}
+    for record in records:
+        message = record.get(key) or ""
+        name = template(message)
+        group = groups.get(name)
+        if group is None:
+            group = groups[name] = {"template": name, "count": 0, "first_seen": record.get("timestamp"),
+                                    "last_seen": record.get("timestamp"), "levels": {}, "example": message}
+        group["count"] += 1
+        group["last_seen"] = record.get("timestamp") or group["last_seen"]
+        level = record.get("level")
+        if level:
+            group["levels"][level] = group["levels"].get(level, 0) + 1
+
+    ordered = sorted(groups.values(), key=lambda g: -g["count"])
+    if len(ordered) > max_templates:
+        rest = ordered[max_templates - 1:]
+        ordered = ordered[:max_templates - 1] + [{
+            "template": "(other)", "count": sum(g["count"] for g in rest), "templates": len(rest)
+        }]
+    for group in ordered:
+        if group.get("example") == group["template"]:
+            del group["example"]
+    return ordered
+
+
+# ---------------- BUDGETS ---------------- #
+
+def fit(items: list, budget: int, used: int = 0, rank: Optional[Callable[[Any], Any]] = None) -> int:
+    """
+    How many items fit into budget bytes on top of used.
+    With rank, the best-ranked items are chosen instead of a prefix and the list is
+    reordered in place so that they come first, keeping their original order.
+    """
+    order = sorted(range(len(items)), key=lambda i: rank(items[i])) if rank else range(len(items))
+    kept = []
+    for i in order:
+        size = payload_size(items[i]) + 1  # separating comma
+        if used + size > budget:
+            if rank:
+                continue
+            break
+        used += size
+        kept.append(i)
+    if rank:
+        chosen = set(kept)
+        items[:] = [items[i] for i in sorted(kept)] + [item for i, item in enumerate(items) if i not in chosen]
+    return len(kept)
+
+
+def shape_list(response: dict, key: str, budget: int, rank: Optional[Callable[[Any], Any]] = None) -> int:
+    """
+    Trim response[key] so that the whole response fits the budget. Returns how many
+    items were kept; when some are dropped, response["omitted"][key] counts them.
+    """
+    items = list(response.get(key) or [])
+    response[key] = []
+    # Room for the key itself and the "omitted" entry
+    kept = fit(items, budget, payload_size(response) + 2 * len(key) + 32, rank)
+    response[key] = items[:kept]
+    if kept < len(items):
+        response.setdefault("omitted", {})[key] = len(items) - kept
+    return kept
+
+
+# ---------------- CURSORS ---------------- #
+
+class CursorError(ValueError):
+    """Raised for a cursor that was not produced by this server."""
+
+
+def encode_cursor(position: dict) -> str:
+    """Opaque, URL-safe token for a position in a result set."""
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {}
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorError(f"Invalid cursor: {cursor!r}")
+    if not isinstance(position, dict):
+        raise CursorError(f"Invalid cursor: {cursor!r}")
+    return position
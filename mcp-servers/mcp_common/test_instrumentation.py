@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-tool instrumentation
+Calls an instrumented FastMCP server in-process and scrapes the Prometheus text output
+"""
+
+import asyncio
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+from mcp_common.instrumentation import (REGISTRY, TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY, TOOL_RESPONSE_BYTES,
+                                        ROWS_RETURNED, ROWS_SCANNED, instrument, record_cache, record_rows,
+                                        start_metrics_server)
+
+mcp = FastMCP("instrumentation-test")
+
+
+def _filter_rows(rows: list[int], minimum: int) -> list[int]:
+    selected = [r for r in rows if r >= minimum]
+    record_rows(len(rows), len(selected))
+    return selected
+
+
+@mcp.tool()
+async def filter_rows(rows: list[int], minimum: int) -> list[int]:
+    # Rows are reported from a worker thread, as the servers' sync impls do
+    return await asyncio.to_thread(_filter_rows, rows, minimum)
+
+
+@mcp.tool()
+def fail(message: str) -> str:
+    raise ValueError(message)
+
+
+def test_tool_metrics():
+    """Test calls, errors, latency, response size and rows are recorded per tool"""
+    print("\n=== Testing tool metrics ===")
+
+    instrument(mcp)
+    instrument(mcp)
+    labels = {"server": "instrumentation-test", "tool": "filter_rows"}
+
+    async def run():
+        async with Client(mcp) as client:
+            for _ in range(3):
+                await client.call_tool("filter_rows", {"rows": list(range(100)), "minimum": 90})
+            try:
+                await client.call_tool("fail", {"message": "boom"})
+                assert False, "tool error not raised"
+            except ToolError:
+                pass
+
+    asyncio.run(run())
+    # Recording outside a tool call is a no-op
+    record_rows(5, 5)
+
+    assert TOOL_CALLS.value(status="ok", **labels) == 3
+    assert TOOL_LATENCY.count(**labels) == 3
+    assert ROWS_SCANNED.value(**labels) == 300
+    assert ROWS_RETURNED.value(**labels) == 30
+    assert TOOL_RESPONSE_BYTES.count(**labels) == 3
+    fail_labels = {"server": "instrumentation-test", "tool": "fail"}
+    assert TOOL_CALLS.value(status="error", **fail_labels) == 1
+    assert TOOL_ERRORS.value(error="ValueError", **fail_labels) == 1
+    print("test_tool_metrics PASSED")
+
+
+def test_metrics_endpoint():
+    """Test the Prometheus text exposition served on a dedicated port"""
+    print("\n=== Testing /metrics ===")
+
+    record_cache("test_cache", True)
+    record_cache("test_cache", False)
+    record_cache("test_cache", True)
+
+    httpd = start_metrics_server(0, "127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = response.read().decode()
+    finally:
+        httpd.shutdown()
+
+    assert text == REGISTRY.render()
+    assert "# TYPE mcp_tool_duration_seconds histogram" in text
+    assert 'mcp_cache_lookups_total{cache="test_cache",result="hit"} 2' in text
+    buckets = [line for line in text.splitlines()
+               if line.startswith('mcp_tool_response_bytes_bucket{server="instrumentation-test",tool="filter_rows"')]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    print(f"Response size buckets: {counts}")
+    assert counts == sorted(counts) and counts[-1] == 3 and 'le="+Inf"' in buckets[-1]
+    print("test_metrics_endpoint PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing MCP instrumentation")
+    print("=" * 50)
+
+    try:
+        test_tool_metrics()
+        test_metrics_endpoint()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the tool result cache
+Checks argument canonicalisation, LRU eviction by size, TTLs and data-version invalidation
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastmcp import Client, FastMCP
+from mcp_common.instrumentation import CACHE_LOOKUPS, instrument
+from mcp_common.result_cache import ResultCache, cache_tool, duration, lower, regex
+
+mcp = FastMCP("result-cache-test")
+calls = []
+data_version = [0]
+
+
+def _seconds(value: str):
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value[:-1].isdigit() and value[-1:] in units:
+        return int(value[:-1]) * units[value[-1]]
+    return None
+
+
+@mcp.tool()
+async def search(query: str, time_range: str = "5m", namespace: str = "default") -> dict:
+    calls.append((query, time_range, namespace))
+    return {"query": query, "call": len(calls)}
+
+
+@mcp.tool()
+async def scale(name: str, replicas: int) -> dict:
+    calls.append((name, replicas))
+    return {"name": name, "replicas": replicas}
+
+
+def test_canonical_arguments():
+    """Test equivalent spellings share a key and different searches do not"""
+    print("\n=== Testing argument canonicalisation ===")
+
+    pattern = regex(ignore_case=True)
+    same = ["ERROR", "error", "(?:ERROR)", "(ERROR)", "[E]RROR", "E{1}RROR"]
+    assert len({pattern(q) for q in same}) == 1
+    assert pattern("timeout|OOM") == pattern("(?:oom|TIMEOUT)")
+    assert pattern("ERROR") != pattern("ERRORS")
+    assert pattern(r"\d+ failed") != pattern(r"\D+ failed")
+    # Groups stay when a backreference needs them
+    assert pattern(r"(a)\1") != pattern(r"(b)\1")
+    assert pattern("foo[") == pattern("FOO[") != pattern("foo")
+    assert regex(ignore_case=False)("ERROR") != regex(ignore_case=False)("error")
+    # Characters whose lowercase form is two characters still get a key
+    assert pattern("İstanbul") == pattern("İSTANBUL") != pattern("istanbul")
+    assert pattern("[İ]") != pattern("[I]")
+
+    window = duration(_seconds)
+    assert window("5m") == window("300s") == 300
+    assert window("all") == "all"
+    assert lower("Warning") == "warning"
+    print("test_canonical_arguments PASSED")
+
+
+def test_lru_ttl_and_versions():
+    """Test entries are evicted by size, expire after their TTL and die with their data version"""
+    print("\n=== Testing LRU, TTL and versions ===")
+
+    cache = ResultCache(max_bytes=400)
+    for i in range(4):
+        assert cache.set(f"k{i}", i, size=100, ttl=60)
+    cache.get("k0")  # k0 is now the most recently used
+    cache.set("k4", 4, size=100, ttl=60)
+    print(f"Entries after eviction: {len(cache)}, {cache.size} bytes")
+    assert cache.get("k1") is None and cache.get("k0") == 0
+    assert cache.size == 400
+    assert not cache.set("big", "x", size=101, ttl=60)  # Over a quarter of the cache
+
+    cache.set("short", 1, size=10, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+    cache.set("versioned", 1, size=10, ttl=60, version=1)
+    assert cache.get("versioned", version=1) == 1
+    assert cache.get("versioned", version=2) is None
+    assert cache.get("versioned", version=1) is None  # Dropped on the mismatch
+    print("test_lru_ttl_and_versions PASSED")
+
+
+def test_cached_tool_calls():
+    """Test repeated calls are answered by the middleware until the data version moves"""
+    print("\n=== Testing cached tool calls ===")
+
+    instrument(mcp)
+    probes = []
+
+    def version():
+        # A version probe may rebuild an index; it must not run on the event loop
+        probes.append(threading.current_thread() is threading.main_thread())
+        return data_version[0]
+
+    cache_tool(mcp, search, ttl=60, version=version,
+               normalize={"query": regex(), "time_range": duration(_seconds)})
+    cache_tool(mcp, search, ttl=60, version=version,
+               normalize={"query": regex(), "time_range": duration(_seconds)})
+    hits = CACHE_LOOKUPS.value(cache="tool:search", result="hit")
+
+    async def run():
+        async with Client(mcp) as client:
+            results = [
+                await client.call_tool("search", {"query": "ERROR"}),
+                await client.call_tool("search", {"query": "error", "time_range": "300s"}),
+                await client.call_tool("search", {"query": "(?:Error)", "namespace": "default"}),
+                await client.call_tool("search", {"query": "ERROR", "namespace": "payments"}),
+            ]
+            data_version[0] += 1
+            results.append(await client.call_tool("search", {"query": "ERROR"}))
+            await client.call_tool("scale", {"name": "web", "replicas": 2})
+            await client.call_tool("scale", {"name": "web", "replicas": 2})
+            return [r.structured_content["call"] for r in results]
+
+    started = time.perf_counter()
+    served = asyncio.run(run())
+    print(f"Calls served by: {served} in {time.perf_counter() - started:.3f}s")
+    assert served == [1, 1, 1, 2, 3]
+    assert probes and not any(probes)
+    assert CACHE_LOOKUPS.value(cache="tool:search", result="hit") - hits == 2
+    # Tools without a policy always run
+    assert calls.count(("web", 2)) == 2
+    print("test_cached_tool_calls PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing tool result cache")
+    print("=" * 50)
+
+    try:
+        test_canonical_arguments()
+        test_lru_ttl_and_versions()
+        test_cached_tool_calls()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for response shaping
+Checks message templates, budget fitting and cursor round trips
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_common.shaping import (CursorError, budget_bytes, decode_cursor, encode_cursor, group_by_template,
+                                message_template, payload_size, shape_list)
+
+
+def test_templates():
+    """Test variable parts collapse into placeholders and repeated messages are counted"""
+    print("\n=== Testing message templates ===")
+
+    assert message_template("Retry attempt 12 failed") == "Retry attempt {n} failed"
+    assert message_template("Connected to pool-4 at 10.0.0.7:5432") == "Connected to pool-{n} at {ip}"
+    assert message_template("trace 9f86d081884c7d65 done") == "trace {hex} done"
+    assert message_template("Worker2 cafe added") == "Worker2 cafe added"
+
+    records = [{"timestamp": f"12:00:{i:02d}", "level": "ERROR", "message": f"Retry attempt {i} failed"}
+               for i in range(12)]
+    records.append({"timestamp": "12:01:00", "level": "WARN", "message": "Disk almost full"})
+    groups = group_by_template(records)
+    print(f"Templates: {[(g['template'], g['count']) for g in groups]}")
+    assert groups[0] == {"template": "Retry attempt {n} failed", "count": 12, "first_seen": "12:00:00",
+                         "last_seen": "12:00:11", "levels": {"ERROR": 12}, "example": "Retry attempt 0 failed"}
+    assert groups[1]["count"] == 1 and "example" not in groups[1]
+
+    many = [{"message": f"event type {chr(97 + i)}"} for i in range(26)]
+    groups = group_by_template(many, max_templates=5)
+    assert len(groups) == 5
+    assert groups[-1] == {"template": "(other)", "count": 22, "templates": 22}
+    print("test_templates PASSED")
+
+
+def test_budget_and_cursor():
+    """Test lists are cut to fit the budget, optionally keeping the best-ranked items"""
+    print("\n=== Testing budgets ===")
+
+    assert budget_bytes(max_tokens=100) == 400
+    assert budget_bytes(max_tokens=100, max_bytes=300) == 300
+    assert budget_bytes(default=123) == 123
+
+    rows = [{"id": i, "text": "x" * 90} for i in range(50)]
+    response = {"query": "x", "rows": list(rows)}
+    kept = shape_list(response, "rows", 1000)
+    print(f"Kept {kept} of {len(rows)} rows in {payload_size(response)} bytes")
+    assert 0 < kept < 50
+    assert payload_size(response) <= 1000
+    assert response["rows"] == rows[:kept] and response["omitted"] == {"rows": 50 - kept}
+
+    spikes = [{"at": i, "z": z} for i, z in enumerate([1.0, 9.0, 2.0, 8.0, 3.0])]
+    response = {"spikes": spikes}
+    shape_list(response, "spikes", payload_size({"spikes": spikes[:2]}) + 60, rank=lambda s: -s["z"])
+    assert [s["at"] for s in response["spikes"]] == [1, 3]
+
+    cursor = encode_cursor({"offset": 40})
+    assert decode_cursor(cursor) == {"offset": 40}
+    assert decode_cursor(None) == {}
+    for bad in ("not a cursor!", encode_cursor([1])):
+        try:
+            decode_cursor(bad)
+            assert False, f"{bad!r} accepted"
+        except CursorError:
+            pass
+    print("test_budget_and_cursor PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing response shaping")
+    print("=" * 50)
+
+    try:
+        test_templates()
+        test_budget_and_cursor()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared MCP transport entry point
+Serves a small FastMCP server over streamable HTTP and calls it from concurrent sessions
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastmcp import Client, FastMCP
+from mcp_common import DrainState, create_app
+
+mcp = FastMCP("transport-test")
+
+
+@mcp.tool()
+async def slow_echo(text: str, delay: float = 0.3) -> str:
+    await asyncio.sleep(delay)
+    return text
+
+
+def start_server(state):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(create_app(mcp, "http", state=state), log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_concurrent_sessions_and_drain():
+    """Test one process serves concurrent sessions, then refuses new ones while draining"""
+    print("\n=== Testing HTTP transport ===")
+
+    state = DrainState()
+    server, url = start_server(state)
+    try:
+        assert get_json(url + "/healthz") == (200, {"status": "ok", "inflight": 0})
+
+        async def call(i):
+            async with Client(url + "/mcp") as client:
+                result = await client.call_tool("slow_echo", {"text": f"session-{i}"})
+                return result.data
+
+        async def run():
+            started = time.time()
+            results = await asyncio.gather(*[call(i) for i in range(8)])
+            return results, time.time() - started
+
+        results, elapsed = asyncio.run(run())
+        print(f"8 sessions answered in {elapsed:.2f}s")
+        assert results == [f"session-{i}" for i in range(8)]
+        # Calls overlapped instead of running one session at a time
+        assert elapsed < 8 * 0.3
+
+        state.draining = True
+        status, body = get_json(url + "/readyz")
+        assert status == 503 and body["status"] == "draining"
+        assert get_json(url + "/healthz")[0] == 200
+
+        request = urllib.request.Request(url + "/mcp", data=b"{}", method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request)
+            assert False, "new session accepted while draining"
+        except urllib.error.HTTPError as e:
+            assert e.code == 503
+            assert e.headers["Retry-After"] == "1"
+    finally:
+        server.should_exit = True
+
+    print("test_concurrent_sessions_and_drain PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing MCP transport")
+    print("=" * 50)
+
+    try:
+        test_concurrent_sessions_and_drain()
+        print("\nALL TESTS PASSED")
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Shared transport entry point for the AgentPitCrew MCP servers
+Runs a FastMCP server over stdio, or over streamable HTTP / SSE from one long-lived
+process with health endpoints, /metrics and graceful drain on shutdown
+"""
+
+from typing import Optional
+import json
+import logging
+import os
+
+from mcp_common.instrumentation import (CONTENT_TYPE, METRICS_PATH, REGISTRY, configure_tracing,
+                                        instrument, start_metrics_server)
+
+logger = logging.getLogger("mcp-common")
+
+TRANSPORTS = ("stdio", "http", "sse")
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8080
+DEFAULT_PATH = "/mcp"
+DEFAULT_DRAIN_SECONDS = 30
+
+_HEALTH_PATHS = ("/healthz", "/readyz")
+
+
+class DrainState:
+    """Tracks in-flight requests and whether the process has started draining."""
+
+    def __init__(self):
+        self.draining = False
+        self.inflight = 0
+
+
+class DrainMiddleware:
+    """
+    ASGI wrapper that answers /healthz, /readyz and /metrics and counts in-flight requests.
+
+    Once draining, /readyz fails so the pod leaves the Service endpoints, and
+    requests that would open a new session get 503. Requests on an existing
+    session are still served until the drain timeout.
+    """
+
+    def __init__(self, app, state: DrainState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in _HEALTH_PATHS:
+            ready = path == "/healthz" or not self.state.draining
+            body = {"status": "ok" if ready else "draining", "inflight": self.state.inflight}
+            await _respond(send, 200 if ready else 503, body)
+            return
+        if path == METRICS_PATH:
+            await _respond_raw(send, 200, REGISTRY.render().encode(), CONTENT_TYPE.encode())
+            return
+
+        headers = dict(scope.get("headers") or [])
+        if self.state.draining and b"mcp-session-id" not in headers:
+            await _respond(send, 503, {"error": "Server is shutting down"}, retry_after=True)
+            return
+
+        self.state.inflight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.state.inflight -= 1
+
+
+async def _respond(send, status: int, body: dict, retry_after: bool = False) -> None:
+    await _respond_raw(send, status, json.dumps(body).encode(), b"application/json", retry_after)
+
+
+async def _respond_raw(send, status: int, payload: bytes, content_type: bytes,
+                       retry_after: bool = False) -> None:
+    headers = [(b"content-type", content_type), (b"content-length", str(len(payload)).encode())]
+    if retry_after:
+        headers.append((b"retry-after", b"1"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+def create_app(mcp, transport: str = "http", path: str = DEFAULT_PATH,
+               state: Optional[DrainState] = None):
+    """Build the ASGI app for an HTTP or SSE transport, wrapped with health and drain handling."""
+    state = state or DrainState()
+    app = mcp.http_app(path=path, transport=transport)
+    return DrainMiddleware(app, state)
+
+
+def serve(mcp, transport: Optional[str] = None, host: Optional[str] = None,
+          port: Optional[int] = None, drain_seconds: Optional[int] = None,
+          path: Optional[str] = None, sockets=None) -> None:
+    """
+    Run mcp on the requested transport. Arguments default to MCP_TRANSPORT,
+    MCP_HOST, MCP_PORT, MCP_PATH and MCP_DRAIN_SECONDS; stdio is the default.
+
+    Every tool call is instrumented. Metrics are served at /metrics on the HTTP
+    port, and also on MCP_METRICS_PORT when set (the only way to scrape a stdio
+    server); OTEL_EXPORTER_OTLP_ENDPOINT turns on span export.
+    """
+    transport = (transport or os.environ.get("MCP_TRANSPORT", "stdio")).lower()
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {transport!r}; expected one of {', '.join(TRANSPORTS)}")
+
+    instrument(mcp)
+    configure_tracing(mcp.name)
+    metrics_port = os.environ.get("MCP_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port), host or os.environ.get("MCP_HOST", DEFAULT_HOST))
+    if transport == "stdio":
+        mcp.run()
+        return
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise ImportError("uvicorn module is not installed. Install it using: pip install uvicorn")
+
+    state = DrainState()
+
+    class DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            if not state.draining:
+                logger.info("Draining %d in-flight request(s) before shutdown", state.inflight)
+            state.draining = True
+            super().handle_exit(sig, frame)
+
+    app = create_app(mcp, transport, path or os.environ.get("MCP_PATH", DEFAULT_PATH), state)
+    config = uvicorn.Config(
+        app,
+        host=host or os.environ.get("MCP_HOST", DEFAULT_HOST),
+        port=int(port or os.environ.get("MCP_PORT", DEFAULT_PORT)),
+        timeout_graceful_shutdown=int(drain_seconds or os.environ.get("MCP_DRAIN_SECONDS", DEFAULT_DRAIN_SECONDS)),
+        log_level=os.environ.get("MCP_LOG_LEVEL", "info"),
+        lifespan="on"
+    )
+    DrainingServer(config).run(sockets=sockets)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Incident correlation for the PrometheusMetrics MCP Server
+Aligns metric series, log counts and alerts on one time grid and ranks the pairs
+of signals that move together, e.g. a CPU spike and a burst of connection errors
+"""
+
+from datetime import datetime, timezone
+from math import sqrt
+from typing import Optional
+
+# Deviations from the window median, in robust standard deviations, that count as a spike
+DEFAULT_Z_THRESHOLD = 3.0
+
+# Grid cells one signal may lead or trail another and still correlate
+DEFAULT_MAX_LAG = 2
+
+# Pairs that correlate more weakly than this are not reported
+DEFAULT_MIN_CORRELATION = 0.5
+
+# Alerts that started within this many cells of a joint peak are attached to it
+ALERT_SLACK = 2
+
+# Spread floor, so a flat series with one blip is not scored as infinitely anomalous
+_MIN_SPREAD = 0.5
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Signal:
+    """
+    One time series to correlate. Metrics are gauges (cells average their samples
+    and gaps carry the last value); log counts are counters (cells sum their
+    samples and gaps are 0).
+    """
+
+    def __init__(self, name: str, source: str, timestamps: list[float], values: list[float],
+                 counter: bool = False, detail: Optional[dict] = None):
+        self.name = name
+        self.source = source
+        self.timestamps = timestamps
+        self.values = values
+        self.counter = counter
+        self.detail = detail or {}
+
+
+def align(signal: Signal, start: float, step: float, cells: int) -> list[Optional[float]]:
+    """Resample a signal onto cells of `step` seconds starting at `start`."""
+    sums = [0.0] * cells
+    seen = [0] * cells
+    for ts, value in zip(signal.timestamps, signal.values):
+        cell = int((ts - start) // step)
+        if 0 <= cell < cells:
+            sums[cell] += value
+            seen[cell] += 1
+    if signal.counter:
+        return sums
+
+    grid: list[Optional[float]] = []
+    last = None
+    for total, n in zip(sums, seen):
+        if n:
+            last = total / n
+        grid.append(last)
+    # Leading gaps take the first value, so the window has no holes
+    first = next((v for v in grid if v is not None), None)
+    return [first if v is None else v for v in grid]
+
+
+def zscores(values: list[Optional[float]]) -> list[float]:
+    """Robust z-scores against the window median and median absolute deviation."""
+    present = sorted(v for v in values if v is not None)
+    if not present:
+        return [0.0] * len(values)
+    median = present[len(present) // 2]
+    deviations = sorted(abs(v - median) for v in present)
+    spread = max(1.4826 * deviations[len(deviations) // 2], _MIN_SPREAD, 0.05 * abs(median))
+    return [0.0 if v is None else (v - median) / spread for v in values]
+
+
+def pearson(a: list[float], b: list[float]) -> float:
+    n = len(a)
+    if n < 3:
+        return 0.0
+    mean_a, mean_b = sum(a) / n, sum(b) / n
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(a, b))
+    var_a = sum((x - mean_a) ** 2 for x in a)
+    var_b = sum((y - mean_b) ** 2 for y in b)
+    if var_a <= 0 or var_b <= 0:
+        return 0.0
+    return cov / sqrt(var_a * var_b)
+
+
+def lagged_correlation(a: list[float], b: list[float], max_lag: int = DEFAULT_MAX_LAG) -> tuple[float, int]:
+    """
+    Strongest positive correlation of b shifted against a by up to max_lag cells,
+    as (r, lag); a positive lag means b moves after a. Ties go to the smaller lag.
+    """
+    best = (0.0, 0)
+    for lag in sorted(range(-max_lag, max_lag + 1), key=abs):
+        if lag >= 0:
+            r = pearson(a[:len(a) - lag], b[lag:])
+        else:
+            r = pearson(a[-lag:], b[:len(b) + lag])
+        if r > best[0] + 1e-9:
+            best = (r, lag)
+    return best
+
+
+def correlate(signals: list[Signal], alerts: list[dict], start: float, step: float, cells: int,
+              z_threshold: float = DEFAULT_Z_THRESHOLD, max_lag: int = DEFAULT_MAX_LAG,
+              min_correlation: float = DEFAULT_MIN_CORRELATION) -> dict:
+    """
+    Rank pairs of signals from different sources by how strongly they move together.
+
+    Each pair is scored by its lagged correlation, halved unless both signals
+    spike within max_lag cells of each other; alerts that started near a joint
+    spike add to the score. Alerts are dicts with a name and an ISO "timestamp".
+    """
+    grids = [align(signal, start, step, cells) for signal in signals]
+    scores = [zscores(grid) for grid in grids]
+    summaries = []
+    for signal, z in zip(signals, scores):
+        peak = max(range(cells), key=z.__getitem__) if cells else 0
+        summaries.append({
+            "name": signal.name,
+            "source": signal.source,
+            **signal.detail,
+            "peak_time": _iso(start + peak * step) if cells else None,
+            "peak_zscore": round(z[peak], 2) if cells else 0.0,
+            "spiking": bool(cells) and z[peak] >= z_threshold,
+            "_peak": peak
+        })
+
+    alert_cells = []
+    for alert in alerts:
+        try:
+            ts = datetime.fromisoformat(str(alert.get("timestamp")).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            continue
+        alert_cells.append((int((ts - start) // step), alert))
+
+    correlations = []
+    for i in range(len(signals)):
+        for j in range(i + 1, len(signals)):
+            if signals[i].source == signals[j].source:
+                continue
+            a, b = [v or 0.0 for v in grids[i]], [v or 0.0 for v in grids[j]]
+            r, lag = lagged_correlation(a, b, max_lag)
+            if r < min_correlation:
+                continue
+            first, second = summaries[i], summaries[j]
+            coincide = first["spiking"] and second["spiking"] and abs(first["_peak"] - second["_peak"]) <= max_lag
+            score = r if coincide else r / 2
+            peak = min(first["_peak"], second["_peak"]) if coincide else max(
+                range(cells), key=lambda c: scores[i][c] + scores[j][c])
+            near = [alert for cell, alert in alert_cells if abs(cell - peak) <= ALERT_SLACK]
+            score += 0.1 * min(len(near), 3)
+
+            if coincide:
+                summary = (f"{first['name']} ({first['source']}) spike at {_iso(start + first['_peak'] * step)} "
+                           f"coincides with {second['name']} ({second['source']}) spike")
+            else:
+                summary = f"{first['name']} ({first['source']}) moves with {second['name']} ({second['source']})"
+            if lag:
+                summary += f", {second['name']} {'trailing' if lag > 0 else 'leading'} by {abs(lag) * step:g}s"
+            if near:
+                summary += f"; alerts: {', '.join(sorted({a.get('name', 'unknown') for a in near}))}"
+
+            correlations.append({
+                "signals": [first["name"], second["name"]],
+                "sources": [first["source"], second["source"]],
+                "score": round(score, 3),
+                "correlation": round(r, 3),
+                "lag_seconds": lag * step,
+                "coincident_spike": coincide,
+                "peak_time": _iso(start + peak * step),
+                "peak_zscores": [first["peak_zscore"], second["peak_zscore"]],
+                "alerts": sorted({a.get("name", "unknown") for a in near}),
+                "summary": summary
+            })
+
+    correlations.sort(key=lambda c: (-c["score"], -c["correlation"]))
+    for summary in summaries:
+        del summary["_peak"]
+    return {"signals": summaries, "correlations": correlations}
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Time-series downsampling for the PrometheusMetrics MCP Server
+Reduces range-query series to a point budget and encodes them compactly
+"""
+
+from array import array
+from typing import Optional
+import math
+
+METHODS = ("lttb", "minmax", "avg")
+
+
+def parse_samples(values: list) -> tuple[array, array]:
+    """Split Prometheus [[ts, "value"], ...] pairs into float arrays, dropping NaN/Inf."""
+    timestamps, samples = array("d"), array("d")
+    for ts, raw in values:
+        value = float(raw)
+        if math.isfinite(value):
+            timestamps.append(float(ts))
+            samples.append(value)
+    return timestamps, samples
+
+
+def _endpoints(timestamps: array, values: array, budget: int) -> tuple[array, array]:
+    """Budgets too small to bucket: the first and last points, or only the latest."""
+    keep = [0, len(timestamps) - 1][-budget:] if budget > 0 else []
+    return array("d", (timestamps[i] for i in keep)), array("d", (values[i] for i in keep))
+
+
+def lttb(timestamps: array, values: array, budget: int) -> tuple[array, array]:
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last points and, from each
+    of budget-2 buckets, the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    n = len(timestamps)
+    if budget >= n:
+        return timestamps, values
+    if budget < 3:
+        return _endpoints(timestamps, values, budget)
+
+    out_t, out_v = array("d", [timestamps[0]]), array("d", [values[0]])
+    every = (n - 2) / (budget - 2)
+    a = 0
+    for i in range(budget - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        count = avg_end - avg_start
+        avg_t = sum(timestamps[avg_start:avg_end]) / count
+        avg_v = sum(values[avg_start:avg_end]) / count
+
+        ax, ay = timestamps[a], values[a]
+        best, best_area = a + 1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_t) * (values[j] - ay) - (ax - timestamps[j]) * (avg_v - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out_t.append(timestamps[best])
+        out_v.append(values[best])
+        a = best
+
+    out_t.append(timestamps[-1])
+    out_v.append(values[-1])
+    return out_t, out_v
+
+
+def bucket_aggregate(timestamps: array, values: array, budget: int,
+                     method: str) -> tuple[array, array]:
+    """
+    Split the series into equal-count buckets. "avg" keeps one mean point per
+    bucket; "minmax" keeps the bucket minimum and maximum in time order.
+    """
+    n = len(timestamps)
+    buckets = budget // 2 if method == "minmax" else budget
+    if n <= budget:
+        return timestamps, values
+    if buckets < 1:
+        return _endpoints(timestamps, values, budget)
+
+    out_t, out_v = array("d"), array("d")
+    size = n / buckets
+    for b in range(buckets):
+        start, end = int(b * size), int((b + 1) * size)
+        if end <= start:
+            continue
+        if method == "avg":
+            out_t.append(timestamps[(start + end - 1) // 2])
+            out_v.append(sum(values[start:end]) / (end - start))
+            continue
+        lo = min(range(start, end), key=values.__getitem__)
+        hi = max(range(start, end), key=values.__getitem__)
+        for i in sorted({lo, hi}):
+            out_t.append(timestamps[i])
+            out_v.append(values[i])
+    return out_t, out_v
+
+
+def downsample(timestamps: array, values: array, budget: int,
+               method: str = "lttb") -> tuple[array, array]:
+    if method == "lttb":
+        return lttb(timestamps, values, budget)
+    return bucket_aggregate(timestamps, values, budget, method)
+
+
+def encode_series(timestamps: array, values: array, precision: int = 3,
+                  metric: Optional[dict] = None, step: float = 1.0) -> dict:
+    """
+    Encode a series as a start time (to the millisecond), deltas between
+    consecutive timestamps in whole steps, and rounded values. Range query samples
+    sit on the start + k * step grid, so fractional steps decode exactly.
+    """
+    steps = [round((ts - timestamps[0]) / step) for ts in timestamps]
+    return {
+        "metric": metric or {},
+        "start": round(timestamps[0], 3) if steps else None,
+        "deltas": [b - a for a, b in zip(steps, steps[1:])],
+        "values": [round(v, precision) for v in values]
+    }
+
+
+def decode_series(encoded: dict, step: float = 1.0) -> list[tuple[float, float]]:
+    """Inverse of encode_series, mainly for consumers and tests."""
+    if encoded["start"] is None:
+        return []
+    index, timestamps = 0, [encoded["start"]]
+    for delta in encoded["deltas"]:
+        index += delta
+        timestamps.append(round(encoded["start"] + index * step, 3))
+    return list(zip(timestamps, encoded["values"]))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Prometheus HTTP API client for the PrometheusMetrics MCP Server
+One pooled keep-alive connection set, in-flight request coalescing and a TTL cache
+"""
+
+from typing import Any, Optional
+import asyncio
+import math
+import time
+
+try:
+    import httpx
+except ImportError:
+    raise ImportError("httpx module is not installed. Install it using: pip install httpx")
+
+try:
+    from mcp_common.instrumentation import record_cache
+except ImportError:  # used outside mcp-servers/
+    def record_cache(cache: str, hit: bool) -> None:
+        pass
+
+# Instant queries are evaluated at the start of their alignment window, so calls
+# within the same window share a cache key (typically the scrape interval)
+DEFAULT_ALIGN_SECONDS = 15.0
+DEFAULT_CACHE_TTL = 15.0
+DEFAULT_CACHE_ENTRIES = 1024
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_TIMEOUT = 10.0
+
+
+class PrometheusError(Exception):
+    """Raised when Prometheus answers with an error status."""
+
+
+class TTLCache:
+    """Small dict-backed cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl: float, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[Any, tuple[float, Any]] = {}
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        if len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _) in self._entries.items() if expires < now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def align(timestamp: float, step: float) -> float:
+    """Round a timestamp down to a multiple of step."""
+    return math.floor(timestamp / step) * step
+
+
+class PrometheusClient:
+    """
+    Async client for /api/v1/query, /api/v1/query_range and /api/v1/alerts.
+
+    Identical requests that are already in flight share one HTTP round trip, which
+    keeps running if one of its callers is cancelled, and successful responses are
+    cached for cache_ttl seconds. The underlying
+    httpx.AsyncClient is created per event loop and reused for keep-alive.
+    """
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, align_seconds: float = DEFAULT_ALIGN_SECONDS,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.align_seconds = align_seconds
+        self.max_connections = max_connections
+        self.cache = TTLCache(cache_ttl)
+        self.requests_sent = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: dict[Any, asyncio.Future] = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+            self._loop = loop
+            self._inflight = {}
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    async def _fetch(self, client: httpx.AsyncClient, key, path: str, params: dict,
+                     ttl: Optional[float]):
+        try:
+            self.requests_sent += 1
+            response = await client.get(path, params=params)
+            try:
+                body = response.json()
+            except ValueError:
+                # e.g. an HTML error page from a proxy in front of Prometheus
+                raise PrometheusError(f"HTTP {response.status_code}: response is not JSON")
+            if body.get("status") != "success":
+                raise PrometheusError(body.get("error") or f"HTTP {response.status_code}")
+            data = body["data"]
+            self.cache.set(key, data, ttl)
+            return data
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get(self, path: str, params: dict, ttl: Optional[float] = None):
+        key = (path, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        record_cache("prometheus_response", cached is not None)
+        if cached is not None:
+            return cached
+
+        client = self._http()
+        request = self._inflight.get(key)
+        if request is None:
+            # The request is a task of its own, so a caller that is cancelled stops
+            # waiting without cancelling it for the callers that share it
+            request = asyncio.ensure_future(self._fetch(client, key, path, params, ttl))
+            request.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = request
+        return await asyncio.shield(request)
+
+    async def query(self, promql: str, at: Optional[float] = None) -> list[dict]:
+        """Evaluate an instant query at a step-aligned time; returns the result vector."""
+        at = align(time.time() if at is None else at, self.align_seconds)
+        data = await self._get("/api/v1/query", {"query": promql, "time": at})
+        return data["result"]
+
+    async def query_range(self, promql: str, start: float, end: float, step: float) -> list[dict]:
+        """Evaluate a range query with start and end aligned to step; returns the matrix."""
+        params = {"query": promql, "start": align(start, step), "end": align(end, step), "step": step}
+        data = await self._get("/api/v1/query_range", params, ttl=max(self.cache.ttl, step))
+        return data["result"]
+
+    async def alerts(self) -> list[dict]:
+        data = await self._get("/api/v1/alerts", {})
+        return data["alerts"]
@@ -5,18 +5,154 @@ Provides tools to query Prometheus metrics and alerts for SRE monitoring
 """
 
 try:
-    from fastmcp import FastMCP
+    from fastmcp import Client, FastMCP
 except ImportError:
     raise ImportError("fastmcp module is not installed. Install it using: pip install fastmcp")
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Callable, Optional
+import asyncio
+import math
+import os
 import random
+import re
+import sys
+import time
+
+# mcp_common sits next to this directory in the repo and next to server.py in the image
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from correlation import Signal, correlate
+from downsample import METHODS, downsample, encode_series, parse_samples
+from mcp_common.instrumentation import record_rows
+from mcp_common.result_cache import cache_tool, duration, lower
+from mcp_common.shaping import budget_bytes, group_by_template, shape_list
+from prom_client import PrometheusClient
 
 # Initialize MCP server
 mcp = FastMCP("prometheus-metrics", version="1.0.0")
 
+CPU_THRESHOLD = 80.0
+
+# Label that distinguishes clusters in a shared Prometheus; empty disables cluster filtering
+CLUSTER_LABEL = os.environ.get("PROMETHEUS_CLUSTER_LABEL", "cluster")
+
+# CPU used by a namespace as a percentage of its CPU limits
+CPU_USAGE_QUERY = (
+    '100 * sum(rate(container_cpu_usage_seconds_total{{{selector}, container!=""}}[5m]))'
+    ' / sum(kube_pod_container_resource_limits{{{selector}, resource="cpu"}})'
+)
+
+# Per-namespace aggregates used by the batch tools: (metric, query, threshold, mock range)
+BATCH_QUERIES = {
+    "cpu": (
+        "cpu_usage_percent",
+        '100 * sum by (namespace) (rate(container_cpu_usage_seconds_total{{{selector}, container!=""}}[5m]))'
+        ' / sum by (namespace) (kube_pod_container_resource_limits{{{selector}, resource="cpu"}})',
+        CPU_THRESHOLD,
+        (40.0, 95.0)
+    ),
+    "memory": (
+        "memory_usage_percent",
+        '100 * sum by (namespace) (container_memory_working_set_bytes{{{selector}, container!=""}})'
+        ' / sum by (namespace) (kube_pod_container_resource_limits{{{selector}, resource="memory"}})',
+        85.0,
+        (40.0, 95.0)
+    ),
+    "restarts": (
+        "restarts_last_hour",
+        'sum by (namespace) (increase(kube_pod_container_status_restarts_total{{{selector}}}[1h]))',
+        5.0,
+        (0.0, 10.0)
+    )
+}
+
+SEVERITIES = ("warning", "critical", "info")
+
+# Range queries fetch at most this many raw points per series before downsampling
+MAX_RAW_POINTS = 2000
+DEFAULT_MAX_POINTS = 120
+DEFAULT_MAX_SERIES = 20
+MIN_STEP_SECONDS = 15.0
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Queries evaluated within one window (typically the scrape interval) see the same data
+ALIGN_SECONDS = float(os.environ.get("PROMETHEUS_ALIGN_SECONDS", 15))
+
+# Without PROMETHEUS_URL the tools serve mock data for local demos
+PROMETHEUS_URL = os.environ.get("PROMETHEUS_URL")
+prometheus: Optional[PrometheusClient] = PrometheusClient(
+    PROMETHEUS_URL,
+    cache_ttl=float(os.environ.get("PROMETHEUS_CACHE_TTL", 15)),
+    align_seconds=ALIGN_SECONDS
+) if PROMETHEUS_URL else None
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _selector(cluster_name: str, namespace: str) -> str:
+    selector = f'namespace="{_label_value(namespace)}"'
+    if CLUSTER_LABEL:
+        selector += f', {CLUSTER_LABEL}="{_label_value(cluster_name)}"'
+    return selector
+
+
+def _batch_selector(cluster_name: str, namespaces: list[str]) -> str:
+    pattern = "|".join(re.escape(ns) for ns in namespaces)
+    selector = f'namespace=~"{_label_value(pattern)}"'
+    if CLUSTER_LABEL:
+        selector += f', {CLUSTER_LABEL}="{_label_value(cluster_name)}"'
+    return selector
+
+
+def _parse_duration(duration: str) -> float:
+    """Convert "30s", "5m", "1h", "2d" or "1w" to seconds."""
+    match = _DURATION.match(duration or "")
+    if not match:
+        raise ValueError(f"Invalid duration: {duration!r}")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _cpu_result(cluster_name: str, namespace: str, cpu_percent: float) -> dict:
+    is_high = cpu_percent > CPU_THRESHOLD
+    return {
+        "cluster": cluster_name,
+        "namespace": namespace,
+        "cpu_usage_percent": round(cpu_percent, 2),
+        "timestamp": _now(),
+        "threshold": CPU_THRESHOLD,
+        "status": "high" if is_high else "normal",
+        "recommendation": "Scale up replicas" if is_high else "CPU usage within normal range"
+    }
+
+# ---------------- CPU USAGE ---------------- #
+
+async def _query_cpu_usage_impl(cluster_name: str, namespace: str = "default") -> dict:
+    if prometheus is None:
+        # Mock realistic CPU data with some randomization for demo
+        return _cpu_result(cluster_name, namespace, random.uniform(75.0, 95.0))
+
+    try:
+        result = await prometheus.query(CPU_USAGE_QUERY.format(selector=_selector(cluster_name, namespace)))
+    except Exception as e:
+        return {"cluster": cluster_name, "namespace": namespace, "status": "unknown",
+                "error": str(e), "timestamp": _now()}
+
+    if not result:
+        return {"cluster": cluster_name, "namespace": namespace, "status": "unknown",
+                "error": "No CPU samples found", "timestamp": _now()}
+    return _cpu_result(cluster_name, namespace, float(result[0]["value"][1]))
+
+
 @mcp.tool()
-def query_cpu_usage(cluster_name: str, namespace: str = "default") -> dict:
+async def query_cpu_usage(cluster_name: str, namespace: str = "default") -> dict:
     """
     Query CPU usage percentage for a given cluster and namespace.
     
@@ -27,33 +163,170 @@ def query_cpu_usage(cluster_name: str, namespace: str = "default") -> dict:
     Returns:
         Dictionary containing CPU usage metrics
     """
-    # Mock realistic CPU data with some randomization for demo
-    cpu_percent = random.uniform(75.0, 95.0)
-    is_high = cpu_percent > 80.0
-    
+    return await _query_cpu_usage_impl(cluster_name, namespace)
+
+# ---------------- BATCH QUERIES ---------------- #
+
+async def _query_cluster(kind: str, cluster_name: str, namespaces: list[str]) -> dict:
+    """One aggregated query per cluster, returning {namespace: value}."""
+    _, query, _, mock_range = BATCH_QUERIES[kind]
+    if prometheus is None:
+        return {ns: random.uniform(*mock_range) for ns in namespaces}
+    result = await prometheus.query(query.format(selector=_batch_selector(cluster_name, namespaces)))
+    return {sample["metric"].get("namespace"): float(sample["value"][1]) for sample in result}
+
+
+async def _query_batch_impl(kind: str, clusters: list[str], namespaces: list[str]) -> dict:
+    """
+    Fan out one query per cluster concurrently and return a columnar table with
+    one row per (cluster, namespace); missing series have a null value.
+    """
+    metric, _, threshold, _ = BATCH_QUERIES[kind]
+    responses = await asyncio.gather(
+        *(_query_cluster(kind, cluster, namespaces) for cluster in clusters),
+        return_exceptions=True
+    )
+
+    columns = {"cluster": [], "namespace": [], "value": [], "status": []}
+    errors = {}
+    for cluster, response in zip(clusters, responses):
+        if isinstance(response, Exception):
+            errors[cluster] = str(response)
+            response = {}
+        for ns in namespaces:
+            value = response.get(ns)
+            columns["cluster"].append(cluster)
+            columns["namespace"].append(ns)
+            columns["value"].append(None if value is None else round(value, 2))
+            columns["status"].append("unknown" if value is None else "high" if value > threshold else "normal")
+
     return {
-        "cluster": cluster_name,
-        "namespace": namespace,
-        "cpu_usage_percent": round(cpu_percent, 2),
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "threshold": 80.0,
-        "status": "high" if is_high else "normal",
-        "recommendation": "Scale up replicas" if is_high else "CPU usage within normal range"
+        "metric": metric,
+        "threshold": threshold,
+        "row_count": len(columns["cluster"]),
+        "columns": columns,
+        "high": [f"{c}/{ns}" for c, ns, status in zip(columns["cluster"], columns["namespace"], columns["status"]) if status == "high"],
+        "errors": errors,
+        "timestamp": _now()
     }
 
 
 @mcp.tool()
-def get_alerts(namespace: str = "default", severity: str = "warning") -> dict:
+async def query_cpu_usage_batch(clusters: list[str], namespaces: list[str]) -> dict:
     """
-    Get active Prometheus alerts for a namespace.
-    
+    Query CPU usage percentage for many namespaces across many clusters at once.
+    Returns a columnar table (cluster, namespace, value, status).
+    """
+    return await _query_batch_impl("cpu", clusters, namespaces)
+
+
+@mcp.tool()
+async def query_memory_usage_batch(clusters: list[str], namespaces: list[str]) -> dict:
+    """
+    Query memory usage as a percentage of limits for many namespaces across many clusters.
+    Returns a columnar table (cluster, namespace, value, status).
+    """
+    return await _query_batch_impl("memory", clusters, namespaces)
+
+
+@mcp.tool()
+async def query_restarts_batch(clusters: list[str], namespaces: list[str]) -> dict:
+    """
+    Query container restarts over the last hour for many namespaces across many clusters.
+    Returns a columnar table (cluster, namespace, value, status).
+    """
+    return await _query_batch_impl("restarts", clusters, namespaces)
+
+# ---------------- RANGE QUERIES ---------------- #
+
+def _mock_matrix(start: float, end: float, step: float) -> list[dict]:
+    values = []
+    t = start
+    while t <= end:
+        values.append([t, str(60 + 25 * math.sin(t / 900) + random.uniform(-5, 5))])
+        t += step
+    return [{"metric": {"__name__": "mock_series"}, "values": values}]
+
+
+async def _query_range_impl(query: str, window: str = "1h", step_seconds: Optional[float] = None,
+                            max_points: int = DEFAULT_MAX_POINTS, method: str = "lttb",
+                            max_series: int = DEFAULT_MAX_SERIES, precision: int = 3,
+                            max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    if method not in METHODS:
+        return {"query": query, "error": f"Unknown method {method!r}, expected one of {list(METHODS)}"}
+    if max_points < 1:
+        return {"query": query, "error": f"max_points must be at least 1, got {max_points}"}
+    try:
+        seconds = _parse_duration(window)
+    except ValueError as e:
+        return {"query": query, "error": str(e)}
+
+    end = time.time()
+    start = end - seconds
+    step = max(step_seconds or 0, seconds / MAX_RAW_POINTS, MIN_STEP_SECONDS)
+
+    if prometheus is None:
+        matrix = _mock_matrix(start, end, step)
+    else:
+        try:
+            matrix = await prometheus.query_range(query, start, end, step)
+        except Exception as e:
+            return {"query": query, "window": window, "error": str(e), "timestamp": _now()}
+
+    series = []
+    raw_points = 0
+    for item in matrix[:max_series]:
+        timestamps, values = parse_samples(item.get("values", []))
+        raw_points += len(timestamps)
+        timestamps, values = downsample(timestamps, values, max_points, method)
+        series.append(encode_series(timestamps, values, precision, item.get("metric"), step))
+
+    response = {
+        "query": query,
+        "window": window,
+        "step_seconds": step,
+        "method": method,
+        "encoding": "start + deltas (steps of step_seconds), values",
+        "series_count": len(series),
+        "series_truncated": len(matrix) > max_series,
+        "raw_points": raw_points,
+        "returned_points": 0,
+        "series": series,
+        "timestamp": _now()
+    }
+    kept = shape_list(response, "series", budget_bytes(max_tokens, max_bytes))
+    response["series_count"] = kept
+    response["series_truncated"] = response["series_truncated"] or kept < len(series)
+    response["returned_points"] = sum(len(s["values"]) for s in response["series"])
+    record_rows(raw_points, response["returned_points"])
+    return response
+
+
+@mcp.tool()
+async def query_range(query: str, window: str = "1h", step_seconds: Optional[float] = None,
+                      max_points: int = DEFAULT_MAX_POINTS, method: str = "lttb",
+                      max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    """
+    Query a PromQL expression over a time window (e.g. "30m", "6h") and return
+    each series downsampled to at most max_points, and only as many series as
+    fit in max_tokens / max_bytes.
+
     Args:
-        namespace: Kubernetes namespace to query (default: "default")
-        severity: Alert severity level - warning, critical, or info (default: "warning")
-    
+        query: PromQL expression
+        window: How far back to look
+        step_seconds: Resolution to fetch at (default: derived from the window)
+        max_points: Point budget per series (2 keeps the endpoints, 1 the latest point)
+        method: "lttb" (shape preserving), "minmax" (keeps extremes) or "avg"
+
     Returns:
-        Dictionary containing active alerts
+        Series encoded as a start timestamp, deltas in steps of step_seconds and values
     """
+    return await _query_range_impl(query, window, step_seconds, max_points, method,
+                                   max_tokens=max_tokens, max_bytes=max_bytes)
+
+# ---------------- ALERTS ---------------- #
+
+def _mock_alerts(namespace: str, severity: str) -> list[dict]:
     # Mock alert data based on severity
     alerts_data = {
         "warning": [
@@ -96,15 +369,250 @@ def get_alerts(namespace: str = "default", severity: str = "warning") -> dict:
         "info": []
     }
     
-    selected_alerts = alerts_data.get(severity.lower(), alerts_data["warning"])
-    
+    return alerts_data.get(severity.lower(), alerts_data["warning"])
+
+
+def _format_alert(alert: dict) -> dict:
+    labels = dict(alert.get("labels", {}))
+    annotations = alert.get("annotations", {})
+    name = labels.pop("alertname", "unknown")
+    namespace = labels.pop("namespace", None)
+    severity = labels.pop("severity", None)
     return {
+        "name": name,
+        "namespace": namespace,
+        "severity": severity,
+        "message": annotations.get("summary") or annotations.get("description", ""),
+        "timestamp": alert.get("activeAt"),
+        "state": alert.get("state"),
+        "labels": labels
+    }
+
+
+async def _get_alerts_impl(namespace: str = "default", severity: str = "warning",
+                           max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    level = severity.lower() if severity.lower() in SEVERITIES else "warning"
+
+    if prometheus is None:
+        selected_alerts = _mock_alerts(namespace, severity)
+        scanned = len(selected_alerts)
+    else:
+        try:
+            alerts = await prometheus.alerts()
+        except Exception as e:
+            return {"namespace": namespace, "severity": severity, "alert_count": 0, "alerts": [],
+                    "error": str(e), "query_timestamp": _now()}
+        selected_alerts = [
+            _format_alert(alert) for alert in alerts
+            if alert.get("labels", {}).get("namespace") == namespace
+            and alert.get("labels", {}).get("severity", "").lower() == level
+        ]
+        scanned = len(alerts)
+
+    response = {
         "namespace": namespace,
         "severity": severity,
         "alert_count": len(selected_alerts),
+        "summary": group_by_template(selected_alerts),
         "alerts": selected_alerts,
-        "query_timestamp": datetime.utcnow().isoformat() + "Z"
+        "query_timestamp": _now()
     }
+    record_rows(scanned, shape_list(response, "alerts", budget_bytes(max_tokens, max_bytes)))
+    return response
+
+
+@mcp.tool()
+async def get_alerts(namespace: str = "default", severity: str = "warning",
+                     max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    """
+    Get active Prometheus alerts for a namespace.
+    
+    Args:
+        namespace: Kubernetes namespace to query (default: "default")
+        severity: Alert severity level - warning, critical, or info (default: "warning")
+        max_tokens / max_bytes: Response budget; alert messages are summarized as
+            templates with counts first, then listed in full while they fit
+    
+    Returns:
+        Dictionary containing active alerts
+    """
+    return await _get_alerts_impl(namespace, severity, max_tokens, max_bytes)
+
+
+# ---------------- INCIDENT CORRELATION ---------------- #
+
+# Namespace-level series lined up against alerts and log activity
+CORRELATION_QUERIES = {
+    "cpu_usage_percent": BATCH_QUERIES["cpu"][1],
+    "memory_usage_percent": BATCH_QUERIES["memory"][1],
+    "container_restarts": 'sum by (namespace) (increase(kube_pod_container_status_restarts_total{{{selector}}}[5m]))'
+}
+
+# Cells on the common time grid; the log-analyzer's buckets may make them coarser
+CORRELATION_CELLS = 60
+DEFAULT_MAX_CORRELATIONS = 10
+
+# log-analyzer MCP endpoint for log counts; without it correlations use metrics and alerts only
+LOG_ANALYZER_URL = os.environ.get("LOG_ANALYZER_URL")
+LOG_ANALYZER_TIMEOUT = float(os.environ.get("LOG_ANALYZER_TIMEOUT", 20))
+
+
+async def _fetch_log_signals(namespace: str, window: str) -> dict:
+    async with Client(LOG_ANALYZER_URL, timeout=LOG_ANALYZER_TIMEOUT) as client:
+        result = await client.call_tool("log_signals", {"namespace": namespace, "window": window})
+    return result.structured_content or {}
+
+
+# Returns log_signals output for (namespace, window); None when no log-analyzer is configured
+fetch_log_signals: Optional[Callable[[str, str], Awaitable[dict]]] = _fetch_log_signals if LOG_ANALYZER_URL else None
+
+
+async def _correlation_alerts(namespace: str) -> list[dict]:
+    if prometheus is None:
+        return _mock_alerts(namespace, "critical") + _mock_alerts(namespace, "warning")
+    return [_format_alert(alert) for alert in await prometheus.alerts()
+            if alert.get("labels", {}).get("namespace") == namespace]
+
+
+async def _correlation_metrics(namespace: str, cluster_name: str, start: float, end: float,
+                               step: float) -> list[Signal]:
+    selector = _batch_selector(cluster_name, [namespace]) if cluster_name else f'namespace="{_label_value(namespace)}"'
+    names = list(CORRELATION_QUERIES)
+    if prometheus is None:
+        matrices = [_mock_matrix(start, end, step) for _ in names]
+    else:
+        matrices = await asyncio.gather(*(
+            prometheus.query_range(CORRELATION_QUERIES[name].format(selector=selector), start, end, step)
+            for name in names
+        ))
+    signals = []
+    for name, matrix in zip(names, matrices):
+        for item in matrix[:1]:
+            timestamps, values = parse_samples(item.get("values", []))
+            signals.append(Signal(name, "metric", list(timestamps), list(values)))
+    return signals
+
+
+async def _correlation_logs(namespace: str, window: str) -> dict:
+    if fetch_log_signals is None:
+        raise LookupError("not configured (set LOG_ANALYZER_URL)")
+    response = await fetch_log_signals(namespace, window)
+    if response.get("error"):
+        raise ValueError(response["error"])
+    return response
+
+
+def _log_series(response: dict) -> list[Signal]:
+    start, step = response.get("start"), response.get("step_seconds")
+    if start is None or not step:
+        return []
+    signals = []
+    for item in response.get("signals", []):
+        counts = item.get("counts") or []
+        detail = {"kind": item.get("kind")}
+        signals.append(Signal(item["name"], "logs", [start + i * step for i in range(len(counts))],
+                              counts, counter=True, detail=detail))
+    return signals
+
+
+async def _gather_source(coro) -> tuple[str, object]:
+    try:
+        return "ok", await coro
+    except Exception as e:
+        return str(e) or type(e).__name__, None
+
+
+async def _correlate_incident_impl(namespace: str = "default", window: str = "1h", cluster_name: str = "",
+                                   step_seconds: Optional[float] = None,
+                                   max_correlations: int = DEFAULT_MAX_CORRELATIONS,
+                                   max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    try:
+        seconds = _parse_duration(window)
+    except ValueError as e:
+        return {"namespace": namespace, "error": str(e)}
+
+    end = time.time()
+    start = end - seconds
+    step = max(step_seconds or 0, seconds / CORRELATION_CELLS, MIN_STEP_SECONDS)
+
+    # Alerts, metric history and log counts are fetched at the same time
+    (alert_status, alerts), (metric_status, metrics), (log_status, logs) = await asyncio.gather(
+        _gather_source(_correlation_alerts(namespace)),
+        _gather_source(_correlation_metrics(namespace, cluster_name, start, end, step)),
+        _gather_source(_correlation_logs(namespace, window))
+    )
+    alerts, metrics = alerts or [], metrics or []
+    log_signals = _log_series(logs) if logs else []
+
+    # Log buckets cannot be split, so the grid is never finer than them
+    if logs and logs.get("step_seconds"):
+        step = max(step, float(logs["step_seconds"]))
+    start = (end - seconds) // step * step
+    cells = max(1, math.ceil((end - start) / step))
+    result = correlate(metrics + log_signals, alerts, start, step, cells)
+
+    response = {
+        "namespace": namespace,
+        "window": window,
+        "step_seconds": step,
+        "sources": {
+            "alerts": {"status": alert_status, "count": len(alerts)},
+            "metrics": {"status": metric_status, "series": len(metrics)},
+            "logs": {"status": log_status, "series": len(log_signals)}
+        },
+        "alerts": [{"name": a.get("name"), "severity": a.get("severity"), "timestamp": a.get("timestamp")}
+                   for a in alerts],
+        "signals": result["signals"],
+        "correlations": result["correlations"][:max_correlations],
+        "timestamp": _now()
+    }
+    kept = shape_list(response, "correlations", budget_bytes(max_tokens, max_bytes))
+    record_rows(sum(len(s.values) for s in metrics + log_signals), kept)
+    return response
+
+
+@mcp.tool()
+async def correlate_incident(namespace: str = "default", window: str = "1h", cluster_name: str = "",
+                             step_seconds: Optional[float] = None,
+                             max_correlations: int = DEFAULT_MAX_CORRELATIONS,
+                             max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> dict:
+    """
+    Correlate alerts, metrics and log activity for a namespace in one call.
+    Fetches active alerts, CPU / memory / restart history and log pattern and
+    template counts (from the log-analyzer) concurrently, lines them up on one
+    time grid over the window (e.g. "30m", "1h") and ranks pairs of signals that
+    spike together, e.g. a CPU spike alongside a burst of "too many connections" errors.
+
+    Args:
+        namespace: Kubernetes namespace to investigate
+        window: How far back to look
+        cluster_name: Restrict metrics to one cluster (default: all)
+        step_seconds: Grid resolution (default: derived from the window)
+        max_correlations: How many ranked pairs to return
+
+    Returns:
+        Per-source status, alerts, each signal's peak and the ranked correlations
+    """
+    return await _correlate_incident_impl(namespace, window, cluster_name, step_seconds, max_correlations,
+                                          max_tokens, max_bytes)
+
+
+# ---------------- RESULT CACHE ---------------- #
+
+def _scrape_window() -> int:
+    """Data version: new samples and alert states only arrive from one window to the next."""
+    return int(time.time() // ALIGN_SECONDS)
+
+
+cache_tool(mcp, query_cpu_usage, ALIGN_SECONDS, version=_scrape_window)
+cache_tool(mcp, query_cpu_usage_batch, ALIGN_SECONDS, version=_scrape_window)
+cache_tool(mcp, query_memory_usage_batch, ALIGN_SECONDS, version=_scrape_window)
+cache_tool(mcp, query_restarts_batch, ALIGN_SECONDS, version=_scrape_window)
+cache_tool(mcp, query_range, ALIGN_SECONDS, version=_scrape_window,
+           normalize={"window": duration(_parse_duration)})
+cache_tool(mcp, get_alerts, ALIGN_SECONDS, version=_scrape_window, normalize={"severity": lower})
+cache_tool(mcp, correlate_incident, ALIGN_SECONDS, version=_scrape_window,
+           normalize={"window": duration(_parse_duration)})
 
 
 if __name__ == "__main__":
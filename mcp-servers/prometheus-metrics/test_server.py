@@ -1,41 +1,467 @@
 #!/usr/bin/env python3
 """
-Manual test script for PrometheusMetrics MCP Server
-Run the server and manually test the tools
+Test script for PrometheusMetrics MCP Server
+Runs the tools against mock data and a local stub Prometheus HTTP API
 """
 
-print("""
-========================================
-PrometheusMetrics MCP Server - Manual Test
-========================================
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
 
-To test this server:
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-1. Start the server in one terminal:
-   cd /home/sarthak/AgentPitCrew/mcp-servers/prometheus-metrics
-   python server.py
+import server
+from array import array
+from correlation import Signal, correlate, lagged_correlation
+from downsample import decode_series, downsample, encode_series, lttb
+from prom_client import PrometheusClient, PrometheusError
+from server import (_correlate_incident_impl, _query_cpu_usage_impl, _get_alerts_impl, _query_batch_impl,
+                    _query_range_impl)
 
-2. The server will run in stdio mode - you can test with MCP inspector
-   or integrate it directly with Archestra
+STUB_ALERTS = [
+    {
+        "labels": {"alertname": "HighCPUUsage", "namespace": "default", "severity": "warning", "pod": "web-1"},
+        "annotations": {"summary": "CPU usage above 80%"},
+        "state": "firing",
+        "activeAt": "2024-02-14T12:00:00Z"
+    },
+    {
+        "labels": {"alertname": "PodCrashLooping", "namespace": "default", "severity": "critical"},
+        "annotations": {"description": "Pod is crash looping"},
+        "state": "firing",
+        "activeAt": "2024-02-14T12:01:00Z"
+    },
+    {
+        "labels": {"alertname": "HighCPUUsage", "namespace": "staging", "severity": "warning"},
+        "annotations": {"summary": "CPU usage above 80%"},
+        "state": "pending",
+        "activeAt": "2024-02-14T12:02:00Z"
+    }
+]
 
-3. Available tools:
-   - query_cpu_usage(cluster_name, namespace)
-   - get_alerts(namespace, severity)
 
-Example tool calls (in JSON-RPC format):
-{
-  "method": "tools/call",
-  "params": {
-    "name": "query_cpu_usage",
-    "arguments": {
-      "cluster_name": "production",
-      "namespace": "default"
-    }
-  }
-}
-
-========================================
-✅ Server implementation complete
-Ready for Archestra integration (Phase 2)
-========================================
-""")
+class StubPrometheus(BaseHTTPRequestHandler):
+    """Minimal /api/v1 endpoints that record every request they serve"""
+
+    protocol_version = "HTTP/1.1"
+    requests: list = []
+    clients: set = set()
+    delay = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        StubPrometheus.requests.append((url.path, params))
+        StubPrometheus.clients.add(self.client_address)
+        time.sleep(StubPrometheus.delay)
+
+        batch = re.search(r'namespace=~"([^"]*)"', params.get("query", ""))
+        if url.path == "/api/v1/query" and ("bad" in params.get("query", "") or 'cluster="broken"' in params.get("query", "")):
+            body = {"status": "error", "errorType": "bad_data", "error": "parse error"}
+        elif url.path == "/api/v1/query" and batch:
+            # Answer for every namespace except "empty", the first one running hot
+            namespaces = [ns for ns in batch.group(1).split("|") if ns != "empty"]
+            body = {"status": "success", "data": {"resultType": "vector", "result": [
+                {"metric": {"namespace": ns}, "value": [float(params["time"]), "91.0" if i == 0 else "42.0"]}
+                for i, ns in enumerate(namespaces)
+            ]}}
+        elif url.path == "/api/v1/query":
+            body = {"status": "success", "data": {"resultType": "vector", "result": [
+                {"metric": {}, "value": [float(params["time"]), "87.5"]}
+            ]}}
+        elif url.path == "/api/v1/query_range":
+            start, end, step = float(params["start"]), float(params["end"]), float(params["step"])
+            values = [[start + i * step, "10"] for i in range(int((end - start) / step) + 1)]
+            values[len(values) // 2][1] = "500"  # One spike to survive downsampling
+            values[1][1] = "NaN"
+            body = {"status": "success", "data": {"resultType": "matrix", "result": [
+                {"metric": {"pod": "web-1"}, "values": values}
+            ]}}
+        elif url.path == "/api/v1/alerts":
+            body = {"status": "success", "data": {"alerts": STUB_ALERTS}}
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_prometheus():
+    StubPrometheus.requests = []
+    StubPrometheus.clients = set()
+    StubPrometheus.delay = 0.0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubPrometheus)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+def test_mock_mode():
+    """Test tools fall back to mock data without PROMETHEUS_URL"""
+    print("\n=== Testing mock mode ===")
+
+    server.prometheus = None
+    result = asyncio.run(_query_cpu_usage_impl("production", "default"))
+    print(f"CPU: {result['cpu_usage_percent']}% ({result['status']})")
+    assert 75.0 <= result["cpu_usage_percent"] <= 95.0
+
+    result = asyncio.run(_get_alerts_impl("default", "critical"))
+    assert result["alert_count"] == 1
+    print("test_mock_mode PASSED")
+
+
+def test_prometheus_backend():
+    """Test CPU and alert queries against the stub Prometheus"""
+    print("\n=== Testing Prometheus backend ===")
+
+    httpd, url = start_stub_prometheus()
+    server.prometheus = PrometheusClient(url)
+    try:
+        async def run():
+            cpu = await _query_cpu_usage_impl("production", "default")
+            warnings = await _get_alerts_impl("default", "warning")
+            critical = await _get_alerts_impl("default", "CRITICAL")
+            await server.prometheus.aclose()
+            return cpu, warnings, critical
+
+        cpu, warnings, critical = asyncio.run(run())
+        print(f"CPU: {cpu['cpu_usage_percent']}% ({cpu['status']})")
+        assert cpu["cpu_usage_percent"] == 87.5
+        assert cpu["status"] == "high"
+
+        path, params = StubPrometheus.requests[0]
+        assert path == "/api/v1/query"
+        assert 'namespace="default", cluster="production"' in params["query"]
+
+        print(f"Warning alerts: {[a['name'] for a in warnings['alerts']]}")
+        assert warnings["alert_count"] == 1
+        assert warnings["alerts"][0]["labels"] == {"pod": "web-1"}
+        assert critical["alerts"][0]["message"] == "Pod is crash looping"
+
+        # Both alert calls were served by a single /api/v1/alerts round trip
+        assert [p for p, _ in StubPrometheus.requests].count("/api/v1/alerts") == 1
+    finally:
+        server.prometheus = None
+        httpd.shutdown()
+
+    print("test_prometheus_backend PASSED")
+
+
+def test_coalescing_and_keepalive():
+    """Test identical concurrent queries share one request over one connection"""
+    print("\n=== Testing request coalescing ===")
+
+    httpd, url = start_stub_prometheus()
+    StubPrometheus.delay = 0.05
+    client = PrometheusClient(url, cache_ttl=60, align_seconds=60)
+    try:
+        async def run():
+            now = time.time()
+            results = await asyncio.gather(*[client.query("up", at=now) for _ in range(10)])
+            await client.query('sum(up{job="a"})', at=now)
+            await client.query('sum(up{job="b"})', at=now)
+            await client.aclose()
+            return results
+
+        results = asyncio.run(run())
+        print(f"Requests sent: {client.requests_sent}, connections: {len(StubPrometheus.clients)}")
+        assert len(results) == 10
+        assert client.requests_sent == 3
+        assert len(StubPrometheus.requests) == 3
+        assert len(StubPrometheus.clients) == 1
+
+        # A caller that gives up does not cancel the request for the others sharing it
+        async def cancel_one():
+            now = time.time()
+            callers = [asyncio.ensure_future(client.query("cancelled", at=now)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            callers[0].cancel()
+            results = await asyncio.gather(*callers, return_exceptions=True)
+            await client.aclose()
+            return results
+
+        sent = client.requests_sent
+        results = asyncio.run(cancel_one())
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert [r[0]["value"][1] for r in results[1:]] == ["87.5", "87.5"]
+        assert client.requests_sent - sent == 1
+    finally:
+        httpd.shutdown()
+
+    print("test_coalescing_and_keepalive PASSED")
+
+
+def test_prometheus_errors():
+    """Test error responses are raised to callers and not cached"""
+    print("\n=== Testing Prometheus errors ===")
+
+    httpd, url = start_stub_prometheus()
+    client = PrometheusClient(url)
+    try:
+        async def run():
+            errors = 0
+            for _ in range(2):
+                try:
+                    await client.query("bad(")
+                except PrometheusError:
+                    errors += 1
+            # A non-JSON body, such as a proxy's error page, is a clean PrometheusError too
+            try:
+                await client._get("/api/v1/missing", {})
+            except PrometheusError as e:
+                errors += 1
+                assert "not JSON" in str(e)
+            await client.aclose()
+            return errors
+
+        assert asyncio.run(run()) == 3
+        assert client.requests_sent == 3
+    finally:
+        httpd.shutdown()
+
+    print("test_prometheus_errors PASSED")
+
+
+def test_batch_queries():
+    """Test one aggregated query per cluster with a columnar result"""
+    print("\n=== Testing batch queries ===")
+
+    httpd, url = start_stub_prometheus()
+    server.prometheus = PrometheusClient(url)
+    try:
+        async def run():
+            result = await _query_batch_impl("cpu", ["prod", "staging", "broken"], ["default", "payments", "empty"])
+            await server.prometheus.aclose()
+            return result
+
+        result = asyncio.run(run())
+        columns = result["columns"]
+        print(f"Rows: {result['row_count']}, high: {result['high']}, errors: {list(result['errors'])}")
+
+        queries = [params["query"] for path, params in StubPrometheus.requests]
+        assert len(queries) == 3
+        assert all("sum by (namespace)" in q and 'namespace=~"default|payments|empty"' in q for q in queries)
+
+        assert result["row_count"] == 9
+        assert columns["cluster"][:3] == ["prod", "prod", "prod"]
+        assert columns["value"][:3] == [91.0, 42.0, None]
+        assert columns["status"][:3] == ["high", "normal", "unknown"]
+        assert result["high"] == ["prod/default", "staging/default"]
+        assert "broken" in result["errors"]
+        assert columns["status"][6:] == ["unknown"] * 3
+    finally:
+        server.prometheus = None
+        httpd.shutdown()
+
+    result = asyncio.run(_query_batch_impl("restarts", ["prod"], ["default"]))
+    assert result["metric"] == "restarts_last_hour"
+    assert result["row_count"] == 1
+    print("test_batch_queries PASSED")
+
+
+def test_downsampling():
+    """Test LTTB and min/max buckets keep the shape within the point budget"""
+    print("\n=== Testing downsampling ===")
+
+    timestamps = array("d", range(0, 10000, 10))
+    values = array("d", [1.0] * 1000)
+    values[437] = 99.0
+    values[800] = -50.0
+
+    for method in ("lttb", "minmax", "avg"):
+        t, v = downsample(timestamps, values, 40, method)
+        print(f"{method}: {len(t)} points, max {max(v)}, min {min(v)}")
+        assert len(t) <= 40
+        assert list(t) == sorted(t)
+        if method != "avg":
+            assert 99.0 in v and -50.0 in v
+
+    t, v = lttb(timestamps, values, 40)
+    assert t[0] == 0 and t[-1] == 9990
+
+    # Budgets too small to bucket still bound the output
+    for method in ("lttb", "minmax", "avg"):
+        assert len(downsample(timestamps, values, 0, method)[0]) == 0
+        assert len(downsample(timestamps, values, 1, method)[0]) == 1
+        assert len(downsample(timestamps, values, 2, method)[0]) == 2
+    assert list(lttb(timestamps, values, 2)[0]) == [0, 9990]
+    assert list(lttb(timestamps, values, 1)[0]) == [9990]
+
+    encoded = encode_series(array("d", [100, 115, 130, 190]), array("d", [1.23456, 2, 3, 4]))
+    assert encoded["start"] == 100 and encoded["deltas"] == [15, 15, 60]
+    assert decode_series(encoded) == [(100, 1.235), (115, 2), (130, 3), (190, 4)]
+
+    # Fractional steps (e.g. a 1h window at MAX_RAW_POINTS) decode to the real sample times
+    step = 3600 / 11000
+    grid = array("d", [1700000000.25 + k * step for k in (0, 1, 7, 4000, 10999)])
+    encoded = encode_series(grid, array("d", [1, 2, 3, 4, 5]), step=step)
+    assert encoded["deltas"] == [1, 6, 3993, 6999]
+    assert [t for t, _ in decode_series(encoded, step)] == [round(t, 3) for t in grid]
+    print("test_downsampling PASSED")
+
+
+def test_query_range():
+    """Test range queries are fetched at a bounded step and downsampled"""
+    print("\n=== Testing query_range ===")
+
+    httpd, url = start_stub_prometheus()
+    server.prometheus = PrometheusClient(url)
+    try:
+        async def run():
+            result = await _query_range_impl("rate(cpu[5m])", "24h", max_points=60)
+            await server.prometheus.aclose()
+            return result
+
+        result = asyncio.run(run())
+        print(f"Raw points: {result['raw_points']}, returned: {result['returned_points']}")
+        assert result["step_seconds"] == 86400 / server.MAX_RAW_POINTS
+        assert result["raw_points"] <= server.MAX_RAW_POINTS
+        assert result["returned_points"] <= 60
+        series = result["series"][0]
+        assert series["metric"] == {"pod": "web-1"}
+        assert 500 in series["values"]
+    finally:
+        server.prometheus = None
+        httpd.shutdown()
+
+    result = asyncio.run(_query_range_impl("up", "forever"))
+    assert "error" in result
+    assert "error" in asyncio.run(_query_range_impl("up", "1h", max_points=0))
+    result = asyncio.run(_query_range_impl("up", "1h", max_points=2))
+    assert result["returned_points"] == 2
+    # The response's step decodes the endpoints back to the ends of the window
+    (first, _), (last, _) = decode_series(result["series"][0], result["step_seconds"])
+    assert 3600 - result["step_seconds"] < last - first <= 3600
+    print("test_query_range PASSED")
+
+
+class IncidentPrometheus:
+    """Stands in for PrometheusClient: CPU jumps to 95% for three minutes, 40 minutes ago."""
+
+    def __init__(self, spike_at: float):
+        self.spike_at = spike_at
+        self.queries = []
+
+    async def query_range(self, promql, start, end, step):
+        self.queries.append(promql)
+        values = []
+        t = start
+        while t <= end:
+            if "cpu" in promql:
+                value = 95.0 if self.spike_at <= t < self.spike_at + 180 else 40.0 + (int(t) // 60) % 3
+            elif "memory" in promql:
+                value = 60.0 + (int(t) // 60) % 2
+            else:
+                value = 0.0
+            values.append([t, str(value)])
+            t += step
+        return [{"metric": {"namespace": "payments"}, "values": values}]
+
+    async def alerts(self):
+        active_at = datetime.fromtimestamp(self.spike_at + 60, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return [
+            {"labels": {"alertname": "HighCPUUsage", "namespace": "payments", "severity": "warning"},
+             "annotations": {"summary": "CPU usage above 80%"}, "state": "firing", "activeAt": active_at},
+            {"labels": {"alertname": "HighCPUUsage", "namespace": "staging", "severity": "warning"},
+             "annotations": {}, "state": "firing", "activeAt": active_at}
+        ]
+
+
+def test_correlate_incident():
+    """Test a CPU spike is ranked with the log errors that arrive with it"""
+    print("\n=== Testing incident correlation ===")
+
+    r, lag = lagged_correlation([0, 0, 1, 5, 1, 0, 0, 0], [0, 0, 0, 1, 5, 1, 0, 0])
+    assert lag == 1 and r > 0.99
+
+    now = time.time()
+    spike_at = (now - 2400) // 60 * 60
+    start = (now - 3600) // 60 * 60
+    fake = IncidentPrometheus(spike_at)
+    requested = []
+
+    async def log_signals(namespace, window):
+        requested.append((namespace, window))
+        errors = [1 if start + i * 60 < spike_at or start + i * 60 >= spike_at + 180 else 40 for i in range(60)]
+        return {
+            "start": start, "step_seconds": 60,
+            "signals": [
+                {"name": "ERROR", "kind": "pattern", "counts": [e + 3 * (i % 5) for i, e in enumerate(errors)]},
+                {"name": "Connection refused: too many connections (max <*>)", "kind": "template", "counts": errors},
+                {"name": "Health check passed", "kind": "template", "counts": [6] * 60}
+            ]
+        }
+
+    server.prometheus = fake
+    server.fetch_log_signals = log_signals
+    try:
+        started = time.perf_counter()
+        result = asyncio.run(_correlate_incident_impl("payments", "1h"))
+        print(f"Correlated in {time.perf_counter() - started:.3f}s")
+    finally:
+        server.prometheus = None
+        server.fetch_log_signals = None
+
+    for c in result["correlations"][:3]:
+        print(f"  {c['score']}: {c['summary']}")
+    assert requested == [("payments", "1h")]
+    assert all(source["status"] == "ok" for source in result["sources"].values())
+    assert result["step_seconds"] == 60
+    assert len(fake.queries) == len(server.CORRELATION_QUERIES)
+    assert all('namespace="payments"' in q for q in fake.queries)
+    assert [a["name"] for a in result["alerts"]] == ["HighCPUUsage"]
+
+    top = result["correlations"][0]
+    assert top["signals"][0] == "cpu_usage_percent" and "too many connections" in top["signals"][1]
+    assert top["coincident_spike"] and top["lag_seconds"] == 0
+    assert top["alerts"] == ["HighCPUUsage"]
+    assert not any("Health check" in name for c in result["correlations"] for name in c["signals"])
+    cpu = next(s for s in result["signals"] if s["name"] == "cpu_usage_percent")
+    assert cpu["spiking"] and cpu["peak_time"].startswith(
+        datetime.fromtimestamp(spike_at, timezone.utc).strftime("%Y-%m-%dT%H:%M"))
+
+    # Without a log-analyzer the metrics and alerts are still correlated
+    result = asyncio.run(_correlate_incident_impl("payments", "30m"))
+    print(f"Sources without logs: {result['sources']}")
+    assert result["sources"]["logs"]["status"].startswith("not configured")
+    assert result["sources"]["metrics"]["status"] == "ok" and result["sources"]["metrics"]["series"] == 3
+    assert "error" in asyncio.run(_correlate_incident_impl("payments", "soon"))
+    print("test_correlate_incident PASSED")
+
+
+if __name__ == "__main__":
+    print("Testing PrometheusMetrics MCP Server")
+    print("=" * 50)
+
+    try:
+        test_mock_mode()
+        test_prometheus_backend()
+        test_coalescing_and_keepalive()
+        test_prometheus_errors()
+        test_batch_queries()
+        test_downsampling()
+        test_query_range()
+        test_correlate_incident()
+        print("\n" + "=" * 50)
+        print("ALL TESTS PASSED")
+        print("=" * 50)
+    except AssertionError as e:
+        print(f"\nTEST FAILED: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        sys.exit(1)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Run any AgentPitCrew MCP server over stdio, streamable HTTP or SSE
+
+    python serve.py --server-dir log-analyzer --transport http --port 8080
+
+The server directory must contain a server.py that defines a FastMCP instance named mcp.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_common import serve
+from mcp_common.transport import TRANSPORTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server-dir", default=os.environ.get("MCP_SERVER_DIR", "."),
+                        help="Directory containing server.py (default: current directory)")
+    parser.add_argument("--transport", choices=TRANSPORTS, help="Defaults to MCP_TRANSPORT or stdio")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--path", help="HTTP path of the MCP endpoint (default /mcp)")
+    parser.add_argument("--drain-seconds", type=int, help="Grace period for in-flight requests on shutdown")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.server_dir))
+    server = importlib.import_module("server")
+    serve(server.mcp, args.transport, args.host, args.port, args.drain_seconds, args.path)
+
+
+if __name__ == "__main__":
+    main()